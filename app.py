@@ -5,11 +5,45 @@ from datetime import datetime, timedelta
 from ttkthemes import ThemedTk
 from PIL import Image, ImageTk
 import os
-import re
-import hashlib
 import random
-import csv
+import weakref
 from config import config
+from widgets import (PagedTableModel, BusyIndicator, Debouncer, ProgressDialog,
+                     AutocompleteModel, ThumbnailLoader)
+from library import (LibraryRepository, ValidationError, NotFoundError, DuplicateError,
+                     ConflictError, SchemaVersionError, create_tables)
+from library.pool import ConnectionPool
+from library.repository import isbn_key
+from library.executor import QueryExecutor
+from library.search import CachedSearch
+from library.reports import ExportProgress, export_report
+from library.imports import import_csv
+from library.overdue import sweep_overdue
+from library.fines import accrue_fines
+from library.stats import reconcile_stats
+from library.rollups import build_rollups
+from library.dates import display_date, display_minute
+from library.reference import MEMBER_STATUSES, USER_ROLES
+from library.changes import latest_change, prune_changes, read_changes
+from library.thumbnails import PREVIEW_THUMBNAIL, ROW_THUMBNAIL, THUMBNAIL_DIR, ThumbnailRenderer
+
+# How often finished background queries are handed back to the UI (ms)
+QUERY_POLL_INTERVAL = 30
+
+# Background threads running queries, searches, saves, reports and imports;
+# one stays free for the desk's own work while an import and the sweep run
+QUERY_WORKERS = 3
+
+# Search-as-you-type waits this long after the last keystroke (ms)
+SEARCH_DEBOUNCE = 250
+
+# Loans are checked for passed due dates, and their fines accrued, at startup
+# and then this often (ms). The same job checks the dashboard counters
+# against the tables and rolls up the finished days for reports once a day.
+OVERDUE_SWEEP_INTERVAL = 60 * 60 * 1000
+
+# How often the change log is checked for rows changed by any desk (ms)
+CHANGE_POLL_INTERVAL = 2000
 
 class LibraryManagementSystem:
     def __init__(self, root):
@@ -18,8 +52,8 @@ class LibraryManagementSystem:
         self.root.geometry("1200x700")
         self.root.minsize(1200, 700)
         
-        # Initialize connection
-        self.conn = None
+        # Initialize connection pool
+        self.pool = None
         
         # Database Connection
         if not self.db_connection():
@@ -34,6 +68,10 @@ class LibraryManagementSystem:
         self.selected_category_id = None
         self.current_user = None
         self.is_admin = False
+        self.books_table = None
+        self.members_table = None
+        self.issues_table = None
+        self.stats_label = None
         
         # Load Colors and Styles
         self.primary_color = "#2c3e50"
@@ -57,6 +95,7 @@ class LibraryManagementSystem:
         style.configure("Sidebar.TFrame", background=self.primary_color)
         style.configure("Sidebar.TButton", font=("Helvetica", 12), background=self.primary_color, foreground="white")
         style.configure("Accent.TButton", background=self.accent_color)
+        style.configure("Covers.Treeview", rowheight=ROW_THUMBNAIL[1] + 4)
         
         # Update button mappings for better interaction feedback
         style.map("TButton",
@@ -65,6 +104,18 @@ class LibraryManagementSystem:
         style.map("Accent.TButton",
             foreground=[('active', 'black'), ('pressed', 'black')],
             background=[('active', '#e74c3c'), ('pressed', '#c0392b')])
+        
+        # Deliver background query results on the Tk thread
+        self.busy_indicator = BusyIndicator(self.root)
+        self.poll_queries()
+        
+        # Flag loans that fell due while the application was closed
+        self.sweep_overdue()
+        
+        # Follow changes made by this and every other desk
+        self.poll_changes()
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
             
         # Display Login Frame
         self.show_login_frame()
@@ -74,208 +125,195 @@ class LibraryManagementSystem:
             # Get database configuration
             params = config()
             
-            # Connect to SQLite database (it will be created if it doesn't exist)
-            self.conn = sqlite3.connect(params['database'])
-            self.conn.row_factory = sqlite3.Row  # This allows accessing columns by name
+            # Connections to the SQLite database (created if it doesn't exist)
+            # with the connection profile from database.ini: one writer and a
+            # few readers, shared by the UI thread and the background workers
+            self.pool = ConnectionPool(params['database'], readers=QUERY_WORKERS + 2,
+                                       pragmas=params['pragmas'])
             
             # Create tables
-            self.create_tables()
+            with self.pool.writer() as conn:
+                create_tables(conn)
+            
+            # Reads for tables, searches and reports run on worker threads
+            self.executor = QueryExecutor(self.pool, workers=QUERY_WORKERS)
+            
+            # Recent search results, dropped whenever books or members change
+            self.book_search = CachedSearch(LibraryRepository.search_books,
+                                            LibraryRepository.books_by_ids,
+                                            lambda book: book.book_id)
+            self.member_search = CachedSearch(LibraryRepository.search_members,
+                                              LibraryRepository.members_by_ids,
+                                              lambda member: member.member_id)
+            
+            # Only changes made from now on need patching into the tables
+            self.last_change = self.pool.read(lambda repo: latest_change(repo.conn))
+            self.change_poll_pending = False
+            
+            # Progress of the exports and imports still running, cancelled
+            # when the window closes; finished ones drop out by themselves
+            self.running_progress = weakref.WeakSet()
+            
+            # Cover thumbnails, made in worker processes and cached on disk
+            # next to the database; the loaders keep recent ones in memory
+            self.thumbnails = ThumbnailRenderer(
+                os.path.join(os.path.dirname(os.path.abspath(params['database'])), THUMBNAIL_DIR))
+            self.cover_thumbnails = ThumbnailLoader(self.thumbnails, ROW_THUMBNAIL)
+            self.preview_thumbnails = ThumbnailLoader(self.thumbnails, PREVIEW_THUMBNAIL, maxsize=10)
             return True
             
-        except sqlite3.Error as e:
+        except (sqlite3.Error, SchemaVersionError) as e:
             messagebox.showerror("Database Error", f"Could not connect to database: {e}")
             return False
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {e}")
             return False
     
-    def create_tables(self):
-        cursor = self.conn.cursor()
-        
-        # Create Categories Table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS categories (
-            category_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            category_name TEXT NOT NULL UNIQUE,
-            description TEXT
-        )
-        """)
-        
-        # Create Books Table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS books (
-            book_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            author TEXT NOT NULL,
-            isbn TEXT UNIQUE,
-            publisher TEXT,
-            publication_year INTEGER,
-            category_id INTEGER,
-            total_copies INTEGER DEFAULT 1,
-            available_copies INTEGER DEFAULT 1,
-            description TEXT,
-            added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            cover_image TEXT,
-            FOREIGN KEY (category_id) REFERENCES categories(category_id)
-        )
-        """)
-        
-        # Create Members Table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS members (
-            member_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            first_name TEXT NOT NULL,
-            last_name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            phone TEXT,
-            address TEXT,
-            join_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            membership_status TEXT CHECK(membership_status IN ('active', 'inactive', 'suspended')) DEFAULT 'active',
-            profile_image TEXT
-        )
-        """)
-        
-        # Create Users Table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            full_name TEXT NOT NULL,
-            role TEXT CHECK(role IN ('admin', 'librarian', 'staff')) NOT NULL,
-            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_login TIMESTAMP
-        )
-        """)
-        
-        # Create Book Issues Table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS book_issues (
-            issue_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            book_id INTEGER NOT NULL,
-            member_id INTEGER NOT NULL,
-            issue_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            due_date TIMESTAMP NOT NULL,
-            return_date TIMESTAMP,
-            fine_amount DECIMAL(10,2) DEFAULT 0.00,
-            status TEXT CHECK(status IN ('issued', 'returned', 'overdue')) DEFAULT 'issued',
-            issued_by INTEGER,
-            FOREIGN KEY (book_id) REFERENCES books(book_id),
-            FOREIGN KEY (member_id) REFERENCES members(member_id),
-            FOREIGN KEY (issued_by) REFERENCES users(user_id)
-        )
-        """)
-        
-        # Create Fines Table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS fines (
-            fine_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            issue_id INTEGER NOT NULL,
-            amount DECIMAL(10,2) NOT NULL,
-            fine_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            payment_date TIMESTAMP,
-            payment_status TEXT CHECK(payment_status IN ('paid', 'unpaid')) DEFAULT 'unpaid',
-            FOREIGN KEY (issue_id) REFERENCES book_issues(issue_id)
-        )
-        """)
-        
-        # Create default admin user if none exists
-        cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'admin'")
-        admin_count = cursor.fetchone()[0]
-        
-        if admin_count == 0:
-            # Hash the password 'admin123'
-            password_hash = hashlib.sha256('admin123'.encode()).hexdigest()
-            
-            cursor.execute("""
-            INSERT INTO users (username, password_hash, email, full_name, role)
-            VALUES (?, ?, ?, ?, ?)
-            """, ('admin', password_hash, 'admin@library.com', 'System Administrator', 'admin'))
-        
-        # Create some default categories if none exist
-        cursor.execute("SELECT COUNT(*) FROM categories")
-        category_count = cursor.fetchone()[0]
-        
-        if category_count == 0:
-            default_categories = [
-                ("Fiction", "Novels, short stories, and other fictional works"),
-                ("Non-Fiction", "Factual books on various subjects"),
-                ("Science", "Books related to scientific fields"),
-                ("Technology", "Books about technology and computers"),
-                ("History", "Historical books and biographies"),
-                ("Philosophy", "Books on philosophical thoughts and ideas"),
-                ("Arts", "Books related to various forms of art"),
-                ("Self-Help", "Books focused on personal development")
-            ]
-            
-            cursor.executemany("""
-            INSERT INTO categories (category_name, description)
-            VALUES (?, ?)
-            """, default_categories)
-        
-        self.conn.commit()
-        cursor.close()
+    def poll_queries(self):
+        self.executor.dispatch()
+        self.thumbnails.dispatch()
+        self.busy_indicator.update(self.executor.busy)
+        self.root.after(QUERY_POLL_INTERVAL, self.poll_queries)
+
+    def sweep_overdue(self):
+        def sweep(repo):
+            # Each step commits on its own, and the writer is checked out
+            # per step so the desk's saves are not held up for the whole job
+            with self.pool.writer() as conn:
+                count = sweep_overdue(conn)
+            for step in (accrue_fines, reconcile_stats):
+                with self.pool.writer() as conn:
+                    step(conn)
+            # Checks the writer out for each month it rolls up
+            build_rollups(self.pool.writer)
+            with self.pool.writer() as conn:
+                prune_changes(conn)
+            return count
+        self.executor.submit(sweep, self.overdue_swept, self.show_database_error,
+                             key="overdue-sweep", background=True)
+        self.root.after(OVERDUE_SWEEP_INTERVAL, self.sweep_overdue)
+
+    def poll_changes(self):
+        # One poll at a time; a slow one just delays the next
+        if not self.change_poll_pending:
+            self.change_poll_pending = True
+            since = self.last_change
+            self.executor.submit(lambda repo: read_changes(repo.conn, since),
+                                 self.apply_changes, self.changes_failed, key="change-feed",
+                                 background=True)
+        self.root.after(CHANGE_POLL_INTERVAL, self.poll_changes)
+
+    def changes_failed(self, err):
+        # Typically a locked database; the next poll tries again
+        self.change_poll_pending = False
+
+    def showing(self, table):
+        return table is not None and table.winfo_exists()
+
+    def apply_changes(self, changes):
+        # Patch the tables on screen with the rows other desks (or this one)
+        # changed, instead of waiting for the user to reload them. The
+        # patches are background jobs: the user did not ask for them, so
+        # they do not show the busy indicator.
+        self.change_poll_pending = False
+        self.last_change = changes.last_seq
+        if not changes.complete:
+            # Too many changes to patch: start the open table over
+            self.book_search.invalidate()
+            self.member_search.invalidate()
+            if self.showing(self.books_table):
+                self.search_books()
+            if self.showing(self.members_table):
+                self.search_members()
+            if self.showing(self.issues_table):
+                self.load_current_issues()
+            if self.showing(self.stats_label):
+                self.load_stats()
+            return
+
+        books = list(changes.changed.get("books", ()))
+        members = list(changes.changed.get("members", ()))
+        issues = list(changes.changed.get("book_issues", ()))
+        if books:
+            self.book_search.invalidate()
+            if self.showing(self.books_table):
+                self.executor.submit(lambda repo: repo.books_by_ids(books),
+                                     lambda records: self.books_model.patch_rows(books, records),
+                                     self.show_database_error, background=True)
+        if members:
+            self.member_search.invalidate()
+            if self.showing(self.members_table):
+                self.executor.submit(lambda repo: repo.members_by_ids(members),
+                                     lambda records: self.members_model.patch_rows(members, records),
+                                     self.show_database_error, background=True)
+        if issues and self.showing(self.issues_table):
+            # Returned loans are no longer in the circulation table
+            self.executor.submit(lambda repo: [issue for issue in repo.issues_by_ids(issues)
+                                               if issue.status in ("issued", "overdue")],
+                                 lambda records: self.issues_model.patch_rows(issues, records),
+                                 self.show_database_error, background=True)
+        if changes.changed and self.showing(self.stats_label):
+            self.load_stats()
+
+    def overdue_swept(self, count):
+        # Refresh the circulation table if it is on screen
+        if count and self.issues_table is not None and self.issues_table.winfo_exists():
+            self.load_current_issues()
+
+    def on_close(self):
+        # Stop background work and close every connection; closing runs
+        # PRAGMA optimize so query statistics stay fresh between sessions.
+        # Exports and imports stop at their next batch once cancelled;
+        # interrupting their queries alone would leave an import reading
+        # the rest of its file.
+        for progress in list(self.running_progress):
+            progress.cancel()
+        self.executor.shutdown(cancel=True)
+        self.thumbnails.shutdown()
+        self.pool.close()
+        self.root.destroy()
+
+    def show_database_error(self, err):
+        messagebox.showerror("Database Error", f"Error: {err}")
 
     def login(self):
         username = self.username_entry.get()
         password = self.password_entry.get()
         
-        if not username or not password:
-            messagebox.showerror("Login Error", "Please enter both username and password")
-            return
-        
-        # Hash the password for comparison
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
-        
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT * FROM users 
-            WHERE username = ? AND password_hash = ?
-            """, (username, password_hash))
-            
-            user = cursor.fetchone()
-            cursor.close()
-            
+        def logged_in(user):
             if user:
-                self.current_user = dict(user)  # Convert Row to dict for SQLite
-                self.is_admin = (user['role'] == 'admin')
-                
-                # Update last login time
-                cursor = self.conn.cursor()
-                cursor.execute("""
-                UPDATE users SET last_login = CURRENT_TIMESTAMP
-                WHERE user_id = ?
-                """, (user['user_id'],))
-                self.conn.commit()
-                cursor.close()
+                self.current_user = user
+                self.is_admin = (user.role == 'admin')
                 
                 # Show main dashboard
                 self.show_dashboard()
             else:
                 messagebox.showerror("Login Error", "Invalid username or password")
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
-
-    def save_member(self, first_name, last_name, email, phone, address, status, window):
-        if not first_name or not last_name or not email:
-            messagebox.showerror("Input Error", "First Name, Last Name and Email are required fields")
-            return
         
-        # Validate email format
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-            messagebox.showerror("Input Error", "Please enter a valid email address")
-            return
+        def failed(err):
+            if isinstance(err, ValidationError):
+                messagebox.showerror("Login Error", str(err))
+            else:
+                self.show_database_error(err)
         
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            INSERT INTO members (first_name, last_name, email, phone, address, membership_status)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """, (first_name, last_name, email, phone, address.strip(), status))
-            self.conn.commit()
-            cursor.close()
+        # Writes (authenticate records the login time) run on a query worker
+        # like the reads: the writer may be busy with an import or the
+        # sweep, and waiting for it here would freeze the window
+        self.executor.submit(lambda repo: repo.authenticate(username, password),
+                             logged_in, failed, write=True)
+
+    def save_failed(self, err):
+        # Error handler for the add and update forms
+        if isinstance(err, ValidationError):
+            messagebox.showerror("Input Error", str(err))
+        elif isinstance(err, DuplicateError):
+            messagebox.showerror("Database Error", str(err))
+        else:
+            self.show_database_error(err)
+
+    def save_member(self, first_name, last_name, email, phone, address, status, window):
+        def saved(member_id):
+            self.member_search.invalidate()
             
             # Refresh the members table
             self.load_members()
@@ -284,43 +322,25 @@ class LibraryManagementSystem:
             window.destroy()
             
             messagebox.showinfo("Success", "Member added successfully!")
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Database Error", "A member with this email already exists")
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        
+        self.executor.submit(
+            lambda repo: repo.add_member(first_name, last_name, email, phone, address, status),
+            saved, self.save_failed, write=True)
+
+    def book_row(self, book):
+        return (
+            book.book_id,
+            book.title,
+            book.author,
+            book.isbn if book.isbn else "",
+            book.category_name if book.category_name else "",
+            book.total_copies,
+            book.available_copies,
+            book.publication_year if book.publication_year else ""
+        )
 
     def load_books(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT b.book_id, b.title, b.author, b.isbn, c.category_name, 
-                   b.total_copies, b.available_copies, b.publication_year
-            FROM books b
-            LEFT JOIN categories c ON b.category_id = c.category_id
-            ORDER BY b.title
-            """)
-            
-            books = cursor.fetchall()
-            cursor.close()
-            
-            # Clear existing data
-            for item in self.books_table.get_children():
-                self.books_table.delete(item)
-            
-            # Insert new data
-            for book in books:
-                self.books_table.insert("", tk.END, values=(
-                    book['book_id'],
-                    book['title'],
-                    book['author'],
-                    book['isbn'] if book['isbn'] else "",
-                    book['category_name'] if book['category_name'] else "",
-                    book['total_copies'],
-                    book['available_copies'],
-                    book['publication_year'] if book['publication_year'] else ""
-                ))
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        self.books_model.reload()
 
     def search_books(self):
         search_term = self.book_search_entry.get().strip()
@@ -329,67 +349,21 @@ class LibraryManagementSystem:
             self.load_books()  # If search is empty, load all books
             return
         
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT b.book_id, b.title, b.author, b.isbn, c.category_name, 
-                   b.total_copies, b.available_copies, b.publication_year
-            FROM books b
-            LEFT JOIN categories c ON b.category_id = c.category_id
-            WHERE b.title LIKE ? OR b.author LIKE ? OR b.isbn LIKE ?
-            ORDER BY b.title
-            """, (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
-            
-            books = cursor.fetchall()
-            cursor.close()
-            
-            # Clear existing data
-            for item in self.books_table.get_children():
-                self.books_table.delete(item)
-            
-            # Insert new data
-            for book in books:
-                self.books_table.insert("", tk.END, values=(
-                    book['book_id'],
-                    book['title'],
-                    book['author'],
-                    book['isbn'] if book['isbn'] else "",
-                    book['category_name'] if book['category_name'] else "",
-                    book['total_copies'],
-                    book['available_copies'],
-                    book['publication_year'] if book['publication_year'] else ""
-                ))
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        # Supersedes any search still running for this table
+        self.books_model.show_query(lambda repo: self.book_search.run(repo, search_term))
+
+    def member_row(self, member):
+        return (
+            member.member_id,
+            member.full_name,
+            member.email,
+            member.phone if member.phone else "",
+            member.membership_status.capitalize(),
+            display_date(member.join_date)
+        )
 
     def load_members(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT member_id, first_name, last_name, email, phone, membership_status, join_date
-            FROM members
-            ORDER BY first_name, last_name
-            """)
-            
-            members = cursor.fetchall()
-            cursor.close()
-            
-            # Clear existing data
-            for item in self.members_table.get_children():
-                self.members_table.delete(item)
-            
-            # Insert new data
-            for member in members:
-                self.members_table.insert("", tk.END, values=(
-                    member['member_id'],
-                    f"{member['first_name']} {member['last_name']}",
-                    member['email'],
-                    member['phone'] if member['phone'] else "",
-                    member['membership_status'].capitalize(),
-                    datetime.strptime(member['join_date'], '%Y-%m-%d %H:%M:%S').strftime("%Y-%m-%d")
-                ))
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        self.members_model.reload()
 
     def search_members(self):
         search_term = self.member_search_entry.get().strip()
@@ -398,55 +372,12 @@ class LibraryManagementSystem:
             self.load_members()  # If search is empty, load all members
             return
         
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT member_id, first_name, last_name, email, phone, membership_status, join_date
-            FROM members
-            WHERE first_name LIKE ? OR last_name LIKE ? OR email LIKE ? OR phone LIKE ?
-            ORDER BY first_name, last_name
-            """, (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
-            
-            members = cursor.fetchall()
-            cursor.close()
-            
-            # Clear existing data
-            for item in self.members_table.get_children():
-                self.members_table.delete(item)
-            
-            # Insert new data
-            for member in members:
-                self.members_table.insert("", tk.END, values=(
-                    member['member_id'],
-                    f"{member['first_name']} {member['last_name']}",
-                    member['email'],
-                    member['phone'] if member['phone'] else "",
-                    member['membership_status'].capitalize(),
-                    datetime.strptime(member['join_date'], '%Y-%m-%d %H:%M:%S').strftime("%Y-%m-%d")
-                ))
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        # Supersedes any search still running for this table
+        self.members_model.show_query(lambda repo: self.member_search.run(repo, search_term))
 
     def update_member(self, member_id, first_name, last_name, email, phone, address, status, window):
-        if not first_name or not last_name or not email:
-            messagebox.showerror("Input Error", "First Name, Last Name and Email are required fields")
-            return
-        
-        # Validate email format
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-            messagebox.showerror("Input Error", "Please enter a valid email address")
-            return
-        
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            UPDATE members
-            SET first_name = ?, last_name = ?, email = ?, phone = ?, 
-                address = ?, membership_status = ?
-            WHERE member_id = ?
-            """, (first_name, last_name, email, phone, address.strip(), status, member_id))
-            self.conn.commit()
-            cursor.close()
+        def updated(result):
+            self.member_search.invalidate()
             
             # Refresh the members table
             self.load_members()
@@ -455,10 +386,10 @@ class LibraryManagementSystem:
             window.destroy()
             
             messagebox.showinfo("Success", "Member updated successfully!")
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Database Error", "A member with this email already exists")
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        
+        self.executor.submit(
+            lambda repo: repo.update_member(member_id, first_name, last_name, email, phone, address, status),
+            updated, self.save_failed, write=True)
 
     def delete_selected_member(self):
         if not self.selected_member_id:
@@ -470,83 +401,30 @@ class LibraryManagementSystem:
         if not confirm:
             return
         
-        try:
-            # Check if member has any active book issues
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT COUNT(*) FROM book_issues
-            WHERE member_id = ? AND status IN ('issued', 'overdue')
-            """, (self.selected_member_id,))
-            
-            result = cursor.fetchone()[0]
-            
-            if result > 0:
-                messagebox.showerror("Delete Error", "Cannot delete member who has books issued")
-                cursor.close()
-                return
-            
-            # Delete member from database
-            cursor.execute("DELETE FROM members WHERE member_id = ?", (self.selected_member_id,))
-            self.conn.commit()
-            cursor.close()
+        def deleted(result):
+            self.member_search.invalidate()
             
             # Refresh the members table
             self.load_members()
             
             # Reset selection
-            self.selected_member_id = None
+            if self.selected_member_id == member_id:
+                self.selected_member_id = None
             
             messagebox.showinfo("Success", "Member deleted successfully!")
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
-
-    def save_book(self, title, author, isbn, publisher, year, category, copies, description, window):
-        if not title or not author:
-            messagebox.showerror("Input Error", "Title and Author are required fields")
-            return
         
-        try:
-            # Get category_id from category_name
-            category_id = None
-            if category:
-                cursor = self.conn.cursor()
-                cursor.execute("SELECT category_id FROM categories WHERE category_name = ?", (category,))
-                result = cursor.fetchone()
-                if result:
-                    category_id = result[0]
-                cursor.close()
-            
-            # Validate year and copies
-            pub_year = None
-            if year:
-                try:
-                    pub_year = int(year)
-                except ValueError:
-                    messagebox.showerror("Input Error", "Publication Year must be a number")
-                    return
-            
-            total_copies = 1
-            if copies:
-                try:
-                    total_copies = int(copies)
-                    if total_copies < 1:
-                        raise ValueError("Total copies must be at least 1")
-                except ValueError:
-                    messagebox.showerror("Input Error", "Total Copies must be a positive number")
-                    return
-            
-            # Insert book into database
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            INSERT INTO books (title, author, isbn, publisher, publication_year, category_id, 
-                              total_copies, available_copies, description)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                title, author, isbn, publisher, pub_year, category_id, 
-                total_copies, total_copies, description.strip()
-            ))
-            self.conn.commit()
-            cursor.close()
+        def failed(err):
+            if isinstance(err, ConflictError):
+                messagebox.showerror("Delete Error", str(err))
+            else:
+                self.show_database_error(err)
+        
+        member_id = self.selected_member_id
+        self.executor.submit(lambda repo: repo.delete_member(member_id), deleted, failed, write=True)
+
+    def save_book(self, title, author, isbn, publisher, year, category, copies, description, cover_image, window):
+        def saved(book_id):
+            self.book_search.invalidate()
             
             # Refresh the books table
             self.load_books()
@@ -555,18 +433,16 @@ class LibraryManagementSystem:
             window.destroy()
             
             messagebox.showinfo("Success", "Book added successfully!")
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Database Error", "A book with this ISBN already exists")
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        
+        self.executor.submit(
+            lambda repo: repo.add_book(title, author, isbn, publisher, year, category, copies, description,
+                                       cover_image),
+            saved, self.save_failed, write=True)
             
     def get_categories(self):
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT category_id, category_name FROM categories ORDER BY category_name")
-            categories = cursor.fetchall()
-            cursor.close()
-            return [dict(category) for category in categories]
+            # Served from the pool's in-memory copy, without a reader
+            return self.pool.reference.get_categories()
         except sqlite3.Error:
             return []
 
@@ -617,10 +493,17 @@ class LibraryManagementSystem:
         
         # Welcome message
         welcome_label = ttk.Label(main_menu, 
-                                text=f"Welcome, {self.current_user['full_name']}",
+                                text=f"Welcome, {self.current_user.full_name}",
                                 style="Header.TLabel")
         welcome_label.pack(pady=(0, 20))
         
+        # Library counters, read from the maintained statistics table
+        stats_frame = ttk.Frame(main_menu, style="TFrame")
+        stats_frame.pack(pady=(0, 10))
+        self.stats_label = ttk.Label(stats_frame, text="")
+        self.stats_label.pack()
+        self.load_stats()
+        
         # Create button frame
         button_frame = ttk.Frame(main_menu, style="TFrame")
         button_frame.pack(expand=True)
@@ -642,6 +525,19 @@ class LibraryManagementSystem:
         ttk.Button(button_frame, text="Logout", 
                   command=lambda: self.show_login_frame()).pack(pady=10)
 
+    def load_stats(self):
+        self.executor.submit(LibraryRepository.library_stats, self.show_stats,
+                             self.show_database_error, key="dashboard-stats")
+
+    def show_stats(self, stats):
+        if not self.showing(self.stats_label):
+            return
+        self.stats_label.configure(text=(
+            f"Books: {stats.books:,} ({stats.available_copies:,} of {stats.total_copies:,} copies available)    "
+            f"Active members: {stats.active_members:,}\n"
+            f"Open loans: {stats.open_loans:,}    Overdue: {stats.overdue_loans:,}    "
+            f"Unpaid fines: {stats.unpaid_fines:,} (${stats.unpaid_fine_amount:,.2f})"))
+
     def show_books_management(self):
         # Clear root window
         for widget in self.root.winfo_children():
@@ -662,24 +558,38 @@ class LibraryManagementSystem:
         self.book_search_entry = ttk.Entry(search_frame)
         self.book_search_entry.pack(side="left", padx=(0, 10))
         
+        # Search as the user types
+        search_debouncer = Debouncer(self.book_search_entry, SEARCH_DEBOUNCE, self.search_books)
+        self.book_search_entry.bind("<KeyRelease>", search_debouncer.trigger)
+        
         ttk.Button(search_frame, text="Search", 
                   command=self.search_books).pack(side="left")
         
         ttk.Button(search_frame, text="Add New Book", 
                   command=self.show_add_book_dialog).pack(side="right")
+        ttk.Button(search_frame, text="Import CSV", 
+                  command=lambda: self.import_file("books")).pack(side="right", padx=5)
         
         # Create Treeview
         columns = ("ID", "Title", "Author", "ISBN", "Category", "Total", "Available", "Year")
-        self.books_table = ttk.Treeview(main_frame, columns=columns, show="headings")
+        self.books_table = ttk.Treeview(main_frame, columns=columns, show="tree headings",
+                                        style="Covers.Treeview")
         
-        # Set column headings
+        # Set column headings; the tree column shows the cover
+        self.books_table.column("#0", width=ROW_THUMBNAIL[0] + 20, stretch=False)
         for col in columns:
             self.books_table.heading(col, text=col)
             self.books_table.column(col, width=100)
         
         # Add scrollbar
         scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.books_table.yview)
-        self.books_table.configure(yscrollcommand=scrollbar.set)
+        
+        # Rows are fetched page by page as the table scrolls
+        self.books_model = PagedTableModel(
+            self.books_table, scrollbar, self.executor, LibraryRepository.list_books_page,
+            self.book_row, lambda book: (book.title, book.book_id),
+            on_error=self.show_database_error, row_id=lambda book: book.book_id,
+            row_image=lambda book: book.cover_image, thumbnails=self.cover_thumbnails)
         
         # Pack table and scrollbar
         self.books_table.pack(side="left", fill="both", expand=True)
@@ -695,7 +605,7 @@ class LibraryManagementSystem:
     def show_add_book_dialog(self):
         dialog = tk.Toplevel(self.root)
         dialog.title("Add New Book")
-        dialog.geometry("400x600")
+        dialog.geometry("400x860")
         dialog.grab_set()
         
         # Create and pack widgets
@@ -720,7 +630,7 @@ class LibraryManagementSystem:
         year_entry.pack(pady=5)
         
         ttk.Label(dialog, text="Category:").pack(pady=5)
-        categories = [cat['category_name'] for cat in self.get_categories()]
+        categories = [cat.category_name for cat in self.get_categories()]
         category_var = tk.StringVar(dialog)
         category_combo = ttk.Combobox(dialog, textvariable=category_var, values=categories)
         category_combo.pack(pady=5)
@@ -734,6 +644,31 @@ class LibraryManagementSystem:
         description_text = tk.Text(dialog, height=4, width=40)
         description_text.pack(pady=5)
         
+        ttk.Label(dialog, text="Cover Image:").pack(pady=5)
+        cover_var = tk.StringVar(dialog)
+        cover_preview = ttk.Label(dialog, text="No cover")
+        
+        def show_cover(image, photo):
+            if cover_preview.winfo_exists() and cover_var.get() == image:
+                cover_preview.configure(image=photo, text="")
+        
+        def choose_cover():
+            path = filedialog.askopenfilename(
+                parent=dialog, title="Choose Cover Image",
+                filetypes=[("Images", "*.jpg *.jpeg *.png *.gif *.bmp *.webp"), ("All Files", "*.*")])
+            if not path:
+                return
+            cover_var.set(path)
+            # Decoded off the UI thread; shown when ready
+            photo = self.preview_thumbnails.get(path, show_cover)
+            if photo is not None:
+                show_cover(path, photo)
+            else:
+                cover_preview.configure(image="", text="Loading...")
+        
+        ttk.Button(dialog, text="Choose...", command=choose_cover).pack(pady=5)
+        cover_preview.pack(pady=5)
+        
         # Save button
         ttk.Button(dialog, text="Save", 
                   command=lambda: self.save_book(
@@ -745,6 +680,7 @@ class LibraryManagementSystem:
                       category_var.get(),
                       copies_entry.get(),
                       description_text.get("1.0", tk.END),
+                      cover_var.get(),
                       dialog
                   )).pack(pady=10)
 
@@ -768,11 +704,17 @@ class LibraryManagementSystem:
         self.member_search_entry = ttk.Entry(search_frame)
         self.member_search_entry.pack(side="left", padx=(0, 10))
         
+        # Search as the user types
+        search_debouncer = Debouncer(self.member_search_entry, SEARCH_DEBOUNCE, self.search_members)
+        self.member_search_entry.bind("<KeyRelease>", search_debouncer.trigger)
+        
         ttk.Button(search_frame, text="Search", 
                   command=self.search_members).pack(side="left")
         
         ttk.Button(search_frame, text="Add New Member", 
                   command=self.show_add_member_dialog).pack(side="right")
+        ttk.Button(search_frame, text="Import CSV", 
+                  command=lambda: self.import_file("members")).pack(side="right", padx=5)
         
         # Create Treeview
         columns = ("ID", "Name", "Email", "Phone", "Status", "Join Date")
@@ -785,7 +727,12 @@ class LibraryManagementSystem:
         
         # Add scrollbar
         scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.members_table.yview)
-        self.members_table.configure(yscrollcommand=scrollbar.set)
+        
+        # Rows are fetched page by page as the table scrolls
+        self.members_model = PagedTableModel(
+            self.members_table, scrollbar, self.executor, LibraryRepository.list_members_page,
+            self.member_row, lambda member: (member.first_name, member.last_name, member.member_id),
+            on_error=self.show_database_error, row_id=lambda member: member.member_id)
         
         # Pack table and scrollbar
         self.members_table.pack(side="left", fill="both", expand=True)
@@ -819,6 +766,10 @@ class LibraryManagementSystem:
                   command=self.show_issue_book_dialog).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Return Book", 
                   command=self.show_return_book_dialog).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Batch Checkout", 
+                  command=self.show_batch_checkout_dialog).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Batch Return", 
+                  command=self.show_batch_return_dialog).pack(side="left", padx=5)
         
         # Create Treeview for current issues
         columns = ("Issue ID", "Book Title", "Member Name", "Issue Date", "Due Date", "Status")
@@ -831,7 +782,12 @@ class LibraryManagementSystem:
         
         # Add scrollbar
         scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.issues_table.yview)
-        self.issues_table.configure(yscrollcommand=scrollbar.set)
+        
+        # Rows are fetched page by page as the table scrolls
+        self.issues_model = PagedTableModel(
+            self.issues_table, scrollbar, self.executor, LibraryRepository.list_current_issues_page,
+            self.issue_row, lambda issue: (issue.issue_date, issue.issue_id),
+            on_error=self.show_database_error, row_id=lambda issue: issue.issue_id, descending=True)
         
         # Pack table and scrollbar
         self.issues_table.pack(side="left", fill="both", expand=True)
@@ -876,7 +832,12 @@ class LibraryManagementSystem:
         
         # Add scrollbar
         scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.users_table.yview)
-        self.users_table.configure(yscrollcommand=scrollbar.set)
+        
+        # Rows are fetched page by page as the table scrolls
+        self.users_model = PagedTableModel(
+            self.users_table, scrollbar, self.executor, LibraryRepository.list_users_page,
+            self.user_row, lambda user: (user.username,),
+            on_error=self.show_database_error)
         
         # Pack table and scrollbar
         self.users_table.pack(side="left", fill="both", expand=True)
@@ -902,21 +863,39 @@ class LibraryManagementSystem:
         title_label = ttk.Label(main_frame, text="Reports", style="Header.TLabel")
         title_label.pack(pady=(0, 20))
         
+        # Optional date range; empty fields leave that end open
+        period_frame = ttk.Frame(main_frame)
+        period_frame.pack(pady=(0, 10))
+        ttk.Label(period_frame, text="From (YYYY-MM-DD):").pack(side="left", padx=5)
+        since_entry = ttk.Entry(period_frame, width=12)
+        since_entry.pack(side="left", padx=5)
+        ttk.Label(period_frame, text="Until (YYYY-MM-DD, exclusive):").pack(side="left", padx=5)
+        until_entry = ttk.Entry(period_frame, width=12)
+        until_entry.pack(side="left", padx=5)
+        
+        def report(report_type):
+            self.generate_report(report_type, since_entry.get().strip() or None,
+                                 until_entry.get().strip() or None)
+        
         # Create reports buttons frame
         reports_frame = ttk.Frame(main_frame)
         reports_frame.pack(expand=True)
         
         # Add report buttons
         ttk.Button(reports_frame, text="Books Report", 
-                  command=lambda: self.generate_report("books")).pack(pady=5)
+                  command=lambda: report("books")).pack(pady=5)
         ttk.Button(reports_frame, text="Members Report", 
-                  command=lambda: self.generate_report("members")).pack(pady=5)
+                  command=lambda: report("members")).pack(pady=5)
+        ttk.Button(reports_frame, text="Category Report", 
+                  command=lambda: report("categories")).pack(pady=5)
         ttk.Button(reports_frame, text="Circulation Report", 
-                  command=lambda: self.generate_report("circulation")).pack(pady=5)
+                  command=lambda: report("circulation")).pack(pady=5)
         ttk.Button(reports_frame, text="Overdue Books Report", 
-                  command=lambda: self.generate_report("overdue")).pack(pady=5)
+                  command=lambda: report("overdue")).pack(pady=5)
         ttk.Button(reports_frame, text="Fine Collection Report", 
-                  command=lambda: self.generate_report("fines")).pack(pady=5)
+                  command=lambda: report("fines")).pack(pady=5)
+        ttk.Button(reports_frame, text="Daily Fine Totals Report", 
+                  command=lambda: report("fine_totals")).pack(pady=5)
         
         # Back button
         ttk.Button(main_frame, text="Back to Dashboard", 
@@ -929,15 +908,25 @@ class LibraryManagementSystem:
         dialog.grab_set()
         
         # Create and pack widgets
-        ttk.Label(dialog, text="Select Book:").pack(pady=5)
+        # Books and members are looked up as the librarian types, so the
+        # dialog opens at once however large the catalogue is
+        ttk.Label(dialog, text="Select Book (type to search):").pack(pady=5)
         book_var = tk.StringVar(dialog)
         book_combo = ttk.Combobox(dialog, textvariable=book_var)
         book_combo.pack(pady=5)
+        books = AutocompleteModel(
+            book_combo, self.executor, LibraryRepository.suggest_available_books,
+            lambda book: (book.book_id, f"{book.title} by {book.author}"),
+            on_error=self.show_database_error)
         
-        ttk.Label(dialog, text="Select Member:").pack(pady=5)
+        ttk.Label(dialog, text="Select Member (type to search):").pack(pady=5)
         member_var = tk.StringVar(dialog)
         member_combo = ttk.Combobox(dialog, textvariable=member_var)
         member_combo.pack(pady=5)
+        members = AutocompleteModel(
+            member_combo, self.executor, LibraryRepository.suggest_active_members,
+            lambda member: (member.member_id, member.full_name),
+            on_error=self.show_database_error)
         
         ttk.Label(dialog, text="Due Date:").pack(pady=5)
         due_date_entry = ttk.Entry(dialog)
@@ -950,16 +939,14 @@ class LibraryManagementSystem:
         
         ttk.Button(button_frame, text="Issue Book", 
                   command=lambda: self.issue_book(
-                      book_var.get(), member_var.get(), 
+                      books.selected_key(), members.selected_key(), 
                       due_date_entry.get(), dialog
                   )).pack(side="left", padx=5)
         
         ttk.Button(button_frame, text="Back to Dashboard", 
                   command=lambda: [dialog.destroy(), self.show_dashboard()]).pack(side="left", padx=5)
         
-        # Load books and members data
-        self.load_available_books(book_combo)
-        self.load_active_members(member_combo)
+        book_combo.focus_set()
 
     def show_return_book_dialog(self):
         dialog = tk.Toplevel(self.root)
@@ -968,23 +955,196 @@ class LibraryManagementSystem:
         dialog.grab_set()
         
         # Create and pack widgets
-        ttk.Label(dialog, text="Select Issue:").pack(pady=5)
+        ttk.Label(dialog, text="Select Issue (type to search):").pack(pady=5)
         issue_var = tk.StringVar(dialog)
-        issue_combo = ttk.Combobox(dialog, textvariable=issue_var)
+        issue_combo = ttk.Combobox(dialog, textvariable=issue_var, width=40)
         issue_combo.pack(pady=5)
+        issues = AutocompleteModel(
+            issue_combo, self.executor, LibraryRepository.suggest_open_issues,
+            lambda issue: (issue.issue_id, f"#{issue.issue_id} - {issue.title} ({issue.member_name})"),
+            on_error=self.show_database_error)
         
         ttk.Label(dialog, text="Fine Amount:").pack(pady=5)
         fine_entry = ttk.Entry(dialog)
         fine_entry.insert(0, "0.00")
         fine_entry.pack(pady=5)
         
+        def show_fine(fine):
+            # The librarian can still change or waive the suggested fine
+            if not fine_entry.winfo_exists():
+                return
+            fine_entry.delete(0, tk.END)
+            fine_entry.insert(0, f"{fine:.2f}")
+        
+        def load_fine(event=None):
+            # Only the chosen loan's fine is worked out
+            issue_id = issues.selected_key()
+            if issue_id is None:
+                return
+            self.executor.submit(lambda repo: repo.accrued_fines([issue_id]).get(issue_id, 0),
+                                 show_fine, self.show_database_error, key=fine_entry)
+        
+        issue_combo.bind("<<ComboboxSelected>>", load_fine)
+        
         ttk.Button(dialog, text="Return Book", 
                   command=lambda: self.return_book(
-                      issue_var.get(), fine_entry.get(), dialog
+                      issues.selected_key(), fine_entry.get(), dialog
                   )).pack(pady=10)
         
-        # Load current issues
-        self.load_current_issues_for_return(issue_combo)
+        issue_combo.focus_set()
+
+    def show_batch_checkout_dialog(self):
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Batch Checkout")
+        dialog.geometry("450x600")
+        dialog.grab_set()
+        
+        ttk.Label(dialog, text="Member (type to search):").pack(pady=5)
+        member_combo = ttk.Combobox(dialog, width=40)
+        member_combo.pack(pady=5)
+        members = AutocompleteModel(
+            member_combo, self.executor, LibraryRepository.suggest_active_members,
+            lambda member: (member.member_id, member.full_name),
+            on_error=self.show_database_error)
+        
+        # Books are added one by one, by picking a suggestion or scanning an
+        # ISBN (scanners type the code and press Enter)
+        ttk.Label(dialog, text="Book (type or scan, Enter to add):").pack(pady=5)
+        book_combo = ttk.Combobox(dialog, width=40)
+        book_combo.pack(pady=5)
+        books = AutocompleteModel(
+            book_combo, self.executor, LibraryRepository.suggest_available_books,
+            lambda book: (book.book_id, f"{book.title} by {book.author}"),
+            on_error=self.show_database_error)
+        
+        basket = tk.Listbox(dialog, height=12, width=50)
+        basket.pack(pady=5)
+        book_ids = []
+        
+        def add(book_id, label):
+            book_ids.append(book_id)
+            basket.insert(tk.END, label)
+            book_combo.set("")
+            books.set_choices([])
+        
+        def add_book(event=None):
+            book_id = books.selected_key()
+            if book_id is not None:
+                add(book_id, book_combo.get())
+                return
+            text = book_combo.get().strip()
+            if not text:
+                return
+            
+            if isbn_key(text) is None:
+                # Typed text: add it if it names exactly one book
+                def matched(matches):
+                    if len(matches) == 1:
+                        add(matches[0].book_id, f"{matches[0].title} by {matches[0].author}")
+                    else:
+                        messagebox.showerror("Input Error", "Select a book from the list", parent=dialog)
+                self.executor.submit(
+                    lambda repo: repo.suggest_available_books(text, limit=2),
+                    matched, self.show_database_error)
+                return
+            
+            # A scanned ISBN: looked up exactly, hyphens or not
+            def found(book):
+                if book is None:
+                    messagebox.showerror("Input Error", f"No book has the ISBN {text}", parent=dialog)
+                elif book.available_copies < 1:
+                    messagebox.showerror("Input Error", f"No copies of {book.title} are available",
+                                         parent=dialog)
+                else:
+                    add(book.book_id, f"{book.title} by {book.author}")
+            self.executor.submit(lambda repo: repo.find_book_by_isbn(text), found, self.show_database_error)
+        
+        def remove_book():
+            for index in reversed(basket.curselection()):
+                basket.delete(index)
+                del book_ids[index]
+        
+        book_combo.bind("<Return>", add_book)
+        
+        row = ttk.Frame(dialog)
+        row.pack(pady=5)
+        ttk.Button(row, text="Add", command=add_book).pack(side="left", padx=5)
+        ttk.Button(row, text="Remove Selected", command=remove_book).pack(side="left", padx=5)
+        
+        ttk.Label(dialog, text="Due Date:").pack(pady=5)
+        due_date_entry = ttk.Entry(dialog)
+        due_date_entry.insert(0, (datetime.now() + timedelta(days=14)).strftime("%Y-%m-%d"))
+        due_date_entry.pack(pady=5)
+        
+        ttk.Button(dialog, text="Issue All", 
+                  command=lambda: self.issue_books(
+                      list(book_ids), members.selected_key(), due_date_entry.get(), dialog
+                  )).pack(pady=10)
+        
+        member_combo.focus_set()
+
+    def show_batch_return_dialog(self):
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Batch Return")
+        dialog.geometry("600x500")
+        dialog.grab_set()
+        
+        # Members of any status can bring books back
+        ttk.Label(dialog, text="Member (type to search):").pack(pady=5)
+        member_combo = ttk.Combobox(dialog, width=40)
+        member_combo.pack(pady=5)
+        members = AutocompleteModel(
+            member_combo, self.executor, LibraryRepository.suggest_members,
+            lambda member: (member.member_id, member.full_name),
+            on_error=self.show_database_error)
+        
+        # The member's open loans with the fines they have run up; every
+        # loan starts selected
+        ttk.Label(dialog, text="Loans to return:").pack(pady=5)
+        columns = ("Issue ID", "Book Title", "Due Date", "Fine")
+        loans_table = ttk.Treeview(dialog, columns=columns, show="headings", height=12)
+        for col in columns:
+            loans_table.heading(col, text=col)
+            loans_table.column(col, width=100)
+        loans_table.column("Book Title", width=250)
+        loans_table.pack(pady=5, padx=10, fill="both", expand=True)
+        fines = {}
+        
+        def show_loans(result):
+            issues, accrued = result
+            if not loans_table.winfo_exists():
+                return
+            loans_table.delete(*loans_table.get_children())
+            fines.clear()
+            for issue in issues:
+                fines[issue.issue_id] = accrued.get(issue.issue_id, 0)
+                loans_table.insert("", "end", iid=issue.issue_id, values=(
+                    issue.issue_id, issue.title, display_date(issue.due_date),
+                    f"{fines[issue.issue_id]:.2f}"))
+            loans_table.selection_set(loans_table.get_children())
+        
+        def load_loans(event=None):
+            member_id = members.selected_key()
+            if member_id is None:
+                return
+            def fetch(repo):
+                issues = repo.list_member_issues(member_id)
+                return issues, repo.accrued_fines([issue.issue_id for issue in issues])
+            self.executor.submit(fetch, show_loans, self.show_database_error, key=loans_table)
+        
+        member_combo.bind("<<ComboboxSelected>>", load_loans)
+        
+        waive_var = tk.BooleanVar(dialog, value=False)
+        ttk.Checkbutton(dialog, text="Waive fines", variable=waive_var).pack(pady=5)
+        
+        def selected_returns():
+            return [(int(item), 0 if waive_var.get() else fines[int(item)])
+                    for item in loans_table.selection()]
+        
+        ttk.Button(dialog, text="Return Selected", 
+                  command=lambda: self.return_books(selected_returns(), dialog)).pack(pady=10)
+        
+        member_combo.focus_set()
 
     def show_add_user_dialog(self):
         if not self.is_admin:
@@ -1016,7 +1176,7 @@ class LibraryManagementSystem:
         ttk.Label(dialog, text="Role:").pack(pady=5)
         role_var = tk.StringVar(value="staff")
         role_combo = ttk.Combobox(dialog, textvariable=role_var, 
-                                 values=["admin", "librarian", "staff"])
+                                 values=USER_ROLES)
         role_combo.pack(pady=5)
         
         ttk.Button(dialog, text="Add User", 
@@ -1059,7 +1219,7 @@ class LibraryManagementSystem:
         ttk.Label(dialog, text="Status:").pack(pady=5)
         status_var = tk.StringVar(value="active")
         status_combo = ttk.Combobox(dialog, textvariable=status_var, 
-                                  values=["active", "inactive", "suspended"])
+                                  values=MEMBER_STATUSES)
         status_combo.pack(pady=5)
         
         # Save button
@@ -1074,377 +1234,249 @@ class LibraryManagementSystem:
                       dialog
                   )).pack(pady=10)
 
-    def generate_report(self, report_type):
-        try:
-            cursor = self.conn.cursor()
-            
-            if report_type == "books":
-                cursor.execute("""
-                SELECT b.title, b.author, c.category_name, b.total_copies, 
-                       b.available_copies, COUNT(bi.book_id) as times_borrowed
-                FROM books b
-                LEFT JOIN categories c ON b.category_id = c.category_id
-                LEFT JOIN book_issues bi ON b.book_id = bi.book_id
-                GROUP BY b.book_id
-                ORDER BY times_borrowed DESC
-                """)
-            elif report_type == "members":
-                cursor.execute("""
-                SELECT m.first_name || ' ' || m.last_name as name, 
-                       m.email, m.membership_status,
-                       COUNT(bi.member_id) as books_borrowed,
-                       SUM(CASE WHEN bi.status = 'overdue' THEN 1 ELSE 0 END) as overdue_books
-                FROM members m
-                LEFT JOIN book_issues bi ON m.member_id = bi.member_id
-                GROUP BY m.member_id
-                ORDER BY books_borrowed DESC
-                """)
-            elif report_type == "circulation":
-                cursor.execute("""
-                SELECT b.title, m.first_name || ' ' || m.last_name as member_name,
-                       bi.issue_date, bi.due_date, bi.return_date, bi.status
-                FROM book_issues bi
-                JOIN books b ON bi.book_id = b.book_id
-                JOIN members m ON bi.member_id = m.member_id
-                ORDER BY bi.issue_date DESC
-                """)
-            elif report_type == "overdue":
-                cursor.execute("""
-                SELECT b.title, m.first_name || ' ' || m.last_name as member_name,
-                       bi.issue_date, bi.due_date,
-                       julianday('now') - julianday(bi.due_date) as days_overdue
-                FROM book_issues bi
-                JOIN books b ON bi.book_id = b.book_id
-                JOIN members m ON bi.member_id = m.member_id
-                WHERE bi.status = 'overdue'
-                ORDER BY days_overdue DESC
-                """)
-            elif report_type == "fines":
-                cursor.execute("""
-                SELECT m.first_name || ' ' || m.last_name as member_name,
-                       b.title, f.amount, f.fine_date, f.payment_status
-                FROM fines f
-                JOIN book_issues bi ON f.issue_id = bi.issue_id
-                JOIN books b ON bi.book_id = b.book_id
-                JOIN members m ON bi.member_id = m.member_id
-                ORDER BY f.fine_date DESC
-                """)
-            
-            # Fetch all rows
-            rows = cursor.fetchall()
-            cursor.close()
-            
-            if not rows:
-                messagebox.showinfo("Report", "No data available for this report")
-                return
-            
-            # Ask user where to save the report
-            file_path = filedialog.asksaveasfilename(
-                defaultextension='.csv',
-                filetypes=[("CSV files", "*.csv")],
-                initialfile=f"{report_type}_report_{datetime.now().strftime('%Y%m%d')}.csv"
-            )
-            
-            if not file_path:
-                return
-            
-            # Write to CSV
-            with open(file_path, 'w', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                # Write headers
-                writer.writerow([description[0] for description in cursor.description])
-                # Write data rows
-                writer.writerows(rows)
-            
-            messagebox.showinfo("Success", f"Report has been saved to {file_path}")
-            
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+    def generate_report(self, report_type, since=None, until=None):
+        for value in (since, until):
+            if value is not None:
+                try:
+                    datetime.strptime(value, "%Y-%m-%d")
+                except ValueError:
+                    messagebox.showerror("Input Error", "Dates must be in YYYY-MM-DD format")
+                    return
+        
+        # Ask user where to save the report before running anything
+        file_path = filedialog.asksaveasfilename(
+            defaultextension='.csv',
+            filetypes=[("CSV files", "*.csv"),
+                       ("Compressed CSV (gzip)", "*.csv.gz"),
+                       ("Compressed CSV (zstd)", "*.csv.zst"),
+                       ("Parquet files", "*.parquet")],
+            initialfile=f"{report_type}_report_{datetime.now().strftime('%Y%m%d')}.csv"
+        )
+        
+        if not file_path:
+            return
+        
+        # Stream the report to the file in the background
+        progress = ExportProgress()
+        self.running_progress.add(progress)
+        job = self.executor.submit(
+            lambda repo: export_report(repo.conn, report_type, file_path, progress, since, until),
+            lambda count: self.report_finished(dialog, file_path, count),
+            lambda err: self.report_failed(dialog, err),
+            key="report")
+        
+        def cancel():
+            progress.cancel()
+            self.executor.cancel(job)
+        
+        dialog = ProgressDialog(self.root, "Report", "Exporting...", progress, cancel)
 
-    def load_current_issues(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT bi.issue_id, b.title, m.first_name || ' ' || m.last_name as member_name,
-                   bi.issue_date, bi.due_date, bi.status
-            FROM book_issues bi
-            JOIN books b ON bi.book_id = b.book_id
-            JOIN members m ON bi.member_id = m.member_id
-            WHERE bi.status IN ('issued', 'overdue')
-            ORDER BY bi.issue_date DESC
-            """)
-            
-            issues = cursor.fetchall()
-            cursor.close()
-            
-            # Clear existing data
-            for item in self.issues_table.get_children():
-                self.issues_table.delete(item)
-            
-            # Insert new data
-            for issue in issues:
-                self.issues_table.insert("", tk.END, values=(
-                    issue['issue_id'],
-                    issue['title'],
-                    issue['member_name'],
-                    datetime.strptime(issue['issue_date'], '%Y-%m-%d %H:%M:%S').strftime("%Y-%m-%d"),
-                    datetime.strptime(issue['due_date'], '%Y-%m-%d %H:%M:%S').strftime("%Y-%m-%d"),
-                    issue['status'].capitalize()
-                ))
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+    def report_finished(self, dialog, file_path, count):
+        dialog.close()
+        
+        if count == 0:
+            os.remove(file_path)
+            messagebox.showinfo("Report", "No data available for this report")
+            return
+        
+        messagebox.showinfo("Success", f"Report has been saved to {file_path}")
 
-    def load_users(self):
-        if not self.is_admin:
+    def report_failed(self, dialog, err):
+        dialog.close()
+        if isinstance(err, OSError):
+            messagebox.showerror("Error", f"Could not write report: {err}")
+        elif isinstance(err, ValidationError):
+            messagebox.showerror("Report", str(err))
+        else:
+            self.show_database_error(err)
+
+    def import_file(self, kind):
+        file_path = filedialog.askopenfilename(
+            title=f"Import {kind}",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        
+        if not file_path:
             return
-            
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT user_id, username, full_name, email, role, last_login
-            FROM users
-            ORDER BY username
-            """)
-            
-            users = cursor.fetchall()
-            cursor.close()
-            
-            # Clear existing data
-            for item in self.users_table.get_children():
-                self.users_table.delete(item)
-            
-            # Insert new data
-            for user in users:
-                self.users_table.insert("", tk.END, values=(
-                    user['user_id'],
-                    user['username'],
-                    user['full_name'],
-                    user['email'],
-                    user['role'].capitalize(),
-                    datetime.strptime(user['last_login'], '%Y-%m-%d %H:%M:%S').strftime("%Y-%m-%d %H:%M") if user['last_login'] else "Never"
-                ))
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        
+        # Load the file in the background; rejected rows go to a side file.
+        # The import checks the writer out for each batch rather than for
+        # the whole job, so saves from this desk get in between.
+        progress = ExportProgress()
+        self.running_progress.add(progress)
+        self.executor.submit(
+            lambda repo: import_csv(self.pool.writer, kind, file_path, progress=progress),
+            lambda result: self.import_finished(dialog, kind, result),
+            lambda err: self.import_failed(dialog, err),
+            key="import")
+        
+        dialog = ProgressDialog(self.root, "Import", "Importing...", progress, progress.cancel)
 
-    def load_available_books(self, combo):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT book_id, title, author
-            FROM books
-            WHERE available_copies > 0
-            ORDER BY title
-            """)
-            books = cursor.fetchall()
-            cursor.close()
-            
-            combo['values'] = [f"{book['title']} by {book['author']}" for book in books]
-        except sqlite3.Error:
-            combo['values'] = []
+    def import_finished(self, dialog, kind, result):
+        dialog.close()
+        
+        # New rows change search results and the visible table
+        if kind == "books":
+            self.book_search.invalidate()
+            self.load_books()
+        else:
+            self.member_search.invalidate()
+            self.load_members()
+        
+        message = f"Imported {result.imported} {kind}."
+        if result.cancelled:
+            message = f"Import stopped. {message}"
+        if result.rejected:
+            message += f"\n{result.rejected} rows were rejected and saved to {result.rejects_path}"
+        messagebox.showinfo("Import", message)
 
-    def load_active_members(self, combo):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT member_id, first_name, last_name
-            FROM members
-            WHERE membership_status = 'active'
-            ORDER BY first_name, last_name
-            """)
-            members = cursor.fetchall()
-            cursor.close()
-            
-            combo['values'] = [f"{member['first_name']} {member['last_name']}" for member in members]
-        except sqlite3.Error:
-            combo['values'] = []
+    def import_failed(self, dialog, err):
+        dialog.close()
+        if isinstance(err, OSError):
+            messagebox.showerror("Error", f"Could not read file: {err}")
+        elif isinstance(err, ValidationError):
+            messagebox.showerror("Import", str(err))
+        else:
+            self.show_database_error(err)
 
-    def load_current_issues_for_return(self, combo):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT bi.issue_id, b.title, m.first_name || ' ' || m.last_name as member_name
-            FROM book_issues bi
-            JOIN books b ON bi.book_id = b.book_id
-            JOIN members m ON bi.member_id = m.member_id
-            WHERE bi.status IN ('issued', 'overdue')
-            ORDER BY bi.issue_date DESC
-            """)
-            issues = cursor.fetchall()
-            cursor.close()
+    def issue_row(self, issue):
+        return (
+            issue.issue_id,
+            issue.title,
+            issue.member_name,
+            display_date(issue.issue_date),
+            display_date(issue.due_date),
+            issue.status.capitalize()
+        )
+
+    def load_current_issues(self):
+        self.issues_model.reload()
+
+    def user_row(self, user):
+        return (
+            user.user_id,
+            user.username,
+            user.full_name,
+            user.email,
+            user.role.capitalize(),
+            display_minute(user.last_login, default="Never")
+        )
+
+    def load_users(self):
+        if not self.is_admin:
+            return
             
-            combo['values'] = [f"#{issue['issue_id']} - {issue['title']} ({issue['member_name']})" 
-                             for issue in issues]
-        except sqlite3.Error:
-            combo['values'] = []
+        self.users_model.reload()
 
-    def issue_book(self, book_selection, member_selection, due_date, dialog):
-        if not book_selection or not member_selection or not due_date:
+    def issue_book(self, book_id, member_id, due_date, dialog):
+        if book_id is None or member_id is None or not due_date:
             messagebox.showerror("Input Error", "Please select both book and member, and specify a due date")
             return
             
-        try:
-            # Parse book_id from selection string
-            book_title = book_selection.split(" by ")[0]
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT book_id FROM books WHERE title = ?", (book_title,))
-            book_result = cursor.fetchone()
-            
-            if not book_result:
-                messagebox.showerror("Error", "Selected book not found")
-                cursor.close()
-                return
-                
-            book_id = book_result['book_id']
-            
-            # Parse member_id from selection string
-            member_name = member_selection.split()
-            cursor.execute("""
-            SELECT member_id FROM members 
-            WHERE first_name = ? AND last_name = ?
-            """, (member_name[0], member_name[1]))
-            member_result = cursor.fetchone()
-            
-            if not member_result:
-                messagebox.showerror("Error", "Selected member not found")
-                cursor.close()
-                return
-                
-            member_id = member_result['member_id']
-            
-            # Validate due date format
-            try:
-                due_date_obj = datetime.strptime(due_date, "%Y-%m-%d")
-            except ValueError:
-                messagebox.showerror("Input Error", "Due date must be in YYYY-MM-DD format")
-                cursor.close()
-                return
-            
-            # Check if book is available
-            cursor.execute("""
-            SELECT available_copies 
-            FROM books WHERE book_id = ?
-            """, (book_id,))
-            book_status = cursor.fetchone()
-            
-            if book_status['available_copies'] <= 0:
-                messagebox.showerror("Error", "No copies of this book are currently available")
-                cursor.close()
-                return
-            
-            # Create issue record
-            cursor.execute("""
-            INSERT INTO book_issues (book_id, member_id, due_date, issued_by)
-            VALUES (?, ?, ?, ?)
-            """, (book_id, member_id, due_date_obj.strftime("%Y-%m-%d"), self.current_user['user_id']))
-            
-            # Update available copies
-            cursor.execute("""
-            UPDATE books 
-            SET available_copies = available_copies - 1
-            WHERE book_id = ?
-            """, (book_id,))
-            
-            self.conn.commit()
-            cursor.close()
-            
+        def issued(issue_id):
             # Close dialog and refresh
             dialog.destroy()
-            self.load_current_issues()
+            self.refresh_issues(issued=[issue_id])
             messagebox.showinfo("Success", "Book issued successfully!")
-            
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        
+        def failed(err):
+            if isinstance(err, ValidationError):
+                messagebox.showerror("Input Error", str(err))
+            elif isinstance(err, (NotFoundError, ConflictError)):
+                messagebox.showerror("Error", str(err))
+            else:
+                self.show_database_error(err)
+        
+        user_id = self.current_user.user_id
+        self.executor.submit(lambda repo: repo.issue_book(book_id, member_id, due_date, user_id),
+                             issued, failed, write=True)
 
-    def return_book(self, issue_selection, fine_amount, dialog):
-        if not issue_selection:
+    def return_book(self, issue_id, fine_amount, dialog):
+        if issue_id is None:
             messagebox.showerror("Input Error", "Please select an issue to return")
             return
             
-        try:
-            # Parse issue_id from selection string
-            issue_id = int(issue_selection.split(" - ")[0].replace("#", ""))
-            
-            cursor = self.conn.cursor()
-            
-            # Get book_id for updating available copies
-            cursor.execute("SELECT book_id FROM book_issues WHERE issue_id = ?", (issue_id,))
-            issue = cursor.fetchone()
-            
-            if not issue:
-                messagebox.showerror("Error", "Selected issue not found")
-                cursor.close()
-                return
-            
-            book_id = issue['book_id']
-            
-            # Update issue status
-            cursor.execute("""
-            UPDATE book_issues 
-            SET status = 'returned', 
-                return_date = CURRENT_TIMESTAMP,
-                fine_amount = ?
-            WHERE issue_id = ?
-            """, (float(fine_amount), issue_id))
-            
-            # Update available copies
-            cursor.execute("""
-            UPDATE books 
-            SET available_copies = available_copies + 1
-            WHERE book_id = ?
-            """, (book_id,))
-            
-            # Create fine record if fine amount > 0
-            if float(fine_amount) > 0:
-                cursor.execute("""
-                INSERT INTO fines (issue_id, amount)
-                VALUES (?, ?)
-                """, (issue_id, float(fine_amount)))
-            
-            self.conn.commit()
-            cursor.close()
-            
+        def returned(result):
             # Close dialog and refresh
             dialog.destroy()
-            self.load_current_issues()
+            self.refresh_issues(returned=[issue_id])
             messagebox.showinfo("Success", "Book returned successfully!")
-            
-        except ValueError:
-            messagebox.showerror("Input Error", "Invalid fine amount")
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        
+        def failed(err):
+            if isinstance(err, ValidationError):
+                messagebox.showerror("Input Error", "Invalid fine amount")
+            elif isinstance(err, (NotFoundError, ConflictError)):
+                messagebox.showerror("Error", str(err))
+            else:
+                self.show_database_error(err)
+        
+        self.executor.submit(lambda repo: repo.return_book(issue_id, fine_amount),
+                             returned, failed, write=True)
 
-    def add_user(self, username, password, fullname, email, role, dialog):
-        if not username or not password or not fullname or not email or not role:
-            messagebox.showerror("Input Error", "All fields are required")
+    def issue_books(self, book_ids, member_id, due_date, dialog):
+        if member_id is None or not book_ids or not due_date:
+            messagebox.showerror("Input Error", "Please select a member, add at least one book, and specify a due date",
+                                 parent=dialog)
             return
             
-        # Validate email format
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-            messagebox.showerror("Input Error", "Please enter a valid email address")
+        def issued(issue_ids):
+            dialog.destroy()
+            self.refresh_issues(issued=issue_ids)
+            messagebox.showinfo("Success", f"{len(issue_ids)} books issued successfully!")
+        
+        def failed(err):
+            if isinstance(err, ValidationError):
+                messagebox.showerror("Input Error", str(err), parent=dialog)
+            elif isinstance(err, (NotFoundError, ConflictError)):
+                messagebox.showerror("Error", f"Nothing was issued. {err}", parent=dialog)
+            else:
+                messagebox.showerror("Database Error", f"Error: {err}", parent=dialog)
+        
+        # All or nothing: one unavailable book leaves the whole batch unissued
+        book_ids = list(book_ids)
+        user_id = self.current_user.user_id
+        self.executor.submit(lambda repo: repo.issue_books(book_ids, member_id, due_date, user_id),
+                             issued, failed, write=True)
+
+    def return_books(self, returns, dialog):
+        if not returns:
+            messagebox.showerror("Input Error", "Please select the loans to return", parent=dialog)
             return
             
-        try:
-            # Hash the password
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
-            
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            INSERT INTO users (username, password_hash, full_name, email, role)
-            VALUES (?, ?, ?, ?, ?)
-            """, (username, password_hash, fullname, email, role))
-            
-            self.conn.commit()
-            cursor.close()
-            
+        def returned(result):
+            dialog.destroy()
+            self.refresh_issues(returned=[issue_id for issue_id, _ in returns])
+            messagebox.showinfo("Success", f"{len(returns)} books returned successfully!")
+        
+        def failed(err):
+            if isinstance(err, ValidationError):
+                messagebox.showerror("Input Error", str(err), parent=dialog)
+            elif isinstance(err, (NotFoundError, ConflictError)):
+                messagebox.showerror("Error", f"Nothing was returned. {err}", parent=dialog)
+            else:
+                messagebox.showerror("Database Error", f"Error: {err}", parent=dialog)
+        
+        self.executor.submit(lambda repo: repo.return_books(returns), returned, failed, write=True)
+
+    def refresh_issues(self, issued=(), returned=()):
+        # Patch the circulation table, if it is on screen, with the loans
+        # just issued or returned instead of reloading every page
+        if self.issues_table is None or not self.issues_table.winfo_exists():
+            return
+        self.issues_model.remove_rows(returned)
+        if issued:
+            issued = list(issued)
+            self.executor.submit(lambda repo: repo.issues_by_ids(issued),
+                                 self.issues_model.prepend_rows, self.show_database_error)
+
+    def add_user(self, username, password, fullname, email, role, dialog):
+        def added(user_id):
             # Close dialog and refresh
             dialog.destroy()
             self.load_users()
             messagebox.showinfo("Success", "User added successfully!")
-            
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Database Error", "Username or email already exists")
-        except sqlite3.Error as err:
-            messagebox.showerror("Database Error", f"Error: {err}")
+        
+        self.executor.submit(lambda repo: repo.add_user(username, password, fullname, email, role),
+                             added, self.save_failed, write=True)
 
 if __name__ == "__main__":
     root = ThemedTk(theme="arc")  # Using ThemedTk instead of regular tk.Tk()
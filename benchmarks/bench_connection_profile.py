@@ -0,0 +1,151 @@
+# Compare SQLite's stock settings with the connection profile from
+# library.db.DEFAULT_PRAGMAS (WAL, synchronous=NORMAL, larger cache, mmap).
+#
+#   python benchmarks/bench_connection_profile.py [--issues N] [--seconds S]
+#
+# For each profile it measures small write transactions (a checkout each),
+# a report-style aggregate query, and a few seconds of one writer running
+# next to several readers, counting "database is locked" failures.
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from sample_data import build_sample_database
+
+from library.db import DEFAULT_PRAGMAS, connect
+
+# What a plain sqlite3.connect() gives you
+STOCK_PRAGMAS = {
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+    "cache_size": "-2000",
+    "mmap_size": "0",
+    "temp_store": "DEFAULT",
+    "busy_timeout": "0",
+    "foreign_keys": "OFF",
+}
+
+PROFILES = {"stock": STOCK_PRAGMAS, "profile": DEFAULT_PRAGMAS}
+
+CHECKOUT = [
+    ("INSERT INTO book_issues (book_id, member_id, due_date) VALUES (?, 1, '2030-01-01')", True),
+    ("UPDATE books SET available_copies = available_copies - 1 WHERE book_id = ?", True),
+]
+
+AGGREGATE = """
+SELECT c.category_name, COUNT(*), SUM(bi.status = 'overdue')
+FROM book_issues bi
+JOIN books b ON bi.book_id = b.book_id
+LEFT JOIN categories c ON b.category_id = c.category_id
+GROUP BY c.category_name
+"""
+
+PAGE = """
+SELECT bi.issue_id, b.title, bi.issue_date
+FROM book_issues bi JOIN books b ON bi.book_id = b.book_id
+WHERE bi.issue_id > ? ORDER BY bi.issue_id LIMIT 100
+"""
+
+
+def checkout(conn, book_id):
+    for sql, _ in CHECKOUT:
+        conn.execute(sql, (book_id,))
+    conn.commit()
+
+
+def bench_commits(path, pragmas, count):
+    conn = connect(path, pragmas=pragmas)
+    started = time.perf_counter()
+    for i in range(count):
+        checkout(conn, i % 1000 + 1)
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return count / elapsed
+
+
+def bench_aggregate(path, pragmas, repeat=3):
+    conn = connect(path, pragmas=pragmas)
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(AGGREGATE).fetchall()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    conn.close()
+    return best
+
+
+def bench_concurrency(path, pragmas, seconds, readers=3):
+    stop = time.perf_counter() + seconds
+    counts = {"writes": 0, "reads": 0, "locked": 0}
+    lock = threading.Lock()
+
+    def count(name):
+        with lock:
+            counts[name] += 1
+
+    def writer():
+        conn = connect(path, check_same_thread=False, pragmas=pragmas)
+        i = 0
+        while time.perf_counter() < stop:
+            try:
+                checkout(conn, i % 1000 + 1)
+                count("writes")
+            except sqlite3.OperationalError:
+                conn.rollback()
+                count("locked")
+            i += 1
+        conn.close()
+
+    def reader():
+        conn = connect(path, check_same_thread=False, pragmas=pragmas)
+        after = 0
+        while time.perf_counter() < stop:
+            try:
+                rows = conn.execute(PAGE, (after,)).fetchall()
+                after = rows[-1][0] if rows else 0
+                count("reads")
+            except sqlite3.OperationalError:
+                count("locked")
+        conn.close()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--issues", type=int, default=300000, help="circulation rows to generate")
+    parser.add_argument("--commits", type=int, default=2000, help="checkout transactions to time")
+    parser.add_argument("--seconds", type=float, default=5, help="length of the concurrency run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        template = os.path.join(workdir, "template.db")
+        conn = build_sample_database(template, issues=args.issues)
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+
+        print(f"{args.issues:,} loans")
+        print(f"{'profile':<8} {'commits/s':>10} {'aggregate':>10} {'writes':>8} {'reads':>8} {'locked':>7}")
+        for name, pragmas in PROFILES.items():
+            path = os.path.join(workdir, f"{name}.db")
+            shutil.copy(template, path)
+            commits = bench_commits(path, pragmas, args.commits)
+            aggregate = bench_aggregate(path, pragmas)
+            counts = bench_concurrency(path, pragmas, args.seconds)
+            print(f"{name:<8} {commits:>10,.0f} {aggregate:>9.3f}s {counts['writes']:>8,} "
+                  f"{counts['reads']:>8,} {counts['locked']:>7,}")
+
+
+if __name__ == "__main__":
+    main()
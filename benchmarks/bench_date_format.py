@@ -0,0 +1,64 @@
+# Time turning stored dates and timestamps into display dates, the way table
+# rows are rendered.
+#
+#   python benchmarks/bench_date_format.py [--issues N]
+#
+# Compares parsing every value with strptime() and formatting it again (what
+# the tables used to do, which also failed on 'YYYY-MM-DD' due dates) with
+# library.dates.display_date, and with formatting in SQL with date().
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sample_data import build_sample_database
+
+from library.dates import display_date
+
+
+def strptime_date(value):
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return value
+
+
+def timed(label, fn, rows):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:>7.3f}s  {rows / elapsed / 1e6:>6.2f}M rows/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--issues", type=int, default=500000, help="circulation rows to generate")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        conn = build_sample_database(os.path.join(workdir, "bench.db"), issues=args.issues)
+        # Timestamps for issue dates, plain dates for due dates
+        rows = conn.execute("SELECT issue_date, due_date FROM book_issues").fetchall()
+        rows = [tuple(row) for row in rows]
+        print(f"{len(rows):,} loans, 2 date columns each")
+
+        parsed = timed("strptime + strftime", lambda: [
+            (strptime_date(issued), strptime_date(due)) for issued, due in rows], len(rows))
+        cached = timed("display_date", lambda: [
+            (display_date(issued), display_date(due)) for issued, due in rows], len(rows))
+        assert parsed == cached
+
+        timed("query only", lambda: conn.execute(
+            "SELECT issue_date, due_date FROM book_issues").fetchall(), len(rows))
+        timed("query with date()", lambda: conn.execute(
+            "SELECT date(issue_date), date(due_date) FROM book_issues").fetchall(), len(rows))
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Time the fine engine on a large loan history: computing every open loan's
+# accrued fine, and materializing the accruals into the fines table.
+#
+#   python benchmarks/bench_fine_accrual.py [--issues N] [--open-every K]
+#
+# The sample data only has a few weeks of open loans, so every K-th returned
+# loan is reopened as overdue to give the engine real work.
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sample_data import build_sample_database
+
+from library import LibraryRepository
+from library.fines import accrue_fines
+
+
+def timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"{label:<32} {time.perf_counter() - started:>7.2f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--issues", type=int, default=1000000, help="circulation rows to generate")
+    parser.add_argument("--open-every", type=int, default=10, help="reopen every K-th returned loan")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        conn = build_sample_database(os.path.join(workdir, "bench.db"), issues=args.issues)
+        conn.execute("""
+        UPDATE book_issues SET status = 'overdue', return_date = NULL
+        WHERE status = 'returned' AND issue_id % ? = 0
+        """, (args.open_every,))
+        conn.execute("UPDATE fine_policies SET max_fine = NULL")
+        conn.execute("INSERT INTO fine_policies (category_id, daily_rate, grace_days, max_fine) VALUES (1, 0.25, 3, 10)")
+        conn.commit()
+        open_loans = conn.execute("SELECT COUNT(*) FROM book_issues WHERE status != 'returned'").fetchone()[0]
+        print(f"{args.issues:,} loans, {open_loans:,} open")
+
+        repo = LibraryRepository(conn)
+        fines = timed("accrued_fines (all open loans)", repo.accrued_fines)
+        print(f"{'':<32} {len(fines):,} loans owe {sum(fines.values()):,.2f}")
+
+        today = date.today()
+        timed("accrue_fines (first run)", lambda: accrue_fines(conn, today))
+        timed("accrue_fines (next day)", lambda: accrue_fines(conn, today + timedelta(days=1)))
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Time a bulk CSV import of books into an empty database.
+#
+#   python benchmarks/bench_import.py [--books N]
+#
+# One row in a thousand repeats an ISBN, so the rejects path is exercised too.
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from sample_data import FIRST_NAMES, LAST_NAMES, WORDS
+
+from library import create_tables
+from library.imports import import_csv
+from library.pool import ConnectionPool
+
+CATEGORIES = ("Fiction", "Science", "history", "Arts", "")
+
+
+def write_books_csv(path, books, seed=1):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["title", "author", "isbn", "publisher", "publication_year",
+                         "category_name", "total_copies", "description"])
+        for i in range(books):
+            writer.writerow([
+                " ".join(rng.choice(WORDS) for _ in range(3)).title(),
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                f"979-{i - i % 1000 if i % 1000 == 999 else i:010d}",
+                "Sample Press",
+                rng.randint(1950, 2025),
+                rng.choice(CATEGORIES),
+                rng.randint(1, 5),
+                " ".join(rng.choice(WORDS) for _ in range(12)),
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=1000000, help="rows in the generated CSV file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, "books.csv")
+        write_books_csv(source, args.books)
+        pool = ConnectionPool(os.path.join(workdir, "bench.db"), readers=1)
+        with pool.writer() as conn:
+            create_tables(conn)
+
+        started = time.perf_counter()
+        result = import_csv(pool.writer, "books", source)
+        elapsed = time.perf_counter() - started
+        print(f"{args.books:,} rows: {result.imported:,} imported, {result.rejected:,} rejected "
+              f"in {elapsed:.1f}s ({args.books / elapsed:,.0f} rows/s)")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
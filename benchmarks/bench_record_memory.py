@@ -0,0 +1,75 @@
+# Measure how much memory a result set of books takes in each row shape.
+#
+#   python benchmarks/bench_record_memory.py [--books N]
+#
+# Builds a catalogue of N books, fetches it once as plain tuples, then builds
+# the same result set as sqlite3.Row objects, as Book dataclasses with a
+# per-instance __dict__ (how records used to be defined) and as the current
+# slotted Book records. The column values themselves are shared between all
+# shapes, so the figures are the per-row overhead of the container alone;
+# the values' own size is printed once for comparison.
+
+import argparse
+import dataclasses
+import gc
+import os
+import sqlite3
+import tempfile
+import tracemalloc
+
+from sample_data import build_sample_database
+
+from library import LibraryRepository
+from library.records import Book
+
+# Book as it was before records got __slots__
+DictBook = dataclasses.make_dataclass(
+    "DictBook",
+    [(field.name, field.type, dataclasses.field(default=field.default)) for field in dataclasses.fields(Book)])
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=1000000, help="books in the generated catalogue")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        conn = build_sample_database(os.path.join(workdir, "bench.db"), books=args.books, members=10, issues=0)
+        sql = LibraryRepository.BOOK_COLUMNS
+
+        conn.row_factory = None
+        rows, values_size = measure(lambda: conn.execute(sql).fetchall())
+        print(f"{len(rows):,} books; tuples including their values: {values_size / len(rows):.0f} bytes/row")
+
+        conn.row_factory = sqlite3.Row
+        shapes = [
+            ("tuple", lambda: [tuple(list(row)) for row in rows]),  # copies, not the same tuples
+            ("sqlite3.Row", lambda: conn.execute(sql).fetchall()),
+            ("dataclass (__dict__)", lambda: [DictBook(*row) for row in rows]),
+            ("dataclass (__slots__)", lambda: [Book(*row) for row in rows]),
+        ]
+        print(f"{'shape':<24} {'bytes/row':>10} {'total MB':>9}")
+        sizes = {}
+        for name, build in shapes:
+            result, size = measure(build)
+            del result
+            if name == "sqlite3.Row":
+                # Fetched afresh, so its values are counted too: take away
+                # the values alone (the tuple fetch minus the tuples)
+                size = size - values_size + sizes["tuple"]
+            sizes[name] = size
+            print(f"{name:<24} {size / len(rows):>10.0f} {size / 1e6:>9.1f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
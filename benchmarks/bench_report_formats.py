@@ -0,0 +1,47 @@
+# Compare write time and file size of the report export formats.
+#
+#   python benchmarks/bench_report_formats.py [--issues N] [--report circulation]
+#
+# Formats whose optional package (zstandard, pyarrow) is missing are skipped.
+
+import argparse
+import os
+import tempfile
+import time
+
+from sample_data import build_sample_database
+
+from library import ValidationError
+from library.reports import EXPORT_FORMATS, REPORT_TYPES, export_report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--issues", type=int, default=500000, help="circulation rows to generate")
+    parser.add_argument("--report", choices=REPORT_TYPES, default="circulation")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        conn = build_sample_database(os.path.join(workdir, "bench.db"), issues=args.issues)
+
+        print(f"{args.report} report, {args.issues:,} loans")
+        print(f"{'format':<10} {'rows':>10} {'seconds':>9} {'size (KB)':>11} {'vs csv':>8}")
+        baseline = None
+        for fmt in EXPORT_FORMATS:
+            path = os.path.join(workdir, f"report.{fmt}")
+            started = time.perf_counter()
+            try:
+                rows = export_report(conn, args.report, path)
+            except ValidationError as err:
+                print(f"{fmt:<10} skipped: {err}")
+                continue
+            elapsed = time.perf_counter() - started
+            size = os.path.getsize(path)
+            if baseline is None:
+                baseline = size
+            print(f"{fmt:<10} {rows:>10,} {elapsed:>9.2f} {size / 1024:>11,.0f} {size / baseline:>7.0%}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
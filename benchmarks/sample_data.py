@@ -0,0 +1,80 @@
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+# Benchmarks run as scripts from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library import create_tables
+from library.db import connect
+
+WORDS = ("river", "stone", "night", "garden", "empire", "silent", "winter", "code",
+         "history", "light", "ocean", "machine", "house", "letters", "storm", "secret",
+         "python", "journey", "mountain", "city", "shadow", "glass", "forest", "song")
+FIRST_NAMES = ("Ana", "Ben", "Chloe", "David", "Elif", "Farid", "Grace", "Hiro", "Ines", "Jonas")
+LAST_NAMES = ("Smith", "Garcia", "Khan", "Okafor", "Rossi", "Tanaka", "Novak", "Silva", "Cohen", "Berg")
+
+
+def build_sample_database(path, books=10000, members=2000, issues=100000, seed=1):
+    # Create (or replace) a database at `path` filled with random but
+    # realistic-looking catalogue, member and circulation data
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    conn = connect(path)
+    create_tables(conn)
+
+    conn.executemany("""
+    INSERT INTO books (title, author, isbn, publisher, publication_year, category_id,
+                       total_copies, available_copies, description)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, ((
+        " ".join(rng.choice(WORDS) for _ in range(3)).title(),
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        f"978-{i:010d}",
+        "Sample Press",
+        rng.randint(1950, 2025),
+        rng.randint(1, 8),
+        3, 3,
+        " ".join(rng.choice(WORDS) for _ in range(12)),
+    ) for i in range(books)))
+
+    conn.executemany("""
+    INSERT INTO members (first_name, last_name, email, phone, membership_status)
+    VALUES (?, ?, ?, ?, ?)
+    """, ((
+        rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f"member{i}@example.com",
+        f"555-{i:07d}", rng.choice(("active", "active", "active", "inactive")),
+    ) for i in range(members)))
+
+    start = datetime(2020, 1, 1)
+    today = datetime.now()
+
+    def issue_rows():
+        for _ in range(issues):
+            issued = start + timedelta(seconds=rng.randint(0, int((today - start).total_seconds())))
+            due = issued + timedelta(days=14)
+            returned = issued + timedelta(days=rng.randint(1, 30))
+            if returned > today:
+                status, return_date = ("overdue" if due < today else "issued"), None
+            else:
+                status, return_date = "returned", returned.strftime("%Y-%m-%d %H:%M:%S")
+            yield (rng.randint(1, books), rng.randint(1, members), issued.strftime("%Y-%m-%d %H:%M:%S"),
+                   due.strftime("%Y-%m-%d"), return_date, status)
+
+    conn.executemany("""
+    INSERT INTO book_issues (book_id, member_id, issue_date, due_date, return_date, status)
+    VALUES (?, ?, ?, ?, ?, ?)
+    """, issue_rows())
+
+    # Roughly one loan in ten was returned late and fined
+    conn.execute("""
+    INSERT INTO fines (issue_id, amount, fine_date, payment_status)
+    SELECT issue_id, 0.25 * (issue_id % 40 + 1), return_date,
+           CASE WHEN issue_id % 3 = 0 THEN 'unpaid' ELSE 'paid' END
+    FROM book_issues
+    WHERE status = 'returned' AND issue_id % 10 = 0
+    """)
+    conn.commit()
+    return conn
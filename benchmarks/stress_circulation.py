@@ -0,0 +1,120 @@
+# Hammer checkout and return from many threads at once, each with its own
+# connection as a separate desk would have, then check that no copy was
+# oversold or put back twice.
+#
+#   python benchmarks/stress_circulation.py [--threads N] [--seconds S] [--books B]
+#
+# A small catalogue with few copies makes the desks fight over the last copy
+# of a book, and returns are picked from the most recent loans of all desks,
+# returned or not, so the same loan is regularly returned twice.
+# A short --busy-timeout pushes lock waits past the connection's own timeout
+# and into LibraryRepository's retry with backoff. Exits with status 1 if
+# the copy counts do not add up.
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from sample_data import build_sample_database
+
+from library import LibraryRepository
+from library.db import connect
+from library.errors import ConflictError
+
+# Returns are picked among this many of the latest loans
+RECENT_LOANS = 50
+
+DUE_DATE = (date.today() + timedelta(days=14)).isoformat()
+
+
+def desk(path, pragmas, stop, loans, lock, counts, seed):
+    rng = random.Random(seed)
+    conn = connect(path, check_same_thread=False, pragmas=pragmas)
+    repo = LibraryRepository(conn)
+    books = conn.execute("SELECT MAX(book_id) FROM books").fetchone()[0]
+    seen = Counter()
+    try:
+        while time.perf_counter() < stop:
+            try:
+                if rng.random() < 0.5 or not loans:
+                    issue_id = repo.issue_book(rng.randint(1, books), rng.randint(1, 50), DUE_DATE)
+                    with lock:
+                        loans.append(issue_id)
+                    seen["issued"] += 1
+                else:
+                    with lock:
+                        issue_id = rng.choice(loans[-RECENT_LOANS:])
+                    repo.return_book(issue_id)
+                    seen["returned"] += 1
+            except ConflictError:
+                seen["conflict"] += 1
+            except sqlite3.OperationalError:
+                # Still locked after every retry
+                seen["busy"] += 1
+    finally:
+        conn.close()
+        with lock:
+            counts.update(seen)
+
+
+def check(path):
+    # Every copy is either on the shelf or out on exactly one open loan
+    conn = connect(path)
+    problems = conn.execute("""
+    SELECT b.book_id, b.total_copies, b.available_copies, COUNT(bi.issue_id) AS open_loans
+    FROM books b
+    LEFT JOIN book_issues bi ON bi.book_id = b.book_id AND bi.status != 'returned'
+    GROUP BY b.book_id
+    HAVING b.available_copies < 0
+        OR b.available_copies > b.total_copies
+        OR b.available_copies != b.total_copies - COUNT(bi.issue_id)
+    """).fetchall()
+    conn.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16, help="desks working at once")
+    parser.add_argument("--seconds", type=float, default=10, help="length of the run")
+    parser.add_argument("--books", type=int, default=20, help="books in the catalogue (3 copies each)")
+    parser.add_argument("--busy-timeout", type=int, default=20, help="busy_timeout of each desk, in ms")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "stress.db")
+        build_sample_database(path, books=args.books, members=50, issues=0).close()
+
+        pragmas = {"busy_timeout": str(args.busy_timeout)}
+        stop = time.perf_counter() + args.seconds
+        loans, lock, counts = [], threading.Lock(), Counter()
+        threads = [threading.Thread(target=desk, args=(path, pragmas, stop, loans, lock, counts, seed))
+                   for seed in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        total = sum(counts.values())
+        print(f"{args.threads} desks, {args.seconds:g}s: {total:,} attempts ({total / args.seconds:,.0f}/s)")
+        print(f"  issued {counts['issued']:,}, returned {counts['returned']:,}, "
+              f"refused {counts['conflict']:,}, still locked after retries {counts['busy']:,}")
+
+        problems = check(path)
+        if problems:
+            print(f"FAILED: copy counts wrong for {len(problems)} books")
+            for book_id, total_copies, available, open_loans in problems[:10]:
+                print(f"  book {book_id}: {total_copies} copies, {available} available, {open_loans} on loan")
+            sys.exit(1)
+        print("OK: every book's available copies match its open loans")
+
+
+if __name__ == "__main__":
+    main()
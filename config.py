@@ -1,7 +1,16 @@
 import os
 import sqlite3
+from configparser import ConfigParser
 
-def config():
+def config(filename='database.ini', section='sqlite'):
     # Define the database file path
-    db_path = os.path.join(os.path.dirname(__file__), 'library.db')
-    return {'database': db_path}
\ No newline at end of file
+    base_dir = os.path.dirname(__file__)
+    db_path = os.path.join(base_dir, 'library.db')
+
+    # Connection settings (PRAGMAs) from the [sqlite] section, if any;
+    # anything not listed keeps the default from library.db.DEFAULT_PRAGMAS
+    parser = ConfigParser()
+    parser.read(os.path.join(base_dir, filename))
+    pragmas = dict(parser.items(section)) if parser.has_section(section) else {}
+
+    return {'database': db_path, 'pragmas': pragmas}
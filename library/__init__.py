@@ -0,0 +1,4 @@
+from .errors import (ConflictError, DuplicateError, ExportCancelled, LibraryError, NotFoundError,
+                     SchemaVersionError, ValidationError)
+from .repository import LibraryRepository
+from .schema import create_tables
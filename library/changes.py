@@ -0,0 +1,73 @@
+import sqlite3
+
+from .records import Changes
+
+# Tables whose row changes are logged to change_log, with their key column.
+# Triggers (see schema.CHANGE_LOG) add the key of every inserted, updated or
+# deleted row, so a desk can ask which rows changed since it last looked
+# instead of reloading its tables: the log is shared through the database
+# file, so it covers every process writing to it.
+CHANGE_TABLES = {
+    "books": "book_id",
+    "members": "member_id",
+    "book_issues": "issue_id",
+    "fines": "fine_id",
+}
+
+# Most changes returned by one poll. A desk further behind than this (e.g.
+# after a bulk import or the overdue sweep) is told to reload instead.
+CHANGE_BATCH = 1000
+
+# Log entries are kept this long; desks poll every few seconds
+CHANGE_RETENTION_HOURS = 24
+
+
+def latest_change(conn):
+    # Position of the newest log entry, where a desk starts polling from.
+    # Read from sqlite_sequence, which AUTOINCREMENT keeps even once every
+    # entry has been pruned.
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+
+def read_changes(conn, since, limit=CHANGE_BATCH):
+    # The rows changed after position `since`, as Changes. Only row ids are
+    # logged: the caller reads their current state, and a row that is gone
+    # (or no longer belongs in a list) has been deleted or moved out of it.
+    # Changes.complete is False when more than `limit` changes are pending,
+    # or when entries after `since` were already pruned.
+    rows = conn.execute("""
+    SELECT seq, table_name, row_id FROM change_log
+    WHERE seq > ?
+    ORDER BY seq
+    LIMIT ?
+    """, (since, limit + 1)).fetchall()
+    if not rows:
+        latest = latest_change(conn)
+        return Changes(since, {}) if latest <= since else Changes(latest, {}, complete=False)
+    if len(rows) > limit or rows[0][0] != since + 1:
+        return Changes(latest_change(conn), {}, complete=False)
+
+    changed = {}
+    for _, table, row_id in rows:
+        changed.setdefault(table, set()).add(row_id)
+    return Changes(rows[-1][0], changed)
+
+
+def prune_changes(conn):
+    # Delete log entries older than CHANGE_RETENTION_HOURS. Sequence numbers
+    # grow with time, so everything before the first entry still kept goes
+    # (all of it when none is that recent). Returns the number deleted.
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.execute("""
+        DELETE FROM change_log
+        WHERE seq < COALESCE(
+            (SELECT seq FROM change_log WHERE changed_at >= datetime('now', ?) ORDER BY seq LIMIT 1),
+            (SELECT MAX(seq) + 1 FROM change_log))
+        """, (f"-{CHANGE_RETENTION_HOURS} hours",))
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return cursor.rowcount
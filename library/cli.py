@@ -0,0 +1,259 @@
+import argparse
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+
+from .schema import create_tables, migrate
+from .errors import LibraryError
+from .imports import IMPORT_KINDS, import_csv
+from .pool import ConnectionPool
+from .reports import EXPORT_FORMATS, REPORT_TYPES, export_format, export_report
+from .repository import LibraryRepository
+from .stats import reconcile_stats
+from .rollups import build_rollups
+
+
+def parse_date(value):
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+    return value
+
+
+def default_database():
+    # Same database the GUI opens
+    from config import config
+    return config()['database']
+
+
+def default_pragmas():
+    # The GUI's connection profile from database.ini, when config.py is
+    # importable; otherwise connect() falls back to its defaults
+    try:
+        from config import config
+    except ImportError:
+        return None
+    return config()['pragmas']
+
+
+def report_path(out_dir, database, report_type, several_databases, fmt):
+    name = f"{report_type}_report_{datetime.now().strftime('%Y%m%d')}.{fmt}"
+    if several_databases:
+        # Keep one branch's reports apart from another's
+        stem = os.path.splitext(os.path.basename(database))[0]
+        name = f"{stem}_{name}"
+    return os.path.join(out_dir, name)
+
+
+def export_database(database, jobs, since=None, until=None, fmt=None, pragmas=None):
+    # Export every (report_type, path) in jobs from one database. All reports
+    # are read inside a single read transaction, so they describe the same
+    # snapshot even while desks keep writing. Runs in a worker process when
+    # several databases are exported in parallel.
+    pool = ConnectionPool(database, readers=1, pragmas=pragmas)
+    results = []
+    try:
+        # The reports read the rollup tables and indexes of the current
+        # schema, so an older database is upgraded first. Only upgraded:
+        # exporting must not seed the default admin account or categories.
+        with pool.writer() as conn:
+            migrate(conn)
+        with pool.reader() as conn:
+            conn.execute("BEGIN")
+            for report_type, path in jobs:
+                count = export_report(conn, report_type, path, since=since, until=until, fmt=fmt)
+                results.append((report_type, path, count))
+    finally:
+        pool.close()
+    return database, results
+
+
+def run_reports(args):
+    report_types = REPORT_TYPES if "all" in args.reports else tuple(dict.fromkeys(args.reports))
+    databases = args.db or [default_database()]
+    several_databases = len(databases) > 1
+
+    if args.out and (several_databases or len(report_types) > 1):
+        print("--out can only be used for a single report from a single database; use --out-dir",
+              file=sys.stderr)
+        return 2
+
+    # --format wins; otherwise --out's extension decides, then plain CSV
+    fmt = args.format or (export_format(args.out) if args.out else "csv")
+
+    pragmas = default_pragmas()
+    os.makedirs(args.out_dir, exist_ok=True)
+    work = []
+    for database in databases:
+        if not os.path.exists(database):
+            print(f"{database}: no such database", file=sys.stderr)
+            return 1
+        jobs = [(report_type, args.out or report_path(args.out_dir, database, report_type, several_databases, fmt))
+                for report_type in report_types]
+        work.append((database, jobs))
+
+    try:
+        if several_databases and args.jobs != 1:
+            # One process per database, up to --jobs at a time
+            with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                futures = [pool.submit(export_database, database, jobs, args.since, args.until, fmt, pragmas)
+                           for database, jobs in work]
+                outcomes = [future.result() for future in futures]
+        else:
+            outcomes = [export_database(database, jobs, args.since, args.until, fmt, pragmas)
+                        for database, jobs in work]
+    except (LibraryError, sqlite3.Error) as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 1
+
+    for database, results in outcomes:
+        for report_type, path, count in results:
+            print(f"{database}: {report_type} -> {path} ({count} rows)")
+    return 0
+
+
+def run_import(args):
+    database = args.db or default_database()
+    pool = ConnectionPool(database, readers=1, pragmas=default_pragmas())
+    try:
+        with pool.writer() as conn:
+            create_tables(conn)
+        result = import_csv(pool.writer, args.kind, args.file, rejects_path=args.rejects)
+    except (OSError, LibraryError, sqlite3.Error) as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 1
+    finally:
+        pool.close()
+
+    print(f"{database}: imported {result.imported} {args.kind} from {args.file}")
+    if result.rejected:
+        print(f"{result.rejected} rows rejected, see {result.rejects_path}")
+    return 0
+
+
+def run_stats(args):
+    database = args.db or default_database()
+    pool = ConnectionPool(database, readers=1, pragmas=default_pragmas())
+    try:
+        with pool.writer() as conn:
+            create_tables(conn)
+            corrected = reconcile_stats(conn, force=True) if args.reconcile else {}
+            stats = LibraryRepository(conn).library_stats()
+    except (LibraryError, sqlite3.Error) as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 1
+    finally:
+        pool.close()
+
+    for name, (stored, actual) in corrected.items():
+        print(f"corrected {name}: {stored} -> {actual}")
+    for name, value in asdict(stats).items():
+        print(f"{name}: {value}")
+    return 0
+
+
+def run_rollups(args):
+    database = args.db or default_database()
+    pool = ConnectionPool(database, readers=1, pragmas=default_pragmas())
+    try:
+        with pool.writer() as conn:
+            create_tables(conn)
+        days = build_rollups(pool.writer, rebuild=args.rebuild)
+    except (LibraryError, sqlite3.Error) as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 1
+    finally:
+        pool.close()
+
+    print(f"{database}: rolled up {days} days of circulation")
+    return 0
+
+
+def run_fine_policy(args):
+    # List the fine policies, or set or remove one and list them after
+    database = args.db or default_database()
+    pool = ConnectionPool(database, readers=1, pragmas=default_pragmas())
+    try:
+        with pool.writer() as conn:
+            create_tables(conn)
+            repo = LibraryRepository(conn, pool.reference)
+            if args.remove:
+                if not args.category:
+                    print("--remove needs --category; the default policy cannot be removed", file=sys.stderr)
+                    return 2
+                repo.remove_fine_policy(args.category)
+            elif args.rate is not None:
+                repo.set_fine_policy(args.rate, args.grace, args.max, category=args.category)
+            policies = repo.list_fine_policies()
+    except (LibraryError, sqlite3.Error) as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 1
+    finally:
+        pool.close()
+
+    for policy in policies:
+        cap = f", at most {policy.max_fine:.2f}" if policy.max_fine is not None else ""
+        print(f"{policy.category_name or 'default'}: {policy.daily_rate:.2f} a day "
+              f"after {policy.grace_days} grace days{cap}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m library", description="Library Management System tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    report = commands.add_parser("report", help="export reports to CSV or Parquet")
+    report.add_argument("reports", nargs="+", choices=REPORT_TYPES + ("all",), metavar="REPORT",
+                        help="one or more of: " + ", ".join(REPORT_TYPES) + ", or all")
+    report.add_argument("--db", action="append", metavar="PATH",
+                        help="database file (repeat for several branches; default: the GUI's database)")
+    report.add_argument("--since", type=parse_date, metavar="YYYY-MM-DD", help="only include activity on or after this date")
+    report.add_argument("--until", type=parse_date, metavar="YYYY-MM-DD", help="only include activity before this date")
+    report.add_argument("--out", metavar="FILE", help="output file (single report, single database)")
+    report.add_argument("--format", choices=EXPORT_FORMATS,
+                        help="output format (default: from --out's extension, else csv)")
+    report.add_argument("--out-dir", default=".", metavar="DIR", help="directory for report files (default: current)")
+    report.add_argument("--jobs", type=int, default=None, metavar="N",
+                        help="parallel processes when exporting several databases (default: CPU count)")
+    report.set_defaults(handler=run_reports)
+
+    load = commands.add_parser("import", help="import books or members from a CSV file")
+    load.add_argument("kind", choices=IMPORT_KINDS, help="what the file contains")
+    load.add_argument("file", help="CSV file with a header row")
+    load.add_argument("--db", metavar="PATH", help="database file (default: the GUI's database)")
+    load.add_argument("--rejects", metavar="FILE",
+                      help="where to write rejected rows (default: <file>.rejected.csv)")
+    load.set_defaults(handler=run_import)
+
+    stats = commands.add_parser("stats", help="print the dashboard counters")
+    stats.add_argument("--db", metavar="PATH", help="database file (default: the GUI's database)")
+    stats.add_argument("--reconcile", action="store_true",
+                       help="recompute the counters from the tables first and fix any that drifted")
+    stats.set_defaults(handler=run_stats)
+
+    rollups = commands.add_parser("rollups", help="roll up finished days of circulation for reports")
+    rollups.add_argument("--db", metavar="PATH", help="database file (default: the GUI's database)")
+    rollups.add_argument("--rebuild", action="store_true",
+                         help="rebuild all history, e.g. after loans were deleted or backdated")
+    rollups.set_defaults(handler=run_rollups)
+
+    fines = commands.add_parser("fine-policy", help="list, set or remove the overdue fine policies")
+    fines.add_argument("--db", metavar="PATH", help="database file (default: the GUI's database)")
+    fines.add_argument("--category", metavar="NAME",
+                       help="category whose override to set or remove (default: the default policy)")
+    fines.add_argument("--rate", type=float, metavar="AMOUNT", help="set the fine per day overdue")
+    fines.add_argument("--grace", type=int, default=0, metavar="DAYS",
+                       help="days overdue before the fine starts (with --rate; default: 0)")
+    fines.add_argument("--max", type=float, metavar="AMOUNT", help="cap on the fine of one loan (with --rate)")
+    fines.add_argument("--remove", action="store_true", help="remove the category's override")
+    fines.set_defaults(handler=run_fine_policy)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
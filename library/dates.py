@@ -0,0 +1,54 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+# Dates and timestamps are stored as text in two shapes: 'YYYY-MM-DD' (due
+# dates, and anything written by date()) and 'YYYY-MM-DD HH:MM:SS' (SQLite's
+# CURRENT_TIMESTAMP). These helpers turn either shape into display text or
+# date objects without parsing every row: the part that is shown is sliced
+# off and only checked the first time it is seen, since a table page holds
+# hundreds of rows but only a handful of distinct days. Values that are not
+# dates at all are shown as stored instead of failing the whole page.
+
+# Distinct days (or minutes) remembered; a few years' worth of days
+CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _checked_date(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _checked_minute(text):
+    try:
+        datetime.strptime(text, "%Y-%m-%d %H:%M")
+    except ValueError:
+        if _checked_date(text) is None:
+            return None
+    return text
+
+
+def to_date(value):
+    # date object for a stored date or timestamp, None if empty or invalid
+    if not value:
+        return None
+    return _checked_date(value[:10])
+
+
+def display_date(value, default=""):
+    # 'YYYY-MM-DD' for a stored date or timestamp
+    if not value:
+        return default
+    text = value[:10]
+    return text if _checked_date(text) is not None else value
+
+
+def display_minute(value, default=""):
+    # 'YYYY-MM-DD HH:MM' for a stored timestamp ('YYYY-MM-DD' for a date)
+    if not value:
+        return default
+    text = value[:16]
+    return text if _checked_minute(text) is not None else value
@@ -0,0 +1,37 @@
+# Exceptions raised by the data-access layer. The GUI catches these and turns
+# them into message boxes; scripts and tests can handle them directly.
+
+
+class LibraryError(Exception):
+    pass
+
+
+class ValidationError(LibraryError):
+    # Input failed validation (missing fields, bad email, bad date, ...)
+    pass
+
+
+class NotFoundError(LibraryError):
+    # A referenced book, member, issue or user does not exist
+    pass
+
+
+class DuplicateError(LibraryError):
+    # A UNIQUE constraint (ISBN, email, username) was violated
+    pass
+
+
+class ConflictError(LibraryError):
+    # The operation is not allowed in the current state
+    # (no copies available, member still has books issued, ...)
+    pass
+
+
+class SchemaVersionError(LibraryError):
+    # The database was upgraded by a newer version of the application
+    pass
+
+
+class ExportCancelled(LibraryError):
+    # A report export was cancelled before it finished
+    pass
@@ -0,0 +1,139 @@
+import queue
+import threading
+
+
+class Job:
+    # A unit of work submitted to a QueryExecutor. fn(repo) runs on a worker
+    # thread; on_done(result) or on_error(exception) run later on the thread
+    # that calls QueryExecutor.dispatch().
+
+    def __init__(self, fn, on_done, on_error, key, write=False, background=False):
+        self.fn = fn
+        self.on_done = on_done
+        self.on_error = on_error
+        self.key = key
+        # Whether fn needs the pool's writer connection
+        self.write = write
+        # Housekeeping the user did not ask for; not counted by busy
+        self.background = background
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        # Connection this job is running on, if it is running
+        self.conn = None
+
+
+class QueryExecutor:
+    # Runs repository calls on background threads so the Tk mainloop never
+    # waits on a query. Each job checks a connection out of a ConnectionPool
+    # for as long as it runs: a reader, or the writer for jobs submitted
+    # with write=True.
+    #
+    # Jobs submitted with the same key supersede each other: submitting a new
+    # search cancels the previous one, and a cancelled job that is already
+    # running is interrupted. Results are handed back through dispatch(),
+    # which the GUI calls periodically from root.after.
+    #
+    # busy is true while any job the user is waiting for is queued or
+    # running. Jobs submitted with background=True, such as polls and
+    # maintenance, run the same way but are left out of it.
+
+    def __init__(self, pool, workers=2):
+        self.pool = pool
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        # Newest job for each key; only touched by the dispatching thread
+        self.latest = {}
+        self.in_flight = 0
+
+        self.threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, name=f"query-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    @property
+    def busy(self):
+        return self.in_flight > 0
+
+    def submit(self, fn, on_done=None, on_error=None, key=None, write=False, background=False):
+        job = Job(fn, on_done, on_error, key, write, background)
+        if key is not None:
+            previous = self.latest.get(key)
+            if previous is not None:
+                self.cancel(previous)
+            self.latest[key] = job
+
+        if not background:
+            self.in_flight += 1
+        self.jobs.put(job)
+        return job
+
+    def cancel(self, job):
+        with self.lock:
+            job.cancelled = True
+            if job.conn is not None:
+                # Abort the statement the worker is running for this job
+                job.conn.interrupt()
+
+    def cancel_key(self, key):
+        job = self.latest.pop(key, None)
+        if job is not None:
+            self.cancel(job)
+
+    def dispatch(self):
+        # Deliver finished jobs; must be called from the GUI thread
+        while True:
+            try:
+                job = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            if not job.background:
+                self.in_flight -= 1
+            if job.key is not None and self.latest.get(job.key) is job:
+                del self.latest[job.key]
+            if job.cancelled:
+                continue
+
+            if job.error is not None:
+                if job.on_error:
+                    job.on_error(job.error)
+            elif job.on_done:
+                job.on_done(job.result)
+
+    def shutdown(self, cancel=False):
+        # Stop the workers once queued jobs are done; with cancel=True jobs
+        # still waiting for their results are cancelled first
+        if cancel:
+            for key in list(self.latest):
+                self.cancel_key(key)
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+
+            with self.lock:
+                cancelled = job.cancelled
+            if not cancelled:
+                try:
+                    with self.pool.repository(write=job.write) as repo:
+                        with self.lock:
+                            job.conn = repo.conn
+                        try:
+                            if not job.cancelled:
+                                job.result = job.fn(repo)
+                        finally:
+                            with self.lock:
+                                job.conn = None
+                except Exception as err:
+                    job.error = err
+
+            self.results.put(job)
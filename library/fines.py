@@ -0,0 +1,102 @@
+import sqlite3
+from datetime import date
+
+from .state import get_state, set_state
+
+# maintenance_state entry holding the last date fines were accrued for
+ACCRUAL_STATE = "fines_accrued_until"
+
+# Fine owed today by every open loan past its due date, computed in one pass
+# over book_issues. Each loan is charged by its book's category policy, or by
+# the default policy (category_id IS NULL) when the category has none:
+#
+#   days late = as_of - due date, in whole days
+#   fine      = daily_rate * (days late - grace_days), at most max_fine
+#
+# Due dates may be YYYY-MM-DD or full timestamps; date() reads both.
+ACCRUED_FINES = """
+SELECT issue_id,
+       ROUND(CASE WHEN max_fine IS NULL OR charged < max_fine THEN charged ELSE max_fine END, 2) AS amount
+FROM (
+    SELECT bi.issue_id,
+           COALESCE(cp.daily_rate, dp.daily_rate)
+               * (CAST(julianday(:as_of) - julianday(date(bi.due_date)) AS INTEGER)
+                  - COALESCE(cp.grace_days, dp.grace_days)) AS charged,
+           CASE WHEN cp.policy_id IS NULL THEN dp.max_fine ELSE cp.max_fine END AS max_fine
+    FROM book_issues bi
+    JOIN books b ON bi.book_id = b.book_id
+    LEFT JOIN fine_policies cp ON cp.category_id = b.category_id
+    LEFT JOIN fine_policies dp ON dp.category_id IS NULL
+    WHERE bi.status IN ('issued', 'overdue') AND bi.due_date < :as_of {where}
+)
+WHERE charged > 0
+"""
+
+
+def accrued_fines_query(as_of=None, where=""):
+    # (sql, params) for ACCRUED_FINES as of a date (default today); `where`
+    # adds further conditions on bi, with named parameters
+    as_of = (as_of or date.today()).isoformat()
+    return ACCRUED_FINES.format(where=where), {"as_of": as_of}
+
+
+def accrue_fines(conn, today=None):
+    # Materialize the fines accrued by open loans into the fines table, once
+    # a day. Each open overdue loan keeps one unpaid fines row dated the day
+    # of the last accrual, holding what it owes beyond anything already
+    # paid; LibraryRepository.return_book settles it. The whole run is a few
+    # set-based statements in one transaction: the accrued amounts are
+    # computed once into a temporary table, then existing rows are updated
+    # and missing ones inserted from it. Unpaid rows of open loans that no
+    # longer owe anything (fully paid, or their policy was lowered or
+    # removed) are dropped, so a stale amount is never settled later.
+    # Returns the number of loans accruing a fine.
+    as_of = (today or date.today()).isoformat()
+    sql, params = accrued_fines_query(today)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        done = get_state(conn, ACCRUAL_STATE)
+        if done is not None and done >= as_of:
+            conn.rollback()
+            return 0
+
+        conn.execute("DROP TABLE IF EXISTS temp.accrued_fines")
+        conn.execute(f"""
+        CREATE TEMP TABLE accrued_fines AS
+        SELECT a.issue_id,
+               a.amount - COALESCE((SELECT SUM(f.amount) FROM fines f
+                                    WHERE f.issue_id = a.issue_id AND f.payment_status = 'paid'), 0)
+                   AS outstanding
+        FROM ({sql}) a
+        """, params)
+        conn.execute("CREATE INDEX temp.idx_accrued_fines_issue ON accrued_fines(issue_id)")
+
+        conn.execute("""
+        DELETE FROM fines
+        WHERE payment_status = 'unpaid'
+          AND issue_id IN (SELECT issue_id FROM book_issues WHERE status IN ('issued', 'overdue'))
+          AND issue_id NOT IN (SELECT issue_id FROM temp.accrued_fines WHERE outstanding > 0)
+        """)
+        conn.execute("""
+        UPDATE fines
+        SET amount = a.outstanding, fine_date = :as_of
+        FROM temp.accrued_fines a
+        WHERE fines.issue_id = a.issue_id AND fines.payment_status = 'unpaid' AND a.outstanding > 0
+        """, {"as_of": as_of})
+        conn.execute("""
+        INSERT INTO fines (issue_id, amount, fine_date)
+        SELECT a.issue_id, a.outstanding, :as_of
+        FROM temp.accrued_fines a
+        WHERE a.outstanding > 0
+          AND NOT EXISTS (SELECT 1 FROM fines f
+                          WHERE f.issue_id = a.issue_id AND f.payment_status = 'unpaid')
+        """, {"as_of": as_of})
+        count = conn.execute("SELECT COUNT(*) FROM temp.accrued_fines").fetchone()[0]
+        conn.execute("DROP TABLE temp.accrued_fines")
+
+        set_state(conn, ACCRUAL_STATE, as_of)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return count
@@ -0,0 +1,268 @@
+import csv
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Optional
+
+from .errors import DuplicateError, ValidationError
+from .reference import MEMBER_STATUSES
+from .repository import _validate_email
+
+IMPORT_KINDS = ("books", "members")
+
+# Rows per executemany() call, and per transaction. Copying a transaction's
+# rows holds the pool's writer, so it has to stay well inside the pool's
+# checkout timeout: 20000 books take about a second and import as fast as
+# larger transactions. Handing the writer back between batches lets the
+# desks' own writes through while a big file is loading.
+IMPORT_BATCH_SIZE = 5000
+IMPORT_TRANSACTION_ROWS = 20000
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    rejected: int = 0
+    rejects_path: Optional[str] = None  # only set when rows were rejected
+    cancelled: bool = False
+
+
+def _field(record, *names):
+    # First non-empty value among a column's accepted names, stripped
+    for name in names:
+        value = (record.get(name) or "").strip()
+        if value:
+            return value
+    return None
+
+
+class BookRows:
+    # Turns CSV records into books rows. Accepted columns: title, author,
+    # isbn, publisher, publication_year (or year), category_name (or
+    # category), total_copies (or copies) and description.
+
+    table = "books"
+    duplicate = "A book with this ISBN already exists"
+    columns = ("title", "author", "isbn", "publisher", "publication_year", "category_id",
+               "total_copies", "available_copies", "description")
+
+    def __init__(self, conn):
+        # Preloaded once, so rows are checked without a query each
+        self.categories = {name.casefold(): category_id
+                           for category_id, name in conn.execute("SELECT category_id, category_name FROM categories")}
+        self.isbns = {row[0] for row in conn.execute("SELECT isbn FROM books WHERE isbn IS NOT NULL")}
+
+    def values(self, record):
+        title = _field(record, "title")
+        author = _field(record, "author")
+        if not title or not author:
+            raise ValidationError("Title and Author are required fields")
+
+        year = _field(record, "publication_year", "year")
+        if year is not None:
+            try:
+                year = int(year)
+            except ValueError:
+                raise ValidationError("Publication Year must be a number")
+
+        copies = _field(record, "total_copies", "copies")
+        try:
+            copies = int(copies) if copies is not None else 1
+        except ValueError:
+            copies = 0
+        if copies < 1:
+            raise ValidationError("Total Copies must be a positive number")
+
+        category = _field(record, "category_name", "category")
+        category_id = None
+        if category is not None:
+            category_id = self.categories.get(category.casefold())
+            if category_id is None:
+                raise ValidationError(f"Unknown category '{category}'")
+
+        isbn = _field(record, "isbn")
+        if isbn is not None:
+            if isbn in self.isbns:
+                raise DuplicateError(self.duplicate)
+            self.isbns.add(isbn)
+
+        return (title, author, isbn, _field(record, "publisher"), year, category_id,
+                copies, copies, _field(record, "description") or "")
+
+
+class MemberRows:
+    # Turns CSV records into members rows. Accepted columns: first_name,
+    # last_name, email, phone, address and membership_status (or status).
+
+    table = "members"
+    duplicate = "A member with this email already exists"
+    columns = ("first_name", "last_name", "email", "phone", "address", "membership_status")
+
+    def __init__(self, conn):
+        self.emails = {row[0] for row in conn.execute("SELECT email FROM members")}
+
+    def values(self, record):
+        first_name = _field(record, "first_name")
+        last_name = _field(record, "last_name")
+        email = _field(record, "email")
+        if not first_name or not last_name or not email:
+            raise ValidationError("First Name, Last Name and Email are required fields")
+        _validate_email(email)
+
+        status = (_field(record, "membership_status", "status") or "active").lower()
+        if status not in MEMBER_STATUSES:
+            raise ValidationError(f"Unknown membership status '{status}'")
+
+        if email in self.emails:
+            raise DuplicateError(self.duplicate)
+        self.emails.add(email)
+
+        return (first_name, last_name, email, _field(record, "phone"), _field(record, "address") or "", status)
+
+
+IMPORT_ROWS = {"books": BookRows, "members": MemberRows}
+
+
+def rejects_path_for(path):
+    # books.csv -> books.rejected.csv
+    root, ext = os.path.splitext(path)
+    return f"{root}.rejected{ext or '.csv'}"
+
+
+class _Rejects:
+    # CSV of rejected input rows with their line number and an extra
+    # "error" column, created on the first rejection
+
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self.fieldnames = list(fieldnames or []) + ["line", "error"]
+        self.file = None
+        self.writer = None
+        self.count = 0
+
+    def add(self, record, line, error):
+        if self.writer is None:
+            self.file = open(self.path, "w", newline="", encoding="utf-8")
+            self.writer = csv.DictWriter(self.file, self.fieldnames, extrasaction="ignore")
+            self.writer.writeheader()
+        self.writer.writerow({**record, "line": line, "error": error})
+        self.count += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def _flush(conn, rows, rejects):
+    # Move the staged rows into the real table with one INSERT ... SELECT.
+    # Inserting from a single statement keeps the FTS triggers' index
+    # updates in one pass instead of one flush per row, which is what makes
+    # executemany() straight into books several times slower. Duplicates
+    # were filtered out up front, but another desk may have added a
+    # clashing row since; then the rows are inserted one by one so only the
+    # clashing ones are rejected. Returns the number of rows inserted.
+    columns = ", ".join(rows.columns)
+    insert = f"INSERT INTO {rows.table} ({columns})"
+    conn.execute("SAVEPOINT import_flush")
+    try:
+        inserted = conn.execute(f"{insert} SELECT {columns} FROM temp.import_staging ORDER BY line").rowcount
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO import_flush")
+        inserted = 0
+        staged = conn.execute(f"SELECT line, {columns} FROM temp.import_staging ORDER BY line").fetchall()
+        placeholders = ", ".join("?" * len(rows.columns))
+        for line, *values in staged:
+            try:
+                conn.execute(f"{insert} VALUES ({placeholders})", values)
+                inserted += 1
+            except sqlite3.IntegrityError as err:
+                error = rows.duplicate if "UNIQUE" in str(err) else str(err)
+                rejects.add(dict(zip(rows.columns, values)), line, error)
+    conn.execute("RELEASE import_flush")
+    conn.execute("DELETE FROM temp.import_staging")
+    return inserted
+
+
+def import_csv(writer, kind, path, rejects_path=None, progress=None,
+               batch_size=IMPORT_BATCH_SIZE, transaction_rows=IMPORT_TRANSACTION_ROWS):
+    # Stream the CSV file at `path` into the books or members table. Rows
+    # that fail validation or duplicate an existing ISBN/email are written
+    # to `rejects_path` (default: <name>.rejected.csv next to the input)
+    # with the reason, and the rest are imported. `progress` (see
+    # reports.ExportProgress) gets the number of rows read so far and may
+    # cancel the import; rows already committed then stay imported.
+    #
+    # `writer` is called for every write and returns a context manager
+    # yielding the connection to use, e.g. ConnectionPool.writer; it must
+    # be the same connection each time. Valid rows are staged in a
+    # temporary table with executemany(), one batch per checkout, and
+    # copied into the real table every `transaction_rows` rows, one
+    # transaction and one checkout each, so neither the pool's writer nor
+    # the database's write lock is held while the file is being read.
+    if kind not in IMPORT_ROWS:
+        raise ValidationError(f"Unknown import type: {kind}")
+    result = ImportResult()
+
+    with writer() as conn:
+        rows = IMPORT_ROWS[kind](conn)
+        conn.execute("DROP TABLE IF EXISTS temp.import_staging")
+        conn.execute(f"CREATE TEMP TABLE import_staging (line INTEGER, {', '.join(rows.columns)})")
+    stage = f"INSERT INTO temp.import_staging VALUES ({', '.join('?' * (len(rows.columns) + 1))})"
+
+    def stage_batch(batch):
+        # Only touches the temporary table, so it never waits for the
+        # database's write lock
+        with writer() as conn:
+            conn.executemany(stage, batch)
+            conn.commit()
+
+    def copy_staged():
+        with writer() as conn:
+            try:
+                conn.execute("BEGIN")
+                inserted = _flush(conn, rows, rejects)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        result.imported += inserted
+
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.DictReader(file)
+        rejects = _Rejects(rejects_path or rejects_path_for(path), reader.fieldnames)
+        batch = []
+        staged = read = 0
+        try:
+            for read, record in enumerate(reader, 1):
+                try:
+                    batch.append((reader.line_num, *rows.values(record)))
+                except (ValidationError, DuplicateError) as err:
+                    rejects.add(record, reader.line_num, str(err))
+
+                if len(batch) >= batch_size:
+                    stage_batch(batch)
+                    staged += len(batch)
+                    batch = []
+                    if progress is not None:
+                        progress.rows = read
+                        if progress.cancelled.is_set():
+                            result.cancelled = True
+                            break
+                    if staged >= transaction_rows:
+                        copy_staged()
+                        staged = 0
+
+            if not result.cancelled:
+                stage_batch(batch)
+                copy_staged()
+                if progress is not None:
+                    progress.rows = read
+        finally:
+            rejects.close()
+            with writer() as conn:
+                conn.execute("DROP TABLE IF EXISTS temp.import_staging")
+
+    result.rejected = rejects.count
+    if rejects.count:
+        result.rejects_path = rejects.path
+    return result
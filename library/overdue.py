@@ -0,0 +1,47 @@
+import sqlite3
+from datetime import date
+
+from .state import get_state, set_state
+
+# maintenance_state entry holding the date the sweep has reached: every
+# issued loan due before it has already been marked overdue
+SWEEP_STATE = "overdue_sweep_until"
+
+
+def sweep_overdue(conn, today=None):
+    # Mark issued loans whose due date has passed as overdue, in a single
+    # UPDATE. Only loans that fell due since the previous sweep are
+    # examined: the (status, due_date) index turns the date window into one
+    # range scan, so a sweep costs the same however many loans are open.
+    # Loans issued with a due date already in the past are created overdue
+    # (see LibraryRepository.issue_book), so they never fall behind the mark.
+    #
+    # Due dates are stored as YYYY-MM-DD, older rows as full timestamps;
+    # both compare correctly against a YYYY-MM-DD bound as text. Returns the
+    # number of loans marked overdue.
+    today = (today or date.today()).isoformat()
+    try:
+        # Take the write lock up front so the mark and the update agree
+        conn.execute("BEGIN IMMEDIATE")
+        since = get_state(conn, SWEEP_STATE)
+        if since is not None and since >= today:
+            conn.rollback()
+            return 0
+
+        if since is None:
+            # First sweep on this database: everything due before today
+            cursor = conn.execute("""
+            UPDATE book_issues SET status = 'overdue'
+            WHERE status = 'issued' AND due_date < ?
+            """, (today,))
+        else:
+            cursor = conn.execute("""
+            UPDATE book_issues SET status = 'overdue'
+            WHERE status = 'issued' AND due_date >= ? AND due_date < ?
+            """, (since, today))
+        set_state(conn, SWEEP_STATE, today)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return cursor.rowcount
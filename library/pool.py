@@ -0,0 +1,190 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from .db import close, connect
+from .reference import ReferenceData
+from .repository import LibraryRepository
+
+# A connection idle for longer than this (seconds) is checked with a trivial
+# query before it is handed out again, and reopened if it fails
+HEALTH_CHECK_AFTER = 30
+
+# How long to wait for a free connection (seconds), matching the profile's
+# busy_timeout: waiting on the pool is waiting on a lock all the same
+CHECKOUT_TIMEOUT = 5
+
+
+class _Pooled:
+    # A pooled connection and when it was last returned
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.released = time.monotonic()
+
+
+class ConnectionPool:
+    # Connections to one database file shared by the threads of a process:
+    # a single writer connection, since SQLite only lets one writer in at a
+    # time anyway, and up to `readers` reader connections, which in WAL
+    # mode read alongside the writer without blocking it.
+    #
+    #   with pool.reader() as conn: ...     # queries
+    #   with pool.writer() as conn: ...     # anything that commits
+    #
+    # Checkouts are per thread and re-entrant: a thread that already holds
+    # a connection gets the same one back, and a thread holding the writer
+    # reads through it too, so it sees its own uncommitted changes. Reader
+    # connections are reused most-recently-returned first (their page cache
+    # is warmest) and any transaction left open is rolled back on return.
+
+    def __init__(self, database, readers=4, pragmas=None, timeout=CHECKOUT_TIMEOUT):
+        self.database = database
+        self.pragmas = pragmas
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.max_readers = readers
+        self.lock = threading.Lock()
+        self.write_lock = threading.RLock()
+        self.write_conn = None
+        self.local = threading.local()
+        self.closed = False
+        # Category lookups for every repository handed out, kept current
+        # through a connection of its own
+        self.reference = ReferenceData(self._connect)
+
+    def _connect(self):
+        return connect(self.database, check_same_thread=False, pragmas=self.pragmas)
+
+    def _healthy(self, pooled):
+        if time.monotonic() - pooled.released < HEALTH_CHECK_AFTER:
+            return True
+        try:
+            pooled.conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _checkout_reader(self):
+        try:
+            pooled = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                if self.closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+                grow = self.opened < self.max_readers
+                if grow:
+                    self.opened += 1
+            if grow:
+                try:
+                    return _Pooled(self._connect())
+                except BaseException:
+                    with self.lock:
+                        self.opened -= 1
+                    raise
+            try:
+                pooled = self.idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise sqlite3.OperationalError("No database connection available (all readers busy)")
+
+        if not self._healthy(pooled):
+            pooled.conn.close()
+            try:
+                pooled = _Pooled(self._connect())
+            except BaseException:
+                # The broken connection is gone; free its slot so the next
+                # checkout can open a new one
+                with self.lock:
+                    self.opened -= 1
+                raise
+        return pooled
+
+    @contextmanager
+    def reader(self):
+        held = getattr(self.local, "held", None)
+        if held is not None:
+            # Nested checkout: keep using this thread's connection
+            yield held
+            return
+
+        pooled = self._checkout_reader()
+        self.local.held = pooled.conn
+        try:
+            yield pooled.conn
+        finally:
+            self.local.held = None
+            try:
+                pooled.conn.rollback()
+            except sqlite3.Error:
+                # Broken; drop it and let the next checkout open a new one
+                pooled.conn.close()
+                with self.lock:
+                    self.opened -= 1
+            else:
+                if self.closed:
+                    close(pooled.conn)
+                else:
+                    pooled.released = time.monotonic()
+                    self.idle.put(pooled)
+
+    @contextmanager
+    def writer(self):
+        if not self.write_lock.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError("database is locked")
+        outer = getattr(self.local, "held", None)
+        try:
+            if self.closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            if self.write_conn is None or not self._healthy(self.write_conn):
+                if self.write_conn is not None:
+                    self.write_conn.conn.close()
+                self.write_conn = _Pooled(self._connect())
+            conn = self.write_conn.conn
+
+            self.local.held = conn
+            try:
+                yield conn
+            finally:
+                self.local.held = outer
+                if outer is not conn and conn.in_transaction:
+                    # Work the caller neither committed nor rolled back
+                    conn.rollback()
+                self.write_conn.released = time.monotonic()
+        finally:
+            self.write_lock.release()
+
+    @contextmanager
+    def repository(self, write=False):
+        # LibraryRepository bound to a checked-out connection
+        with (self.writer() if write else self.reader()) as conn:
+            yield LibraryRepository(conn, self.reference)
+
+    def read(self, fn, *args, **kwargs):
+        # fn(repo, *args) on a reader, e.g. pool.read(LibraryRepository.list_books)
+        with self.repository() as repo:
+            return fn(repo, *args, **kwargs)
+
+    def write(self, fn, *args, **kwargs):
+        # fn(repo, *args) on the writer, e.g. pool.write(LibraryRepository.add_book, ...)
+        with self.repository(write=True) as repo:
+            return fn(repo, *args, **kwargs)
+
+    def close(self):
+        # Close idle connections (running PRAGMA optimize on each) and the
+        # writer; connections still checked out are closed as they return
+        with self.lock:
+            self.closed = True
+        while True:
+            try:
+                pooled = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            close(pooled.conn)
+        with self.write_lock:
+            if self.write_conn is not None:
+                close(self.write_conn.conn)
+                self.write_conn = None
+        self.reference.close()
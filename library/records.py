@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+# Plain records returned by the repository. They carry the raw column values
+# as stored in SQLite; formatting for display is left to the caller. Records
+# use __slots__ instead of a per-instance __dict__: a Book then takes 112
+# bytes besides its values, against 160 with a __dict__ and 168 as the
+# sqlite3.Row it is built from (benchmarks/bench_record_memory.py).
+
+@dataclass(slots=True)
+class Category:
+    category_id: int
+    category_name: str
+
+
+@dataclass(slots=True)
+class Book:
+    book_id: int
+    title: str
+    author: str
+    isbn: Optional[str] = None
+    category_name: Optional[str] = None
+    total_copies: int = 1
+    available_copies: int = 1
+    publication_year: Optional[int] = None
+    cover_image: Optional[str] = None  # path of the cover image file
+
+
+@dataclass(slots=True)
+class Member:
+    member_id: int
+    first_name: str
+    last_name: str
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    membership_status: str = "active"
+    join_date: Optional[str] = None
+
+    @property
+    def full_name(self):
+        return f"{self.first_name} {self.last_name}"
+
+
+@dataclass(slots=True)
+class Issue:
+    issue_id: int
+    title: str
+    member_name: str
+    issue_date: Optional[str] = None
+    due_date: Optional[str] = None
+    status: str = "issued"
+
+
+@dataclass(slots=True)
+class Fine:
+    fine_id: int
+    issue_id: int
+    amount: float
+    fine_date: Optional[str] = None
+    payment_date: Optional[str] = None
+    payment_status: str = "unpaid"
+
+
+@dataclass(slots=True)
+class FinePolicy:
+    policy_id: int
+    category_name: Optional[str]  # None for the default policy
+    daily_rate: float
+    grace_days: int = 0
+    max_fine: Optional[float] = None
+
+
+@dataclass(slots=True)
+class LibraryStats:
+    # Dashboard counters, see stats.py
+    books: int = 0
+    total_copies: int = 0
+    available_copies: int = 0
+    active_members: int = 0
+    open_loans: int = 0
+    overdue_loans: int = 0
+    unpaid_fines: int = 0
+    unpaid_fine_amount: float = 0.0
+
+
+@dataclass(slots=True)
+class User:
+    user_id: int
+    username: str
+    full_name: str
+    email: str
+    role: str
+    last_login: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Changes:
+    # Rows changed since a change_log position, see changes.py
+    last_seq: int
+    changed: dict  # table name -> set of row ids
+    complete: bool = True  # False when the changes could not all be listed
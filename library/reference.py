@@ -0,0 +1,82 @@
+import sqlite3
+import threading
+
+from .records import Category
+
+# Fixed by CHECK constraints in the schema, so they never need reloading
+USER_ROLES = ("admin", "librarian", "staff")
+MEMBER_STATUSES = ("active", "inactive", "suspended")
+
+
+class ReferenceData:
+    # In-process cache of the categories, so dialogs and saves that look a
+    # category up by name (or id) stop querying the table every time.
+    #
+    # Lookups run on a connection of its own, never one of the pool's, and
+    # check for changes in two steps. PRAGMA data_version changes whenever
+    # any other connection, in this process or another desk's, commits to
+    # the database; it costs no query plan and no table access. Only when
+    # it moved is the categories counter in reference_versions read, which
+    # triggers bump on every change to the categories, and the few category
+    # rows are reloaded only when that counter moved too. Lookups come from
+    # the GUI and from worker threads, hence the lock.
+
+    def __init__(self, connect):
+        self.connect = connect
+        self.conn = None
+        self.data_version = None
+        self.version = None
+        self.categories = []
+        self.ids_by_name = {}
+        self.names_by_id = {}
+        self.lock = threading.Lock()
+
+    def _refresh(self):
+        if self.conn is None:
+            self.conn = self.connect()
+        try:
+            # Each value is read before what it guards: a commit landing in
+            # between is then seen again by the next check
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self.data_version:
+                return
+            version = self.conn.execute(
+                "SELECT version FROM reference_versions WHERE name = 'categories'").fetchone()[0]
+            if version == self.version:
+                self.data_version = data_version
+                return
+            rows = self.conn.execute(
+                "SELECT category_id, category_name FROM categories ORDER BY category_name").fetchall()
+        except sqlite3.Error:
+            self.conn.close()
+            self.conn = None
+            self.data_version = None
+            raise
+        self.categories = [Category(*row) for row in rows]
+        self.ids_by_name = {category.category_name: category.category_id for category in self.categories}
+        self.names_by_id = {category.category_id: category.category_name for category in self.categories}
+        self.data_version = data_version
+        self.version = version
+
+    def get_categories(self):
+        with self.lock:
+            self._refresh()
+            return list(self.categories)
+
+    def category_id(self, category_name):
+        with self.lock:
+            self._refresh()
+            return self.ids_by_name.get(category_name)
+
+    def category_name(self, category_id):
+        with self.lock:
+            self._refresh()
+            return self.names_by_id.get(category_id)
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+                self.data_version = None
+                self.version = None
@@ -0,0 +1,340 @@
+import csv
+import gzip
+import io
+import os
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+from .dates import to_date
+from .errors import ExportCancelled, ValidationError
+from .rollups import ROLLED_UP_UNTIL
+
+# Report definitions shared by the GUI and the command line: report type ->
+# query. {period} is replaced by the date-range condition built from
+# REPORT_DATE_COLUMNS (or by 1 when no range is given), each time it
+# appears.
+#
+# The popularity and fine total reports read the daily rollups (see
+# rollups.py) for the days before {rolled_up} and the live tables only for
+# the days since, so their cost depends on the number of days in the range
+# rather than the number of loans. Loans still overdue are counted live;
+# overdue loans are few and that state keeps changing.
+# Without statistics the planner would rather walk a whole book_issues index
+# in book order than group the few recent loans, so the books report
+# materializes the recent loans first: on their own they can only be found
+# by issue date.
+REPORT_QUERIES = {
+    "books": """
+    WITH recent AS MATERIALIZED (
+        SELECT book_id, date(issue_date) AS day FROM book_issues WHERE issue_date >= {rolled_up}
+    )
+    SELECT b.title, b.author, c.category_name, b.total_copies, b.available_copies,
+           (SELECT COALESCE(SUM(r.loans), 0) FROM daily_book_loans r
+            WHERE r.book_id = b.book_id AND r.day < {rolled_up} AND {period})
+           + COALESCE(l.loans, 0) as times_borrowed
+    FROM books b
+    LEFT JOIN categories c ON b.category_id = c.category_id
+    LEFT JOIN (
+        SELECT r.book_id, COUNT(*) AS loans
+        FROM recent r
+        WHERE {period}
+        GROUP BY r.book_id
+    ) l ON l.book_id = b.book_id
+    ORDER BY times_borrowed DESC
+    """,
+    "members": """
+    SELECT m.first_name || ' ' || m.last_name as name,
+           m.email, m.membership_status,
+           (SELECT COALESCE(SUM(r.loans), 0) FROM daily_member_loans r
+            WHERE r.member_id = m.member_id AND r.day < {rolled_up} AND {period})
+           + COALESCE(l.loans, 0) as books_borrowed,
+           COALESCE(l.overdue, 0) as overdue_books
+    FROM members m
+    LEFT JOIN (
+        SELECT r.member_id, SUM(r.loans) AS loans, SUM(r.overdue) AS overdue
+        FROM (
+            SELECT member_id, date(issue_date) AS day, 1 AS loans, 0 AS overdue
+            FROM book_issues WHERE issue_date >= {rolled_up}
+            UNION ALL
+            SELECT member_id, date(issue_date), 0, 1 FROM book_issues WHERE status = 'overdue'
+        ) r
+        WHERE {period}
+        GROUP BY r.member_id
+    ) l ON l.member_id = m.member_id
+    ORDER BY books_borrowed DESC
+    """,
+    "categories": """
+    SELECT COALESCE(c.category_name, 'Uncategorized') as category_name,
+           SUM(r.loans) as times_borrowed
+    FROM (
+        SELECT day, category_id, loans FROM daily_category_loans WHERE day < {rolled_up}
+        UNION ALL
+        SELECT date(bi.issue_date), COALESCE(b.category_id, 0), 1
+        FROM book_issues bi JOIN books b ON bi.book_id = b.book_id
+        WHERE bi.issue_date >= {rolled_up}
+    ) r
+    LEFT JOIN categories c ON c.category_id = r.category_id
+    WHERE {period}
+    GROUP BY r.category_id
+    ORDER BY times_borrowed DESC
+    """,
+    "fine_totals": """
+    SELECT r.day, SUM(r.loans_fined) as loans_fined, ROUND(SUM(r.charged), 2) as amount_charged,
+           SUM(r.fines_paid) as fines_paid, ROUND(SUM(r.collected), 2) as amount_collected
+    FROM (
+        SELECT day, loans_fined, amount_charged AS charged, fines_paid, amount_collected AS collected
+        FROM daily_fines WHERE day < {rolled_up}
+        UNION ALL
+        SELECT date(return_date), 1, fine_amount, 0, 0 FROM book_issues
+        WHERE return_date IS NOT NULL AND return_date >= {rolled_up} AND fine_amount > 0
+        UNION ALL
+        SELECT date(payment_date), 0, 0, 1, amount FROM fines
+        WHERE payment_status = 'paid' AND payment_date >= {rolled_up}
+    ) r
+    WHERE {period}
+    GROUP BY r.day
+    ORDER BY r.day
+    """,
+    "circulation": """
+    SELECT b.title, m.first_name || ' ' || m.last_name as member_name,
+           bi.issue_date, bi.due_date, bi.return_date, bi.status
+    FROM book_issues bi
+    JOIN books b ON bi.book_id = b.book_id
+    JOIN members m ON bi.member_id = m.member_id
+    WHERE {period}
+    ORDER BY bi.issue_date DESC
+    """,
+    "overdue": """
+    SELECT b.title, m.first_name || ' ' || m.last_name as member_name,
+           bi.issue_date, bi.due_date,
+           julianday('now') - julianday(bi.due_date) as days_overdue
+    FROM book_issues bi
+    JOIN books b ON bi.book_id = b.book_id
+    JOIN members m ON bi.member_id = m.member_id
+    WHERE bi.status = 'overdue' AND {period}
+    ORDER BY days_overdue DESC
+    """,
+    "fines": """
+    SELECT m.first_name || ' ' || m.last_name as member_name,
+           b.title, f.amount, f.fine_date, f.payment_status
+    FROM fines f
+    JOIN book_issues bi ON f.issue_id = bi.issue_id
+    JOIN books b ON bi.book_id = b.book_id
+    JOIN members m ON bi.member_id = m.member_id
+    WHERE {period}
+    ORDER BY f.fine_date DESC
+    """,
+}
+
+# Column that --since/--until filter on for each report
+REPORT_DATE_COLUMNS = {
+    "books": "r.day",
+    "members": "r.day",
+    "categories": "r.day",
+    "fine_totals": "r.day",
+    "circulation": "bi.issue_date",
+    "overdue": "bi.due_date",
+    "fines": "f.fine_date",
+}
+
+# Column types for typed (columnar) output, in query column order
+REPORT_COLUMN_TYPES = {
+    "books": ("text", "text", "text", "int", "int", "int"),
+    "members": ("text", "text", "text", "int", "int"),
+    "categories": ("text", "int"),
+    "fine_totals": ("date", "int", "decimal", "int", "decimal"),
+    "circulation": ("text", "text", "timestamp", "date", "timestamp", "text"),
+    "overdue": ("text", "text", "timestamp", "date", "float"),
+    "fines": ("text", "text", "decimal", "timestamp", "text"),
+}
+
+REPORT_TYPES = tuple(REPORT_QUERIES)
+
+# Output formats by file extension. csv.zst needs the zstandard package and
+# parquet needs pyarrow; both are optional.
+EXPORT_FORMATS = ("csv", "csv.gz", "csv.zst", "parquet")
+
+# Rows fetched from SQLite per batch while exporting
+EXPORT_BATCH_SIZE = 5000
+
+# Write buffer for export files
+EXPORT_BUFFER_SIZE = 1 << 20
+
+# Compression levels: fast settings, since exports are written far more
+# often than they are archived
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+class ExportProgress:
+    # Shared between the exporting (or importing) thread and the GUI: the
+    # worker updates `rows` after every batch, the GUI reads it and may call
+    # cancel()
+
+    def __init__(self):
+        self.rows = 0
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+def report_query(report_type, since=None, until=None):
+    # SQL and parameters for a report limited to [since, until). Dates are
+    # 'YYYY-MM-DD' strings, which compare correctly against stored timestamps.
+    if report_type not in REPORT_QUERIES:
+        raise ValidationError(f"Unknown report type: {report_type}")
+
+    column = REPORT_DATE_COLUMNS[report_type]
+    conditions = []
+    params = []
+    if since:
+        conditions.append(f"{column} >= ?")
+        params.append(since)
+    if until:
+        conditions.append(f"{column} < ?")
+        params.append(until)
+    period = " AND ".join(conditions) if conditions else "1"
+    sql = REPORT_QUERIES[report_type]
+    return sql.format(period=period, rolled_up=ROLLED_UP_UNTIL), params * sql.count("{period}")
+
+
+def open_report(conn, report_type, since=None, until=None):
+    # Cursor positioned at the start of the report, plus its column names
+    sql, params = report_query(report_type, since, until)
+    cursor = conn.execute(sql, params)
+    headers = [description[0] for description in cursor.description]
+    return cursor, headers
+
+
+def export_format(path):
+    # Output format implied by a file name, defaulting to plain CSV
+    for fmt in sorted(EXPORT_FORMATS, key=len, reverse=True):
+        if path.endswith("." + fmt):
+            return fmt
+    return "csv"
+
+
+def _require(module, fmt):
+    try:
+        return __import__(module)
+    except ImportError:
+        raise ValidationError(f"The {fmt} format needs the '{module}' package (pip install {module})")
+
+
+class CsvReportWriter:
+    # Plain, gzip- or zstd-compressed CSV
+
+    def __init__(self, path, fmt, headers, column_types):
+        if fmt == "csv.gz":
+            self.file = gzip.open(path, 'wt', newline='', encoding='utf-8', compresslevel=GZIP_LEVEL)
+        elif fmt == "csv.zst":
+            zstandard = _require("zstandard", fmt)
+            raw = open(path, 'wb')
+            stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw)
+            self.file = io.TextIOWrapper(io.BufferedWriter(stream, EXPORT_BUFFER_SIZE),
+                                         encoding='utf-8', newline='')
+        else:
+            self.file = open(path, 'w', newline='', encoding='utf-8', buffering=EXPORT_BUFFER_SIZE)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(headers)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+def _to_timestamp(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _to_decimal(value):
+    return Decimal(str(value)).quantize(Decimal("0.01")) if value is not None else None
+
+
+class ParquetReportWriter:
+    # Columnar Parquet output with typed columns. Every batch becomes its own
+    # row group, so memory use stays bounded by the batch size.
+
+    CONVERTERS = {
+        "date": to_date,
+        "timestamp": _to_timestamp,
+        "decimal": _to_decimal,
+    }
+
+    def __init__(self, path, fmt, headers, column_types):
+        pa = _require("pyarrow", fmt)
+        import pyarrow.parquet as pq
+
+        arrow_types = {
+            "text": pa.string(),
+            "int": pa.int64(),
+            "float": pa.float64(),
+            "date": pa.date32(),
+            "timestamp": pa.timestamp("s"),
+            "decimal": pa.decimal128(10, 2),
+        }
+        self.pa = pa
+        self.column_types = column_types
+        self.schema = pa.schema([(name, arrow_types[kind]) for name, kind in zip(headers, column_types)])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, rows):
+        arrays = []
+        for index, (kind, field) in enumerate(zip(self.column_types, self.schema)):
+            values = [row[index] for row in rows]
+            convert = self.CONVERTERS.get(kind)
+            if convert:
+                values = [convert(value) for value in values]
+            arrays.append(self.pa.array(values, type=field.type))
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_report_writer(path, fmt, headers, column_types):
+    if fmt not in EXPORT_FORMATS:
+        raise ValidationError(f"Unknown export format: {fmt}")
+    if fmt == "parquet":
+        return ParquetReportWriter(path, fmt, headers, column_types)
+    return CsvReportWriter(path, fmt, headers, column_types)
+
+
+def export_report(conn, report_type, path, progress=None, since=None, until=None,
+                  fmt=None, batch_size=EXPORT_BATCH_SIZE):
+    # Stream a report into a file batch by batch, so memory use does not grow
+    # with the size of the report. The format follows the file extension
+    # unless fmt is given. The file is written next to `path` and only moved
+    # into place once complete; a cancelled or failed export leaves nothing
+    # behind. Returns the number of data rows written.
+    fmt = fmt or export_format(path)
+    cursor, headers = open_report(conn, report_type, since, until)
+    partial_path = path + ".part"
+    count = 0
+    try:
+        writer = open_report_writer(partial_path, fmt, headers, REPORT_COLUMN_TYPES[report_type])
+        try:
+            while True:
+                if progress and progress.cancelled.is_set():
+                    raise ExportCancelled("Export cancelled")
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                writer.write(rows)
+                count += len(rows)
+                if progress:
+                    progress.rows = count
+        finally:
+            writer.close()
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    finally:
+        cursor.close()
+    return count
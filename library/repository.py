@@ -0,0 +1,824 @@
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import time
+from datetime import date, datetime
+
+from .errors import ConflictError, DuplicateError, NotFoundError, ValidationError
+from .fines import ACCRUAL_STATE, accrued_fines_query
+from .records import Book, Category, Fine, FinePolicy, Issue, LibraryStats, Member, User
+from .stats import read_stats
+
+EMAIL_PATTERN = re.compile(r"[^@]+@[^@]+\.[^@]+")
+
+# Text a barcode scanner sends for an ISBN: ten or thirteen digits (an
+# ISBN-10 may end in X), possibly with the hyphens or spaces of the
+# printed form
+ISBN_PATTERN = re.compile(r"^[0-9][0-9 -]{8,}[0-9Xx]$")
+
+# SQL expression comparing ISBNs without their hyphens and spaces, so
+# '9780321714114' finds '978-0-321-71411-4'. idx_books_isbn_key indexes it;
+# queries must spell it the same way to use the index.
+ISBN_KEY = "replace(replace(upper(isbn), '-', ''), ' ', '')"
+
+# Maximum number of rows returned by a full-text search
+SEARCH_LIMIT = 200
+
+# Default number of rows fetched per page by the list_*_page methods
+PAGE_SIZE = 100
+
+# Default number of suggestions returned for type-ahead fields
+SUGGEST_LIMIT = 20
+
+# Searches only rank their matches by relevance once a word is this long. A
+# one or two letter prefix matches much of the catalogue, and scoring every
+# match took 0.25-0.3 s on 300k books at every keystroke; shorter terms
+# return the first matches the index finds instead.
+RANKED_PREFIX = 3
+
+# Circulation writes that still find the database locked once the
+# connection's busy_timeout has run out are retried this many times, waiting
+# BUSY_BACKOFF seconds before the first retry and twice as long (with some
+# jitter, so the desks don't retry in step) before each one after that
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.05
+
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def fts_query(search_term):
+    # Turn free text into an FTS5 query where every word must match as a
+    # prefix, e.g. 'tolk lord' -> '"tolk"* "lord"*'. Words are quoted so
+    # FTS5 operators and punctuation in the input are taken literally.
+    # Single characters match whole tokens only (initials), since the prefix
+    # indexes start at two characters.
+    terms = []
+    for word in search_term.split():
+        term = '"' + word.replace('"', '""') + '"'
+        terms.append(term + "*" if len(word) > 1 else term)
+    return " ".join(terms)
+
+
+def _ranked(search_term):
+    # Whether a search is specific enough to score every match
+    return any(len(word) >= RANKED_PREFIX for word in search_term.split())
+
+
+def isbn_key(text):
+    # Normalized form of scanned or typed text if it looks like an ISBN
+    # (digits and a final X only), else None
+    text = text.strip()
+    if not ISBN_PATTERN.match(text):
+        return None
+    key = re.sub(r"[^0-9X]", "", text.upper())
+    return key if len(key) in (10, 13) else None
+
+
+def _is_busy(err):
+    # "database is locked": another connection holds the write lock
+    code = getattr(err, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF == sqlite3.SQLITE_BUSY
+    return "locked" in str(err)
+
+
+def _id_filter(ids):
+    # Extra FTS condition restricting matches to a list of rowids
+    if ids is None:
+        return "", ()
+    return " AND rowid IN (SELECT value FROM json_each(?))", (json.dumps(list(ids)),)
+
+
+def _validate_email(email):
+    if not EMAIL_PATTERN.match(email):
+        raise ValidationError("Please enter a valid email address")
+
+
+class LibraryRepository:
+    # Data-access layer for the library database. Every method works on the
+    # connection it was given, returns plain records and raises LibraryError
+    # subclasses (or sqlite3.Error) instead of talking to the user, so it can
+    # be driven without a Tk root.
+
+    def __init__(self, conn, reference=None):
+        self.conn = conn
+        # Optional ReferenceData serving category lookups from memory
+        self.reference = reference
+
+    def _query(self, sql, params=()):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _write_transaction(self, work):
+        # Run work(cursor) as one BEGIN IMMEDIATE ... COMMIT transaction and
+        # return its result. Taking the write lock before the first read
+        # means nothing read inside can change before the commit, and a
+        # conflicting desk waits at BEGIN rather than failing halfway.
+        # SQLITE_BUSY is retried with backoff; anything else rolls back and
+        # is raised.
+        for attempt in range(BUSY_RETRIES + 1):
+            cursor = self.conn.cursor()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                result = work(cursor)
+                self.conn.commit()
+                return result
+            except sqlite3.OperationalError as err:
+                self.conn.rollback()
+                if not _is_busy(err) or attempt == BUSY_RETRIES:
+                    raise
+            except BaseException:
+                self.conn.rollback()
+                raise
+            finally:
+                cursor.close()
+            time.sleep(BUSY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    def _page(self, sql, key_columns, after=None, before=None, limit=None,
+              descending=False, where=None, params=()):
+        # Keyset pagination: fetch the `limit` rows that follow `after` (or
+        # precede `before`) in key order. Keys are tuples of the values of
+        # key_columns, which must end in a unique column. Rows are always
+        # returned in display order.
+        conditions = [where] if where else []
+        params = list(params)
+        backwards = before is not None
+        bound = before if backwards else after
+        if bound is not None:
+            # Moving towards larger keys uses '>', unless the order is descending
+            op = "<" if descending != backwards else ">"
+            conditions.append("({}) {} ({})".format(
+                ", ".join(key_columns), op, ", ".join("?" * len(key_columns))))
+            params.extend(bound)
+        direction = "DESC" if descending != backwards else "ASC"
+
+        if conditions:
+            sql += "WHERE " + " AND ".join(conditions) + "\n"
+        sql += "ORDER BY " + ", ".join(f"{column} {direction}" for column in key_columns)
+        sql += "\nLIMIT ?"
+        params.append(limit or PAGE_SIZE)
+
+        rows = self._query(sql, params)
+        if backwards:
+            rows.reverse()
+        return rows
+
+    def _query_one(self, sql, params=()):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+    # ---------------------------------------------------------------- users
+
+    def authenticate(self, username, password):
+        if not username or not password:
+            raise ValidationError("Please enter both username and password")
+
+        row = self._query_one("""
+        SELECT user_id, username, full_name, email, role, last_login
+        FROM users
+        WHERE username = ? AND password_hash = ?
+        """, (username, hash_password(password)))
+
+        if not row:
+            return None
+
+        # Update last login time
+        self.conn.execute("""
+        UPDATE users SET last_login = CURRENT_TIMESTAMP
+        WHERE user_id = ?
+        """, (row['user_id'],))
+        self.conn.commit()
+        return User(*row)
+
+    USER_COLUMNS = """
+    SELECT user_id, username, full_name, email, role, last_login
+    FROM users
+    """
+
+    def list_users(self):
+        rows = self._query(self.USER_COLUMNS + "ORDER BY username")
+        return [User(*row) for row in rows]
+
+    def list_users_page(self, after=None, before=None, limit=None):
+        # Keyed by (username,)
+        rows = self._page(self.USER_COLUMNS, ("username",), after, before, limit)
+        return [User(*row) for row in rows]
+
+    def add_user(self, username, password, full_name, email, role):
+        if not username or not password or not full_name or not email or not role:
+            raise ValidationError("All fields are required")
+        _validate_email(email)
+
+        try:
+            cursor = self.conn.execute("""
+            INSERT INTO users (username, password_hash, full_name, email, role)
+            VALUES (?, ?, ?, ?, ?)
+            """, (username, hash_password(password), full_name, email, role))
+            self.conn.commit()
+        except sqlite3.IntegrityError:
+            self.conn.rollback()
+            raise DuplicateError("Username or email already exists")
+        return cursor.lastrowid
+
+    # ----------------------------------------------------------- categories
+
+    def _cached_reference(self):
+        # The cache only sees committed rows, so a transaction in progress
+        # on this connection reads the table itself
+        if self.reference is None or self.conn.in_transaction:
+            return None
+        return self.reference
+
+    def get_categories(self):
+        reference = self._cached_reference()
+        if reference is not None:
+            return reference.get_categories()
+        rows = self._query("SELECT category_id, category_name FROM categories ORDER BY category_name")
+        return [Category(*row) for row in rows]
+
+    def get_category_id(self, category_name):
+        reference = self._cached_reference()
+        if reference is not None:
+            return reference.category_id(category_name)
+        row = self._query_one("SELECT category_id FROM categories WHERE category_name = ?", (category_name,))
+        return row[0] if row else None
+
+    # ---------------------------------------------------------------- books
+
+    BOOK_COLUMNS = """
+    SELECT b.book_id, b.title, b.author, b.isbn, c.category_name,
+           b.total_copies, b.available_copies, b.publication_year, b.cover_image
+    FROM books b
+    LEFT JOIN categories c ON b.category_id = c.category_id
+    """
+
+    def list_books(self):
+        rows = self._query(self.BOOK_COLUMNS + "ORDER BY b.title")
+        return [Book(*row) for row in rows]
+
+    def list_books_page(self, after=None, before=None, limit=None):
+        # Keyed by (title, book_id)
+        rows = self._page(self.BOOK_COLUMNS, ("b.title", "b.book_id"), after, before, limit)
+        return [Book(*row) for row in rows]
+
+    def search_books(self, search_term, limit=None, within=None):
+        # Prefix match over the books_fts index, best bm25 matches first.
+        # Title and author hits weigh more than publisher or description.
+        # Every match is scored before the best are kept, so the best hit is
+        # never missed; terms too short to rank (see RANKED_PREFIX) take the
+        # first matches unscored.
+        # `within` restricts the search to a list of book ids, e.g. the
+        # results of a shorter search term that this one refines.
+        match = fts_query(search_term)
+        if not match:
+            return []
+        id_filter, params = _id_filter(within)
+        rows = self._query("""
+        SELECT b.book_id, b.title, b.author, b.isbn, c.category_name,
+               b.total_copies, b.available_copies, b.publication_year, b.cover_image
+        FROM (
+            SELECT rowid, bm25(books_fts, 10.0, 8.0, 5.0, 2.0, 1.0) AS score
+            FROM books_fts
+            WHERE books_fts MATCH ?{id_filter}
+            {order}
+            LIMIT ?
+        ) hits
+        JOIN books b ON b.book_id = hits.rowid
+        LEFT JOIN categories c ON b.category_id = c.category_id
+        ORDER BY hits.score
+        """.format(id_filter=id_filter, order="ORDER BY score" if _ranked(search_term) else ""),
+            (match, *params, limit or SEARCH_LIMIT))
+        return [Book(*row) for row in rows]
+
+    def books_by_ids(self, book_ids):
+        # Current rows for the given ids, in the order given
+        rows = self._query(self.BOOK_COLUMNS + """
+        WHERE b.book_id IN (SELECT value FROM json_each(?))
+        """, (json.dumps(list(book_ids)),))
+        by_id = {row['book_id']: Book(*row) for row in rows}
+        return [by_id[book_id] for book_id in book_ids if book_id in by_id]
+
+    def suggest_available_books(self, search_term, limit=SUGGEST_LIMIT):
+        # Type-ahead for the issue dialog: available books whose words start
+        # with the typed words, best matches first. Every match is scored,
+        # as in search_books, and unavailable ones are skipped before the
+        # limit so they cannot crowd out the books that can be issued.
+        match = fts_query(search_term)
+        if not match:
+            return []
+        rows = self._query("""
+        SELECT b.book_id, b.title, b.author
+        FROM books_fts
+        JOIN books b ON b.book_id = books_fts.rowid
+        WHERE books_fts MATCH ? AND b.available_copies > 0
+        {order}
+        LIMIT ?
+        """.format(order="ORDER BY bm25(books_fts, 10.0, 8.0, 5.0, 2.0, 1.0)" if _ranked(search_term) else ""),
+            (match, limit))
+        return [Book(*row) for row in rows]
+
+    def find_book_by_isbn(self, isbn):
+        # Exact lookup for scanned barcodes, ignoring hyphens and spaces on
+        # both sides. Returns the Book, or None when no book has that ISBN
+        # (or the text is not an ISBN at all).
+        key = isbn_key(isbn)
+        if key is None:
+            return None
+        row = self._query_one(self.BOOK_COLUMNS + f"WHERE isbn IS NOT NULL AND {ISBN_KEY} = ?", (key,))
+        return Book(*row) if row else None
+
+    def add_book(self, title, author, isbn=None, publisher=None, year=None,
+                 category=None, copies=None, description="", cover_image=None):
+        if not title or not author:
+            raise ValidationError("Title and Author are required fields")
+
+        # Validate year and copies
+        pub_year = None
+        if year:
+            try:
+                pub_year = int(year)
+            except ValueError:
+                raise ValidationError("Publication Year must be a number")
+
+        total_copies = 1
+        if copies:
+            try:
+                total_copies = int(copies)
+            except ValueError:
+                total_copies = 0
+            if total_copies < 1:
+                raise ValidationError("Total Copies must be a positive number")
+
+        # Get category_id from category_name
+        category_id = self.get_category_id(category) if category else None
+
+        try:
+            cursor = self.conn.execute("""
+            INSERT INTO books (title, author, isbn, publisher, publication_year, category_id,
+                              total_copies, available_copies, description, cover_image)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                title, author, isbn, publisher, pub_year, category_id,
+                total_copies, total_copies, (description or "").strip(), cover_image or None
+            ))
+            self.conn.commit()
+        except sqlite3.IntegrityError:
+            self.conn.rollback()
+            raise DuplicateError("A book with this ISBN already exists")
+        return cursor.lastrowid
+
+    # -------------------------------------------------------------- members
+
+    MEMBER_COLUMNS = """
+    SELECT member_id, first_name, last_name, email, phone, membership_status, join_date
+    FROM members
+    """
+
+    def list_members(self):
+        rows = self._query(self.MEMBER_COLUMNS + "ORDER BY first_name, last_name")
+        return [Member(*row) for row in rows]
+
+    def list_members_page(self, after=None, before=None, limit=None):
+        # Keyed by (first_name, last_name, member_id)
+        rows = self._page(self.MEMBER_COLUMNS, ("first_name", "last_name", "member_id"),
+                          after, before, limit)
+        return [Member(*row) for row in rows]
+
+    def search_members(self, search_term, limit=None, within=None):
+        match = fts_query(search_term)
+        if not match:
+            return []
+        id_filter, params = _id_filter(within)
+        rows = self._query("""
+        SELECT m.member_id, m.first_name, m.last_name, m.email, m.phone,
+               m.membership_status, m.join_date
+        FROM (
+            SELECT rowid, bm25(members_fts, 5.0, 5.0, 2.0, 1.0) AS score
+            FROM members_fts
+            WHERE members_fts MATCH ?{id_filter}
+            {order}
+            LIMIT ?
+        ) hits
+        JOIN members m ON m.member_id = hits.rowid
+        ORDER BY hits.score
+        """.format(id_filter=id_filter, order="ORDER BY score" if _ranked(search_term) else ""),
+            (match, *params, limit or SEARCH_LIMIT))
+        return [Member(*row) for row in rows]
+
+    def members_by_ids(self, member_ids):
+        # Current rows for the given ids, in the order given
+        rows = self._query(self.MEMBER_COLUMNS + """
+        WHERE member_id IN (SELECT value FROM json_each(?))
+        """, (json.dumps(list(member_ids)),))
+        by_id = {row['member_id']: Member(*row) for row in rows}
+        return [by_id[member_id] for member_id in member_ids if member_id in by_id]
+
+    def suggest_members(self, search_term, limit=SUGGEST_LIMIT, status=None):
+        # Type-ahead for the circulation dialogs: members matching the typed
+        # words by name, email or phone, optionally only those with the
+        # given membership status
+        match = fts_query(search_term)
+        if not match:
+            return []
+        rows = self._query("""
+        SELECT m.member_id, m.first_name, m.last_name
+        FROM members_fts
+        JOIN members m ON m.member_id = members_fts.rowid
+        WHERE members_fts MATCH ? AND (? IS NULL OR m.membership_status = ?)
+        {order}
+        LIMIT ?
+        """.format(order="ORDER BY bm25(members_fts, 5.0, 5.0, 2.0, 1.0)" if _ranked(search_term) else ""),
+            (match, status, status, limit))
+        return [Member(*row) for row in rows]
+
+    def suggest_active_members(self, search_term, limit=SUGGEST_LIMIT):
+        # Only active members may borrow
+        return self.suggest_members(search_term, limit, status="active")
+
+    def _validate_member(self, first_name, last_name, email):
+        if not first_name or not last_name or not email:
+            raise ValidationError("First Name, Last Name and Email are required fields")
+        _validate_email(email)
+
+    def add_member(self, first_name, last_name, email, phone=None, address="", status="active"):
+        self._validate_member(first_name, last_name, email)
+
+        try:
+            cursor = self.conn.execute("""
+            INSERT INTO members (first_name, last_name, email, phone, address, membership_status)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (first_name, last_name, email, phone, (address or "").strip(), status))
+            self.conn.commit()
+        except sqlite3.IntegrityError:
+            self.conn.rollback()
+            raise DuplicateError("A member with this email already exists")
+        return cursor.lastrowid
+
+    def update_member(self, member_id, first_name, last_name, email, phone=None, address="", status="active"):
+        self._validate_member(first_name, last_name, email)
+
+        try:
+            self.conn.execute("""
+            UPDATE members
+            SET first_name = ?, last_name = ?, email = ?, phone = ?,
+                address = ?, membership_status = ?
+            WHERE member_id = ?
+            """, (first_name, last_name, email, phone, (address or "").strip(), status, member_id))
+            self.conn.commit()
+        except sqlite3.IntegrityError:
+            self.conn.rollback()
+            raise DuplicateError("A member with this email already exists")
+
+    def delete_member(self, member_id):
+        # Check if member has any active book issues
+        row = self._query_one("""
+        SELECT COUNT(*) FROM book_issues
+        WHERE member_id = ? AND status IN ('issued', 'overdue')
+        """, (member_id,))
+
+        if row[0] > 0:
+            raise ConflictError("Cannot delete member who has books issued")
+
+        try:
+            self.conn.execute("DELETE FROM members WHERE member_id = ?", (member_id,))
+            self.conn.commit()
+        except sqlite3.IntegrityError:
+            # Foreign keys are enforced, and returned loans still refer to
+            # the member
+            self.conn.rollback()
+            raise ConflictError("Cannot delete a member with past loans; set their status to inactive instead")
+
+    # ---------------------------------------------------------- circulation
+
+    ISSUE_COLUMNS = """
+    SELECT bi.issue_id, b.title, m.first_name || ' ' || m.last_name as member_name,
+           bi.issue_date, bi.due_date, bi.status
+    FROM book_issues bi
+    JOIN books b ON bi.book_id = b.book_id
+    JOIN members m ON bi.member_id = m.member_id
+    """
+
+    def list_current_issues(self):
+        rows = self._query(self.ISSUE_COLUMNS + """
+        WHERE bi.status IN ('issued', 'overdue')
+        ORDER BY bi.issue_date DESC
+        """)
+        return [Issue(*row) for row in rows]
+
+    def issues_by_ids(self, issue_ids):
+        # Current rows for the given loans, newest first like the
+        # circulation table
+        rows = self._query(self.ISSUE_COLUMNS + """
+        WHERE bi.issue_id IN (SELECT value FROM json_each(?))
+        ORDER BY bi.issue_date DESC, bi.issue_id DESC
+        """, (json.dumps(list(issue_ids)),))
+        return [Issue(*row) for row in rows]
+
+    def list_member_issues(self, member_id):
+        # A member's open loans, oldest due first
+        rows = self._query(self.ISSUE_COLUMNS + """
+        WHERE bi.member_id = ? AND bi.status IN ('issued', 'overdue')
+        ORDER BY bi.due_date, bi.issue_id
+        """, (member_id,))
+        return [Issue(*row) for row in rows]
+
+    def suggest_open_issues(self, search_term, limit=SUGGEST_LIMIT):
+        # Type-ahead for the return dialog: open loans whose book or
+        # borrower matches the typed words, or whose loan number was typed
+        # (with or without the leading #), that loan first and the rest
+        # oldest due first
+        match = fts_query(search_term)
+        if not match:
+            return []
+        number = search_term.strip().lstrip("#")
+        rows = self._query(self.ISSUE_COLUMNS + """
+        WHERE bi.status IN ('issued', 'overdue')
+          AND (bi.issue_id = :issue_id
+               OR bi.book_id IN (SELECT rowid FROM books_fts WHERE books_fts MATCH :match)
+               OR bi.member_id IN (SELECT rowid FROM members_fts WHERE members_fts MATCH :match))
+        ORDER BY bi.issue_id IS :issue_id DESC, bi.due_date, bi.issue_id
+        LIMIT :limit
+        """, {"issue_id": int(number) if number.isdigit() else None, "match": match, "limit": limit})
+        return [Issue(*row) for row in rows]
+
+    # Without statistics the planner prefers idx_book_issues_open and sorts
+    # every open loan for each page, so the page query names its index
+    OPEN_ISSUE_PAGE_COLUMNS = """
+    SELECT bi.issue_id, b.title, m.first_name || ' ' || m.last_name as member_name,
+           bi.issue_date, bi.due_date, bi.status
+    FROM book_issues bi INDEXED BY idx_book_issues_open_date
+    JOIN books b ON bi.book_id = b.book_id
+    JOIN members m ON bi.member_id = m.member_id
+    """
+
+    def list_current_issues_page(self, after=None, before=None, limit=None):
+        # Keyed by (issue_date, issue_id), newest first
+        rows = self._page(self.OPEN_ISSUE_PAGE_COLUMNS, ("bi.issue_date", "bi.issue_id"),
+                          after, before, limit, descending=True,
+                          where="bi.status IN ('issued', 'overdue')")
+        return [Issue(*row) for row in rows]
+
+    def issue_book(self, book_id, member_id, due_date, issued_by=None):
+        # Validate due date format
+        try:
+            due_date_obj = datetime.strptime(due_date, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            raise ValidationError("Due date must be in YYYY-MM-DD format")
+
+        # A loan recorded after its due date is overdue from the start; the
+        # overdue sweep only looks at loans falling due since its last run
+        status = "overdue" if due_date_obj.date() < date.today() else "issued"
+
+        def issue(cursor):
+            self._check_borrower(cursor, member_id)
+            return self._issue(cursor, book_id, member_id, due_date_obj.strftime("%Y-%m-%d"), issued_by, status)
+
+        return self._write_transaction(issue)
+
+    def issue_books(self, book_ids, member_id, due_date, issued_by=None):
+        # Lend several books to one member in a single transaction: either
+        # every book is issued or, if any of them cannot be, none is.
+        # Returns the new issue ids in the order of book_ids.
+        try:
+            due_date_obj = datetime.strptime(due_date, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            raise ValidationError("Due date must be in YYYY-MM-DD format")
+        book_ids = list(book_ids)
+        if not book_ids:
+            raise ValidationError("Select at least one book")
+        status = "overdue" if due_date_obj.date() < date.today() else "issued"
+
+        def issue_all(cursor):
+            self._check_borrower(cursor, member_id)
+            issue_ids = []
+            for book_id in book_ids:
+                try:
+                    issue_ids.append(self._issue(cursor, book_id, member_id, due_date_obj.strftime("%Y-%m-%d"),
+                                                 issued_by, status))
+                except (NotFoundError, ConflictError) as err:
+                    raise type(err)(f"Book #{book_id}: {err}") from None
+            return issue_ids
+
+        return self._write_transaction(issue_all)
+
+    def _check_borrower(self, cursor, member_id):
+        # Checked inside the write transaction, so a member suspended by
+        # another desk a moment ago cannot still borrow
+        cursor.execute("SELECT membership_status FROM members WHERE member_id = ?", (member_id,))
+        row = cursor.fetchone()
+        if row is None:
+            raise NotFoundError("Selected member not found")
+        if row[0] != "active":
+            raise ConflictError(f"This member is {row[0]} and cannot borrow books")
+
+    def _issue(self, cursor, book_id, member_id, due_date, issued_by, status):
+        # Take a copy first: the decrement only happens while one is left,
+        # so two desks can never both get the last copy
+        cursor.execute("""
+        UPDATE books
+        SET available_copies = available_copies - 1
+        WHERE book_id = ? AND available_copies > 0
+        """, (book_id,))
+        if cursor.rowcount == 0:
+            cursor.execute("SELECT 1 FROM books WHERE book_id = ?", (book_id,))
+            if cursor.fetchone() is None:
+                raise NotFoundError("Selected book not found")
+            raise ConflictError("No copies of this book are currently available")
+
+        # Create issue record
+        cursor.execute("""
+        INSERT INTO book_issues (book_id, member_id, due_date, issued_by, status)
+        VALUES (?, ?, ?, ?, ?)
+        """, (book_id, member_id, due_date, issued_by, status))
+        return cursor.lastrowid
+
+    def return_book(self, issue_id, fine_amount=0.0):
+        try:
+            fine_amount = float(fine_amount)
+        except (TypeError, ValueError):
+            raise ValidationError("Invalid fine amount")
+
+        self._write_transaction(lambda cursor: self._return(cursor, issue_id, fine_amount))
+
+    def return_books(self, returns):
+        # Return several loans in a single transaction, all or none.
+        # `returns` holds (issue_id, fine_amount) pairs.
+        try:
+            returns = [(issue_id, float(fine_amount)) for issue_id, fine_amount in returns]
+        except (TypeError, ValueError):
+            raise ValidationError("Invalid fine amount")
+        if not returns:
+            raise ValidationError("Select at least one loan to return")
+
+        def return_all(cursor):
+            for issue_id, fine_amount in returns:
+                try:
+                    self._return(cursor, issue_id, fine_amount)
+                except (NotFoundError, ConflictError) as err:
+                    raise type(err)(f"Issue #{issue_id}: {err}") from None
+
+        self._write_transaction(return_all)
+
+    def _return(self, cursor, issue_id, fine_amount):
+        # Close the loan only if it is still open, so a second return of the
+        # same loan (a double click, another desk) cannot put the copy back
+        # twice
+        cursor.execute("""
+        UPDATE book_issues
+        SET status = 'returned',
+            return_date = CURRENT_TIMESTAMP,
+            fine_amount = ?
+        WHERE issue_id = ? AND status != 'returned'
+        """, (fine_amount, issue_id))
+        if cursor.rowcount == 0:
+            cursor.execute("SELECT 1 FROM book_issues WHERE issue_id = ?", (issue_id,))
+            if cursor.fetchone() is None:
+                raise NotFoundError("Selected issue not found")
+            raise ConflictError("This book has already been returned")
+
+        # Update available copies
+        cursor.execute("""
+        UPDATE books
+        SET available_copies = available_copies + 1
+        WHERE book_id = (SELECT book_id FROM book_issues WHERE issue_id = ?)
+        """, (issue_id,))
+
+        # The amount charged at return replaces whatever had accrued
+        # unpaid (see fines.accrue_fines); payments already made on the
+        # loan count towards it
+        cursor.execute("DELETE FROM fines WHERE issue_id = ? AND payment_status = 'unpaid'", (issue_id,))
+        cursor.execute("""
+        SELECT COALESCE(SUM(amount), 0) FROM fines
+        WHERE issue_id = ? AND payment_status = 'paid'
+        """, (issue_id,))
+        outstanding = round(fine_amount - cursor.fetchone()[0], 2)
+
+        # Create fine record if anything is still owed
+        if outstanding > 0:
+            self._insert_fine(cursor, issue_id, outstanding)
+
+    # ---------------------------------------------------------------- fines
+
+    def _insert_fine(self, cursor, issue_id, amount):
+        cursor.execute("""
+        INSERT INTO fines (issue_id, amount)
+        VALUES (?, ?)
+        """, (issue_id, amount))
+
+    def accrued_fines(self, issue_ids=None, as_of=None):
+        # {issue_id: fine} for open loans that have run up a fine under the
+        # fine policies as of `as_of` (default today), optionally only for
+        # the given loans. Loans owing nothing are left out.
+        where, ids = "", {}
+        if issue_ids is not None:
+            where = "AND bi.issue_id IN (SELECT value FROM json_each(:ids))"
+            ids = {"ids": json.dumps(list(issue_ids))}
+        sql, params = accrued_fines_query(as_of, where)
+        return {row[0]: row[1] for row in self._query(sql, {**params, **ids})}
+
+    def list_fine_policies(self):
+        # Default policy first, then category overrides by name
+        rows = self._query("""
+        SELECT p.policy_id, c.category_name, p.daily_rate, p.grace_days, p.max_fine
+        FROM fine_policies p
+        LEFT JOIN categories c ON p.category_id = c.category_id
+        ORDER BY p.category_id IS NOT NULL, c.category_name
+        """)
+        return [FinePolicy(*row) for row in rows]
+
+    def set_fine_policy(self, daily_rate, grace_days=0, max_fine=None, category=None):
+        # Create or replace the default policy, or the override for a
+        # category when one is named
+        try:
+            daily_rate = float(daily_rate)
+            grace_days = int(grace_days)
+            max_fine = float(max_fine) if max_fine not in (None, "") else None
+        except (TypeError, ValueError):
+            raise ValidationError("Invalid fine policy")
+        if daily_rate < 0 or grace_days < 0 or (max_fine is not None and max_fine < 0):
+            raise ValidationError("Fine rates, grace days and caps cannot be negative")
+
+        category_id = None
+        if category:
+            category_id = self.get_category_id(category)
+            if category_id is None:
+                raise NotFoundError(f"Category '{category}' not found")
+
+        # category_id is NULL for the default policy, which UNIQUE does not
+        # cover, so the old row is replaced explicitly
+        try:
+            self.conn.execute("DELETE FROM fine_policies WHERE category_id IS ?", (category_id,))
+            self.conn.execute("""
+            INSERT INTO fine_policies (category_id, daily_rate, grace_days, max_fine)
+            VALUES (?, ?, ?, ?)
+            """, (category_id, daily_rate, grace_days, max_fine))
+            self._reaccrue_fines()
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+
+    def remove_fine_policy(self, category):
+        # Drop a category override; its books fall back to the default policy
+        category_id = self.get_category_id(category)
+        cursor = self.conn.execute("DELETE FROM fine_policies WHERE category_id = ?", (category_id,))
+        if category_id is None or cursor.rowcount == 0:
+            self.conn.rollback()
+            raise NotFoundError(f"No fine policy for category '{category}'")
+        self._reaccrue_fines()
+        self.conn.commit()
+
+    def _reaccrue_fines(self):
+        # A changed policy changes what open loans owe: let the next
+        # accrual run recompute today's fines instead of waiting a day
+        self.conn.execute("DELETE FROM maintenance_state WHERE name = ?", (ACCRUAL_STATE,))
+
+    def list_fines(self, payment_status=None):
+        sql = """
+        SELECT fine_id, issue_id, amount, fine_date, payment_date, payment_status
+        FROM fines
+        """
+        params = ()
+        if payment_status:
+            sql += "WHERE payment_status = ?\n"
+            params = (payment_status,)
+        rows = self._query(sql + "ORDER BY fine_date DESC", params)
+        return [Fine(*row) for row in rows]
+
+    def pay_fine(self, fine_id):
+        cursor = self.conn.execute("""
+        UPDATE fines
+        SET payment_status = 'paid', payment_date = CURRENT_TIMESTAMP
+        WHERE fine_id = ? AND payment_status = 'unpaid'
+        """, (fine_id,))
+        self.conn.commit()
+        if cursor.rowcount == 0:
+            raise NotFoundError("Unpaid fine not found")
+
+    # ---------------------------------------------------------------- stats
+
+    def library_stats(self):
+        # Dashboard counters, read from library_stats rather than counted
+        stats = read_stats(self.conn)
+        return LibraryStats(
+            books=int(stats.get("books", 0)),
+            total_copies=int(stats.get("total_copies", 0)),
+            available_copies=int(stats.get("available_copies", 0)),
+            active_members=int(stats.get("active_members", 0)),
+            open_loans=int(stats.get("open_loans", 0)),
+            overdue_loans=int(stats.get("overdue_loans", 0)),
+            unpaid_fines=int(stats.get("unpaid_fines", 0)),
+            unpaid_fine_amount=round(stats.get("unpaid_fine_amount", 0.0), 2),
+        )
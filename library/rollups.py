@@ -0,0 +1,133 @@
+import sqlite3
+
+from .state import get_state, set_state
+
+# maintenance_state entry holding the first day not yet rolled up: the
+# daily_* tables are complete for every day before it
+ROLLUP_STATE = "rollups_built_until"
+
+# SQL expression for that day in report queries ('' before the first build,
+# so the live part of a report then covers all history)
+ROLLED_UP_UNTIL = f"(SELECT COALESCE(MAX(value), '') FROM maintenance_state WHERE name = '{ROLLUP_STATE}')"
+
+# Each rollup: the table and the statement filling it for the days in
+# [:since, :until). Only facts that never
+# change once recorded are rolled up: when a loan was issued (and for which
+# book, member and category), what was charged when it was returned, and
+# what was paid. Current state such as "overdue" is read live by the reports.
+ROLLUPS = [
+    ("daily_book_loans", """
+    INSERT INTO daily_book_loans (day, book_id, loans)
+    SELECT date(issue_date), book_id, COUNT(*)
+    FROM book_issues
+    WHERE issue_date >= :since AND issue_date < :until
+    GROUP BY date(issue_date), book_id
+    """),
+    ("daily_member_loans", """
+    INSERT INTO daily_member_loans (day, member_id, loans)
+    SELECT date(issue_date), member_id, COUNT(*)
+    FROM book_issues
+    WHERE issue_date >= :since AND issue_date < :until
+    GROUP BY date(issue_date), member_id
+    """),
+    ("daily_category_loans", """
+    INSERT INTO daily_category_loans (day, category_id, loans)
+    SELECT date(bi.issue_date), COALESCE(b.category_id, 0), COUNT(*)
+    FROM book_issues bi
+    JOIN books b ON bi.book_id = b.book_id
+    WHERE bi.issue_date >= :since AND bi.issue_date < :until
+    GROUP BY date(bi.issue_date), COALESCE(b.category_id, 0)
+    """),
+    ("daily_fines", """
+    INSERT INTO daily_fines (day, loans_fined, amount_charged)
+    SELECT date(return_date), COUNT(*), SUM(fine_amount)
+    FROM book_issues
+    WHERE return_date IS NOT NULL AND return_date >= :since AND return_date < :until
+      AND fine_amount > 0
+    GROUP BY date(return_date)
+    """),
+    ("daily_fines", """
+    INSERT INTO daily_fines (day, fines_paid, amount_collected)
+    SELECT date(payment_date), COUNT(*), SUM(amount)
+    FROM fines
+    WHERE payment_status = 'paid' AND payment_date >= :since AND payment_date < :until
+    GROUP BY date(payment_date)
+    ON CONFLICT(day) DO UPDATE SET fines_paid = excluded.fines_paid,
+                                   amount_collected = excluded.amount_collected
+    """),
+]
+
+ROLLUP_TABLES = tuple(dict.fromkeys(table for table, _ in ROLLUPS))
+
+
+# First day any rollup has something to read, where a first build starts
+FIRST_DAY = """
+SELECT date(MIN(first)) FROM (
+    SELECT MIN(issue_date) AS first FROM book_issues
+    UNION ALL
+    SELECT MIN(return_date) FROM book_issues WHERE return_date IS NOT NULL
+    UNION ALL
+    SELECT MIN(payment_date) FROM fines WHERE payment_status = 'paid'
+)
+"""
+
+
+def _next_month(day):
+    # First day of the month after `day` ('YYYY-MM-DD')
+    year, month = int(day[:4]), int(day[5:7])
+    return f"{year + month // 12:04d}-{month % 12 + 1:02d}-01"
+
+
+def build_rollups(writer, today=None, rebuild=False):
+    # Roll up every finished day since the last run (all history on the
+    # first run, or with `rebuild`, e.g. after loans were deleted or
+    # backdated rows imported). Today is left to the reports' live part
+    # until it is over. Returns the number of days with loans that were
+    # rolled up.
+    #
+    # `writer` is called for each transaction and returns a context
+    # manager yielding the connection to use, e.g. ConnectionPool.writer.
+    # Days are rolled up a calendar month per transaction, so a first
+    # build over years of history never holds the write lock (or the
+    # pool's writer) for long. Each month's rows and the new mark are
+    # committed together: days past the mark have no rows yet, and a build
+    # that is interrupted carries on from the last month it committed.
+    #
+    # Timestamps are stored as UTC (CURRENT_TIMESTAMP), so "today" is
+    # SQLite's UTC date too: with the local date, loans issued between
+    # local and UTC midnight would land before the mark and never be
+    # rolled up.
+    until = today.isoformat() if today else None
+    days = 0
+    while True:
+        with writer() as conn:
+            if until is None:
+                until = conn.execute("SELECT date('now')").fetchone()[0]
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                since = None if rebuild else get_state(conn, ROLLUP_STATE)
+                if since is None:
+                    # Starting over: the rows go in the same transaction
+                    # as the first month
+                    for table in ROLLUP_TABLES:
+                        conn.execute(f"DELETE FROM {table}")
+                    since = min(conn.execute(FIRST_DAY).fetchone()[0] or until, until)
+                    rebuild = False
+                elif since >= until:
+                    conn.rollback()
+                    return days
+
+                end = min(_next_month(since), until)
+                for _, sql in ROLLUPS:
+                    conn.execute(sql, {"since": since, "until": end})
+
+                days += conn.execute("""
+                SELECT COUNT(DISTINCT day) FROM daily_member_loans WHERE day >= ? AND day < ?
+                """, (since, end)).fetchone()[0]
+                set_state(conn, ROLLUP_STATE, end)
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+        if end >= until:
+            return days
@@ -0,0 +1,577 @@
+import hashlib
+import sqlite3
+
+from .changes import CHANGE_TABLES
+from .errors import SchemaVersionError
+from .repository import ISBN_KEY, _is_busy
+from .stats import CURRENT_STATS
+
+
+# Each migration is a list of statements that moves the schema from version
+# N-1 to N, where N is its position in MIGRATIONS (1-based). The applied
+# version is stored in PRAGMA user_version, so startup only runs the DDL a
+# database has not seen yet. Statements use IF NOT EXISTS so databases created
+# before versioning was introduced (user_version 0) upgrade cleanly.
+
+BASE_TABLES = [
+    # Create Categories Table
+    """
+    CREATE TABLE IF NOT EXISTS categories (
+        category_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        category_name TEXT NOT NULL UNIQUE,
+        description TEXT
+    )
+    """,
+    # Create Books Table
+    """
+    CREATE TABLE IF NOT EXISTS books (
+        book_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        author TEXT NOT NULL,
+        isbn TEXT UNIQUE,
+        publisher TEXT,
+        publication_year INTEGER,
+        category_id INTEGER,
+        total_copies INTEGER DEFAULT 1,
+        available_copies INTEGER DEFAULT 1,
+        description TEXT,
+        added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        cover_image TEXT,
+        FOREIGN KEY (category_id) REFERENCES categories(category_id)
+    )
+    """,
+    # Create Members Table
+    """
+    CREATE TABLE IF NOT EXISTS members (
+        member_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        phone TEXT,
+        address TEXT,
+        join_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        membership_status TEXT CHECK(membership_status IN ('active', 'inactive', 'suspended')) DEFAULT 'active',
+        profile_image TEXT
+    )
+    """,
+    # Create Users Table
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        full_name TEXT NOT NULL,
+        role TEXT CHECK(role IN ('admin', 'librarian', 'staff')) NOT NULL,
+        created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_login TIMESTAMP
+    )
+    """,
+    # Create Book Issues Table
+    """
+    CREATE TABLE IF NOT EXISTS book_issues (
+        issue_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        book_id INTEGER NOT NULL,
+        member_id INTEGER NOT NULL,
+        issue_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        due_date TIMESTAMP NOT NULL,
+        return_date TIMESTAMP,
+        fine_amount DECIMAL(10,2) DEFAULT 0.00,
+        status TEXT CHECK(status IN ('issued', 'returned', 'overdue')) DEFAULT 'issued',
+        issued_by INTEGER,
+        FOREIGN KEY (book_id) REFERENCES books(book_id),
+        FOREIGN KEY (member_id) REFERENCES members(member_id),
+        FOREIGN KEY (issued_by) REFERENCES users(user_id)
+    )
+    """,
+    # Create Fines Table
+    """
+    CREATE TABLE IF NOT EXISTS fines (
+        fine_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        issue_id INTEGER NOT NULL,
+        amount DECIMAL(10,2) NOT NULL,
+        fine_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        payment_date TIMESTAMP,
+        payment_status TEXT CHECK(payment_status IN ('paid', 'unpaid')) DEFAULT 'unpaid',
+        FOREIGN KEY (issue_id) REFERENCES book_issues(issue_id)
+    )
+    """,
+]
+
+INDEXES = [
+    # Circulation filters: open loans, per-member and per-book history
+    "CREATE INDEX IF NOT EXISTS idx_book_issues_status ON book_issues(status)",
+    "CREATE INDEX IF NOT EXISTS idx_book_issues_member ON book_issues(member_id, status)",
+    "CREATE INDEX IF NOT EXISTS idx_book_issues_book ON book_issues(book_id)",
+    "CREATE INDEX IF NOT EXISTS idx_book_issues_issue_date ON book_issues(issue_date)",
+    """
+    CREATE INDEX IF NOT EXISTS idx_book_issues_open ON book_issues(status, issue_date)
+    WHERE status IN ('issued', 'overdue')
+    """,
+    # Member lists are ordered by name, the issue dialog filters on status
+    "CREATE INDEX IF NOT EXISTS idx_members_name ON members(first_name, last_name)",
+    "CREATE INDEX IF NOT EXISTS idx_members_status ON members(membership_status, first_name, last_name)",
+    # Book lists are ordered by title, the issue dialog only wants available copies
+    "CREATE INDEX IF NOT EXISTS idx_books_title ON books(title)",
+    "CREATE INDEX IF NOT EXISTS idx_books_available ON books(title) WHERE available_copies > 0",
+    # Fines are looked up per issue and reported newest first
+    "CREATE INDEX IF NOT EXISTS idx_fines_issue ON fines(issue_id)",
+    "CREATE INDEX IF NOT EXISTS idx_fines_date ON fines(fine_date)",
+]
+
+FULL_TEXT_SEARCH = [
+    # External-content FTS5 indexes over books and members. Triggers keep them
+    # in sync; updates that only touch other columns (available_copies,
+    # membership_status, ...) do not rewrite the index.
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        title, author, isbn, publisher, description,
+        content='books', content_rowid='book_id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, author, isbn, publisher, description)
+        VALUES (new.book_id, new.title, new.author, new.isbn, new.publisher, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, isbn, publisher, description)
+        VALUES ('delete', old.book_id, old.title, old.author, old.isbn, old.publisher, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_update
+    AFTER UPDATE OF title, author, isbn, publisher, description ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, isbn, publisher, description)
+        VALUES ('delete', old.book_id, old.title, old.author, old.isbn, old.publisher, old.description);
+        INSERT INTO books_fts(rowid, title, author, isbn, publisher, description)
+        VALUES (new.book_id, new.title, new.author, new.isbn, new.publisher, new.description);
+    END
+    """,
+    "INSERT INTO books_fts(books_fts) VALUES ('rebuild')",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS members_fts USING fts5(
+        first_name, last_name, email, phone,
+        content='members', content_rowid='member_id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS members_fts_insert AFTER INSERT ON members BEGIN
+        INSERT INTO members_fts(rowid, first_name, last_name, email, phone)
+        VALUES (new.member_id, new.first_name, new.last_name, new.email, new.phone);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS members_fts_delete AFTER DELETE ON members BEGIN
+        INSERT INTO members_fts(members_fts, rowid, first_name, last_name, email, phone)
+        VALUES ('delete', old.member_id, old.first_name, old.last_name, old.email, old.phone);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS members_fts_update
+    AFTER UPDATE OF first_name, last_name, email, phone ON members BEGIN
+        INSERT INTO members_fts(members_fts, rowid, first_name, last_name, email, phone)
+        VALUES ('delete', old.member_id, old.first_name, old.last_name, old.email, old.phone);
+        INSERT INTO members_fts(rowid, first_name, last_name, email, phone)
+        VALUES (new.member_id, new.first_name, new.last_name, new.email, new.phone);
+    END
+    """,
+    "INSERT INTO members_fts(members_fts) VALUES ('rebuild')",
+]
+
+PAGING_INDEXES = [
+    # Open loans are listed newest first in pages keyed by (issue_date, issue_id)
+    """
+    CREATE INDEX IF NOT EXISTS idx_book_issues_open_date ON book_issues(issue_date)
+    WHERE status IN ('issued', 'overdue')
+    """,
+]
+
+OVERDUE_SWEEP = [
+    # The overdue sweep scans issued loans by due date
+    """
+    CREATE INDEX IF NOT EXISTS idx_book_issues_due ON book_issues(status, due_date)
+    """,
+    # Named progress markers for background maintenance jobs, e.g. the date
+    # the overdue sweep has reached
+    """
+    CREATE TABLE IF NOT EXISTS maintenance_state (
+        name TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+FINE_POLICIES = [
+    # How overdue loans are charged: a daily rate after a grace period, up to
+    # an optional cap. The row without a category is the default; a row for
+    # a category overrides it for that category's books.
+    """
+    CREATE TABLE IF NOT EXISTS fine_policies (
+        policy_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        category_id INTEGER UNIQUE,
+        daily_rate DECIMAL(10,2) NOT NULL CHECK(daily_rate >= 0),
+        grace_days INTEGER NOT NULL DEFAULT 0 CHECK(grace_days >= 0),
+        max_fine DECIMAL(10,2) CHECK(max_fine >= 0),
+        FOREIGN KEY (category_id) REFERENCES categories(category_id)
+    )
+    """,
+    """
+    INSERT INTO fine_policies (category_id, daily_rate, grace_days, max_fine)
+    SELECT NULL, 0.50, 0, 20.00
+    WHERE NOT EXISTS (SELECT 1 FROM fine_policies WHERE category_id IS NULL)
+    """,
+]
+
+LIBRARY_STATS = [
+    # Dashboard counters (see stats.py), kept up to date by the triggers
+    # below: each changed row adds its difference to the counters it
+    # affects, so the dashboard reads a few rows instead of scanning tables.
+    # Comparisons use IS so a NULL status counts as "not" rather than
+    # turning a counter into NULL.
+    """
+    CREATE TABLE IF NOT EXISTS library_stats (
+        name TEXT PRIMARY KEY,
+        value REAL NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """,
+    "INSERT OR REPLACE INTO library_stats (name, value) " + CURRENT_STATS,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_stats_insert AFTER INSERT ON books BEGIN
+        UPDATE library_stats SET value = value + CASE name
+            WHEN 'books' THEN 1
+            WHEN 'total_copies' THEN COALESCE(new.total_copies, 0)
+            WHEN 'available_copies' THEN COALESCE(new.available_copies, 0)
+        END
+        WHERE name IN ('books', 'total_copies', 'available_copies');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_stats_delete AFTER DELETE ON books BEGIN
+        UPDATE library_stats SET value = value - CASE name
+            WHEN 'books' THEN 1
+            WHEN 'total_copies' THEN COALESCE(old.total_copies, 0)
+            WHEN 'available_copies' THEN COALESCE(old.available_copies, 0)
+        END
+        WHERE name IN ('books', 'total_copies', 'available_copies');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_stats_update AFTER UPDATE OF total_copies, available_copies ON books
+    WHEN new.total_copies IS NOT old.total_copies OR new.available_copies IS NOT old.available_copies BEGIN
+        UPDATE library_stats SET value = value + CASE name
+            WHEN 'total_copies' THEN COALESCE(new.total_copies, 0) - COALESCE(old.total_copies, 0)
+            WHEN 'available_copies' THEN COALESCE(new.available_copies, 0) - COALESCE(old.available_copies, 0)
+        END
+        WHERE name IN ('total_copies', 'available_copies');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS members_stats_insert AFTER INSERT ON members
+    WHEN new.membership_status IS 'active' BEGIN
+        UPDATE library_stats SET value = value + 1 WHERE name = 'active_members';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS members_stats_delete AFTER DELETE ON members
+    WHEN old.membership_status IS 'active' BEGIN
+        UPDATE library_stats SET value = value - 1 WHERE name = 'active_members';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS members_stats_update AFTER UPDATE OF membership_status ON members
+    WHEN (new.membership_status IS 'active') IS NOT (old.membership_status IS 'active') BEGIN
+        UPDATE library_stats
+        SET value = value + (new.membership_status IS 'active') - (old.membership_status IS 'active')
+        WHERE name = 'active_members';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS book_issues_stats_insert AFTER INSERT ON book_issues
+    WHEN new.status IN ('issued', 'overdue') BEGIN
+        UPDATE library_stats SET value = value + CASE name
+            WHEN 'open_loans' THEN 1
+            WHEN 'overdue_loans' THEN new.status IS 'overdue'
+        END
+        WHERE name IN ('open_loans', 'overdue_loans');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS book_issues_stats_delete AFTER DELETE ON book_issues
+    WHEN old.status IN ('issued', 'overdue') BEGIN
+        UPDATE library_stats SET value = value - CASE name
+            WHEN 'open_loans' THEN 1
+            WHEN 'overdue_loans' THEN old.status IS 'overdue'
+        END
+        WHERE name IN ('open_loans', 'overdue_loans');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS book_issues_stats_update AFTER UPDATE OF status ON book_issues
+    WHEN new.status IS NOT old.status BEGIN
+        UPDATE library_stats SET value = value + CASE name
+            WHEN 'open_loans' THEN IFNULL(new.status IN ('issued', 'overdue'), 0) - IFNULL(old.status IN ('issued', 'overdue'), 0)
+            WHEN 'overdue_loans' THEN (new.status IS 'overdue') - (old.status IS 'overdue')
+        END
+        WHERE name IN ('open_loans', 'overdue_loans');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS fines_stats_insert AFTER INSERT ON fines
+    WHEN new.payment_status IS 'unpaid' BEGIN
+        UPDATE library_stats SET value = value + CASE name
+            WHEN 'unpaid_fines' THEN 1
+            WHEN 'unpaid_fine_amount' THEN new.amount
+        END
+        WHERE name IN ('unpaid_fines', 'unpaid_fine_amount');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS fines_stats_delete AFTER DELETE ON fines
+    WHEN old.payment_status IS 'unpaid' BEGIN
+        UPDATE library_stats SET value = value - CASE name
+            WHEN 'unpaid_fines' THEN 1
+            WHEN 'unpaid_fine_amount' THEN old.amount
+        END
+        WHERE name IN ('unpaid_fines', 'unpaid_fine_amount');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS fines_stats_update AFTER UPDATE OF amount, payment_status ON fines
+    WHEN new.amount IS NOT old.amount OR new.payment_status IS NOT old.payment_status BEGIN
+        UPDATE library_stats SET value = value + CASE name
+            WHEN 'unpaid_fines' THEN (new.payment_status IS 'unpaid') - (old.payment_status IS 'unpaid')
+            WHEN 'unpaid_fine_amount' THEN (new.payment_status IS 'unpaid') * new.amount
+                                           - (old.payment_status IS 'unpaid') * old.amount
+        END
+        WHERE name IN ('unpaid_fines', 'unpaid_fine_amount');
+    END
+    """,
+]
+
+DAILY_ROLLUPS = [
+    # Per-day circulation totals built by rollups.build_rollups, so reports
+    # over long periods add up a few rows per day instead of every loan.
+    # Keyed by book (member, category) first, so a report finds each book's
+    # days in the range with one index seek. category_id 0 stands for books
+    # without a category.
+    """
+    CREATE TABLE IF NOT EXISTS daily_book_loans (
+        day TEXT NOT NULL,
+        book_id INTEGER NOT NULL,
+        loans INTEGER NOT NULL,
+        PRIMARY KEY (book_id, day)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS daily_member_loans (
+        day TEXT NOT NULL,
+        member_id INTEGER NOT NULL,
+        loans INTEGER NOT NULL,
+        PRIMARY KEY (member_id, day)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS daily_category_loans (
+        day TEXT NOT NULL,
+        category_id INTEGER NOT NULL,
+        loans INTEGER NOT NULL,
+        PRIMARY KEY (category_id, day)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS daily_fines (
+        day TEXT PRIMARY KEY,
+        loans_fined INTEGER NOT NULL DEFAULT 0,
+        amount_charged REAL NOT NULL DEFAULT 0,
+        fines_paid INTEGER NOT NULL DEFAULT 0,
+        amount_collected REAL NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """,
+    # The rollups and the reports' live part read returns and payments by date
+    """
+    CREATE INDEX IF NOT EXISTS idx_book_issues_return_date ON book_issues(return_date)
+    WHERE return_date IS NOT NULL
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_fines_payment_date ON fines(payment_date)
+    WHERE payment_status = 'paid'
+    """,
+]
+
+CHANGE_LOG = [
+    # Row changes for the desks' change feed (see changes.py). AUTOINCREMENT
+    # keeps sequence numbers from being reused once old entries are pruned,
+    # so a desk can tell when entries it has not seen are gone.
+    """
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+] + [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_log_{event.lower()} AFTER {event} ON {table} BEGIN
+        INSERT INTO change_log (table_name, row_id) VALUES ('{table}', {row}.{key});
+    END
+    """
+    for table, key in CHANGE_TABLES.items()
+    for event, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old"))
+]
+
+SINGLE_DEFAULT_FINE_POLICY = [
+    # The UNIQUE on category_id does not stop two NULLs, and every default
+    # row is joined into the fine of a loan without an override, so a
+    # doubled default seed doubled those fines. Keep the oldest default and
+    # allow no more than one from now on.
+    """
+    DELETE FROM fine_policies
+    WHERE category_id IS NULL
+      AND policy_id > (SELECT MIN(policy_id) FROM fine_policies WHERE category_id IS NULL)
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_fine_policies_default ON fine_policies((category_id IS NULL))
+    WHERE category_id IS NULL
+    """,
+]
+
+REFERENCE_VERSIONS = [
+    # Change counters for the reference data cached in memory (see
+    # reference.py), bumped by triggers, so the cache only reloads the
+    # categories when a category actually changed rather than on every
+    # commit to the database
+    """
+    CREATE TABLE IF NOT EXISTS reference_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """,
+    "INSERT OR IGNORE INTO reference_versions (name, version) VALUES ('categories', 0)",
+] + [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS categories_version_{event.lower()} AFTER {event} ON categories BEGIN
+        UPDATE reference_versions SET version = version + 1 WHERE name = 'categories';
+    END
+    """
+    for event in ("INSERT", "UPDATE", "DELETE")
+]
+
+ISBN_LOOKUP = [
+    # Scanned ISBNs are looked up exactly, without their hyphens and spaces
+    f"CREATE INDEX IF NOT EXISTS idx_books_isbn_key ON books({ISBN_KEY}) WHERE isbn IS NOT NULL",
+]
+
+MIGRATIONS = [
+    BASE_TABLES,
+    INDEXES,
+    FULL_TEXT_SEARCH,
+    PAGING_INDEXES,
+    OVERDUE_SWEEP,
+    FINE_POLICIES,
+    LIBRARY_STATS,
+    DAILY_ROLLUPS,
+    CHANGE_LOG,
+    SINGLE_DEFAULT_FINE_POLICY,
+    REFERENCE_VERSIONS,
+    ISBN_LOOKUP,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    # Apply every migration newer than the database's user_version, each in
+    # its own transaction together with the version bump
+    current = get_schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"Database schema version {current} is newer than this application ({SCHEMA_VERSION})")
+
+    conn.commit()
+    while current < SCHEMA_VERSION:
+        cursor = conn.cursor()
+        try:
+            # Another desk may be upgrading the same file: take the write
+            # lock first and re-read the version under it, so each step is
+            # applied exactly once. Outside the try below, since nothing
+            # needs rolling back when the lock was never taken.
+            cursor.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as err:
+            cursor.close()
+            if _is_busy(err):
+                raise sqlite3.OperationalError(
+                    "Another desk is upgrading the database; try again once it has finished") from err
+            raise
+        try:
+            current = get_schema_version(conn)
+            if current < SCHEMA_VERSION:
+                for statement in MIGRATIONS[current]:
+                    cursor.execute(statement)
+                current += 1
+                cursor.execute(f"PRAGMA user_version = {int(current)}")
+            cursor.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    return SCHEMA_VERSION
+
+
+def create_tables(conn):
+    migrate(conn)
+    
+    cursor = conn.cursor()
+    
+    # Under the write lock, like the migrations, so two desks starting
+    # together do not both seed
+    cursor.execute("BEGIN IMMEDIATE")
+    
+    # Create default admin user if none exists
+    cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'admin'")
+    admin_count = cursor.fetchone()[0]
+    
+    if admin_count == 0:
+        # Hash the password 'admin123'
+        password_hash = hashlib.sha256('admin123'.encode()).hexdigest()
+        
+        cursor.execute("""
+        INSERT INTO users (username, password_hash, email, full_name, role)
+        VALUES (?, ?, ?, ?, ?)
+        """, ('admin', password_hash, 'admin@library.com', 'System Administrator', 'admin'))
+    
+    # Create some default categories if none exist
+    cursor.execute("SELECT COUNT(*) FROM categories")
+    category_count = cursor.fetchone()[0]
+    
+    if category_count == 0:
+        default_categories = [
+            ("Fiction", "Novels, short stories, and other fictional works"),
+            ("Non-Fiction", "Factual books on various subjects"),
+            ("Science", "Books related to scientific fields"),
+            ("Technology", "Books about technology and computers"),
+            ("History", "Historical books and biographies"),
+            ("Philosophy", "Books on philosophical thoughts and ideas"),
+            ("Arts", "Books related to various forms of art"),
+            ("Self-Help", "Books focused on personal development")
+        ]
+        
+        cursor.executemany("""
+        INSERT INTO categories (category_name, description)
+        VALUES (?, ?)
+        """, default_categories)
+    
+    conn.commit()
+    cursor.close()
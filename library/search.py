@@ -0,0 +1,86 @@
+import threading
+from collections import OrderedDict
+
+from .repository import SEARCH_LIMIT
+
+
+def refines(previous, term):
+    # True when every match for `term` is also a match for `previous`, so
+    # `term` can be searched within the previous results. That holds when
+    # each earlier word was extended (or kept) and new words were only added
+    # at the end. Single-character words match whole tokens rather than
+    # prefixes (see fts_query), so they may only be kept as they are.
+    old_words = previous.split()
+    new_words = term.split()
+    if not old_words or len(new_words) < len(old_words):
+        return False
+    for old, new in zip(old_words, new_words):
+        if old != new and (len(old) < 2 or not new.startswith(old)):
+            return False
+    return True
+
+
+class CachedSearch:
+    # Search-as-you-type helper around a repository search method.
+    #
+    # Keeps an LRU cache of term -> result ids; a hit only reloads those rows
+    # by primary key so counts stay current. A term that refines a cached
+    # complete result (one that was not cut off by the result limit) is
+    # searched within those ids instead of the whole index.
+    #
+    # search(repo, term, within=ids) and load(repo, ids) are repository
+    # methods such as LibraryRepository.search_books / books_by_ids; id_of
+    # extracts the id from a record. run() is called on worker threads while
+    # invalidate() is called from the GUI after writes, hence the lock.
+
+    def __init__(self, search, load, id_of, maxsize=64):
+        self.search = search
+        self.load = load
+        self.id_of = id_of
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # term -> (ids, complete)
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+
+    def run(self, repo, search_term):
+        term = " ".join(search_term.split())
+        with self.lock:
+            generation = self.generation
+            entry = self.entries.get(term)
+            if entry is not None:
+                self.entries.move_to_end(term)
+            else:
+                within = self._refinable(term)
+
+        if entry is not None:
+            return self.load(repo, entry[0])
+
+        if within is not None and not within:
+            records = []
+        else:
+            records = self.search(repo, term, within=within)
+        ids = [self.id_of(record) for record in records]
+        complete = len(records) < SEARCH_LIMIT
+
+        with self.lock:
+            # Results computed before an invalidation may already be stale
+            if generation == self.generation:
+                self.entries[term] = (ids, complete)
+                self.entries.move_to_end(term)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        return records
+
+    def _refinable(self, term):
+        # Ids of the longest cached complete result that `term` refines
+        best = None
+        for previous, (ids, complete) in self.entries.items():
+            if complete and refines(previous, term):
+                if best is None or len(previous) > len(best[0]):
+                    best = (previous, ids)
+        return best[1] if best else None
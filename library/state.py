@@ -0,0 +1,17 @@
+# Progress markers for background maintenance jobs, stored in the
+# maintenance_state table so an interrupted or restarted job picks up where
+# the last run stopped.
+
+
+def get_state(conn, name, default=None):
+    row = conn.execute("SELECT value FROM maintenance_state WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else default
+
+
+def set_state(conn, name, value):
+    # Written inside the caller's transaction, so the marker only moves
+    # forward when the work it describes is committed too
+    conn.execute("""
+    INSERT INTO maintenance_state (name, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+    """, (name, str(value)))
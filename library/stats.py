@@ -0,0 +1,62 @@
+import sqlite3
+from datetime import date
+
+from .state import get_state, set_state
+
+# maintenance_state entry holding the last date the counters were checked
+RECONCILE_STATE = "stats_reconciled_until"
+
+# The dashboard counters kept in library_stats. Triggers on books, members,
+# book_issues and fines (see schema.LIBRARY_STATS) add each row change to
+# them, so reading them costs the same at any database size. CURRENT_STATS
+# computes the same values from scratch, for seeding and reconciliation.
+STAT_NAMES = ("books", "total_copies", "available_copies", "active_members",
+              "open_loans", "overdue_loans", "unpaid_fines", "unpaid_fine_amount")
+
+CURRENT_STATS = """
+SELECT 'books', COUNT(*) FROM books
+UNION ALL SELECT 'total_copies', COALESCE(SUM(total_copies), 0) FROM books
+UNION ALL SELECT 'available_copies', COALESCE(SUM(available_copies), 0) FROM books
+UNION ALL SELECT 'active_members', COUNT(*) FROM members WHERE membership_status = 'active'
+UNION ALL SELECT 'open_loans', COUNT(*) FROM book_issues WHERE status IN ('issued', 'overdue')
+UNION ALL SELECT 'overdue_loans', COUNT(*) FROM book_issues WHERE status = 'overdue'
+UNION ALL SELECT 'unpaid_fines', COUNT(*) FROM fines WHERE payment_status = 'unpaid'
+UNION ALL SELECT 'unpaid_fine_amount', COALESCE(SUM(amount), 0) FROM fines WHERE payment_status = 'unpaid'
+"""
+
+
+def read_stats(conn):
+    # {name: value} for every counter, a handful of primary key lookups
+    return dict(conn.execute("SELECT name, value FROM library_stats").fetchall())
+
+
+def reconcile_stats(conn, today=None, force=False):
+    # Recompute every counter from the tables and overwrite those that have
+    # drifted, e.g. after rows were edited with triggers disabled or money
+    # sums picked up rounding error. Runs once a day unless `force`; the
+    # full scans make it the one costly part of the statistics. Returns
+    # {name: (stored, actual)} for the counters it corrected, or None when
+    # today's check had already run.
+    as_of = (today or date.today()).isoformat()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        done = get_state(conn, RECONCILE_STATE)
+        if not force and done is not None and done >= as_of:
+            conn.rollback()
+            return None
+
+        stored = read_stats(conn)
+        corrected = {}
+        for name, actual in conn.execute(CURRENT_STATS).fetchall():
+            if name not in stored or abs(stored[name] - actual) > 0.005:
+                corrected[name] = (stored.get(name), actual)
+        conn.executemany("""
+        INSERT INTO library_stats (name, value) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = excluded.value
+        """, [(name, actual) for name, (_, actual) in corrected.items()])
+        set_state(conn, RECONCILE_STATE, as_of)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return corrected
@@ -0,0 +1,116 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+# Thumbnails of cover (and profile) images, made in worker processes so a
+# full-size JPEG is never decoded on the GUI thread, and cached on disk under
+# a hash of the image's content and the thumbnail size: an image that is
+# replaced gets a new thumbnail, and the same image used twice shares one.
+
+# Directory of the disk cache, next to the database file
+THUMBNAIL_DIR = "thumbnails"
+
+# Sizes (width, height) the GUI asks for; thumbnails keep the aspect ratio
+ROW_THUMBNAIL = (32, 44)
+PREVIEW_THUMBNAIL = (160, 220)
+
+# Processes decoding images; decoding is CPU bound, so threads would take
+# turns on the GIL
+THUMBNAIL_WORKERS = 2
+
+
+def make_thumbnail(source, size, cache_dir):
+    # Path of the PNG thumbnail of the image file `source`, no larger than
+    # `size`, made and stored in cache_dir unless it is already there. Runs
+    # in a worker process. Raises OSError for a missing or unreadable image.
+    with open(source, "rb") as image_file:
+        data = image_file.read()
+    width, height = size
+    digest = hashlib.sha256(data).hexdigest()
+    target = os.path.join(cache_dir, f"{digest}-{width}x{height}.png")
+    if os.path.exists(target):
+        return target
+
+    with Image.open(BytesIO(data)) as image:
+        # Lets the JPEG decoder scale down while decoding, by up to 8x,
+        # instead of producing every pixel of a full-size photo
+        image.draft("RGB", size)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        image.thumbnail(size)
+
+        # Written under a temporary name and renamed, so another desk
+        # sharing the cache never reads a half-written file
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, partial = tempfile.mkstemp(suffix=".png", dir=cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                image.save(out, "PNG")
+            os.replace(partial, target)
+        except BaseException:
+            os.unlink(partial)
+            raise
+    return target
+
+
+class ThumbnailRenderer:
+    # Runs make_thumbnail on a pool of worker processes, started on first
+    # use. request() returns at once; the finished thumbnail's path is
+    # handed to on_done (or the exception to on_error) by dispatch(), which
+    # the GUI calls periodically from root.after, so callbacks run on the
+    # thread that calls it. Requests for the same image and size share one
+    # job, and jobs nobody waits for any more are cancelled before they
+    # start.
+
+    def __init__(self, cache_dir, workers=THUMBNAIL_WORKERS):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.executor = None
+        # (source, size) -> [future, [(on_done, on_error), ...]]
+        self.pending = {}
+
+    def request(self, source, size, on_done, on_error=None):
+        key = (source, tuple(size))
+        entry = self.pending.get(key)
+        if entry is None:
+            if self.executor is None:
+                # Spawned rather than forked: the GUI process has threads
+                # holding SQLite connections and locks
+                self.executor = ProcessPoolExecutor(self.workers,
+                                                    mp_context=multiprocessing.get_context("spawn"))
+            future = self.executor.submit(make_thumbnail, source, key[1], self.cache_dir)
+            entry = self.pending[key] = [future, []]
+        entry[1].append((on_done, on_error))
+
+    def cancel(self, source, size):
+        # Drop a request whose result is no longer wanted; a job already
+        # running is left to finish and fill the disk cache
+        key = (source, tuple(size))
+        entry = self.pending.get(key)
+        if entry is not None and entry[0].cancel():
+            del self.pending[key]
+
+    def dispatch(self):
+        # Deliver finished thumbnails; must be called from the GUI thread
+        for key, (future, callbacks) in list(self.pending.items()):
+            if not future.done():
+                continue
+            del self.pending[key]
+            if future.cancelled():
+                continue
+            error = future.exception()
+            for on_done, on_error in callbacks:
+                if error is None:
+                    on_done(future.result())
+                elif on_error is not None:
+                    on_error(error)
+
+    def shutdown(self):
+        self.pending.clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,564 @@
+from collections import OrderedDict, deque
+import tkinter as tk
+from tkinter import ttk
+
+
+class PagedTableModel:
+    # Windowed loading for a ttk.Treeview. Rows are fetched a page at a time
+    # with keyset pagination as the user scrolls, and pages that scroll far
+    # out of view are dropped again, so the widget only ever holds the
+    # visible window plus a small prefetch buffer.
+    #
+    # Queries run on a QueryExecutor. fetch_page(repo, after=key, before=key,
+    # limit=n) returns records in display order (e.g. the unbound
+    # LibraryRepository.list_books_page), row_values(record) gives the
+    # Treeview values and row_key(record) the keyset tuple of a record.
+    # Every request is submitted with the model as its key, so a reload or
+    # search cancels whatever the table was still waiting for.
+    #
+    # With row_id(record), rows get that id as their Treeview item id, and
+    # prepend_rows()/remove_rows()/patch_rows() patch the loaded pages in
+    # place instead of reloading them. Pass descending=True when fetch_page
+    # returns rows in descending key order.
+    #
+    # With row_image(record) (an image file path or None) and a
+    # ThumbnailLoader, rows show a thumbnail in the tree column. Only rows in
+    # view ask for theirs, once scrolling pauses, so paging through a large
+    # catalogue never decodes the covers it skips past.
+
+    # Load the next/previous page when the view is this close to an edge
+    PREFETCH_MARGIN = 0.2
+
+    # Wait this long after the view moves before loading thumbnails (ms)
+    THUMBNAIL_DELAY = 100
+
+    def __init__(self, tree, scrollbar, executor, fetch_page, row_values, row_key,
+                 on_error=None, page_size=100, max_pages=5, row_id=None, descending=False,
+                 row_image=None, thumbnails=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.executor = executor
+        self.fetch_page = fetch_page
+        self.row_values = row_values
+        self.row_key = row_key
+        self.row_id = row_id
+        self.descending = descending
+        self.row_image = row_image
+        self.thumbnails = thumbnails
+        self.on_error = on_error
+        self.page_size = page_size
+        self.max_pages = max_pages
+
+        # Each page is (first key, last key, [item ids]); keys holds the key
+        # of every row shown, for placing patched rows
+        self.pages = deque()
+        self.keys = {}
+        self.querying = False
+        # Image file of each row shown, when rows have thumbnails
+        self.images = {}
+        self.thumbnails_pending = False
+        self.at_start = True
+        self.at_end = True
+        self.loading = False
+        self.check_pending = False
+
+        self.tree.configure(yscrollcommand=self.on_scroll)
+
+    def clear(self):
+        # Drop every row in a single Tk call
+        self.tree.delete(*self.tree.get_children())
+        self.pages.clear()
+        self.keys.clear()
+        self.images.clear()
+
+    def reload(self):
+        self.loading = False
+        self._submit(lambda repo: self.fetch_page(repo, limit=self.page_size), self._show_first_page)
+
+    def show_query(self, fn):
+        # Replace the window with the records returned by fn(repo), e.g. a
+        # search; scrolling does not fetch further pages until reload()
+        self.loading = False
+        self._submit(fn, self.show_rows)
+
+    def show_rows(self, records):
+        self.clear()
+        self.querying = True
+        self.at_start = self.at_end = True
+        for record in records:
+            self._insert_row("end", record)
+
+    def prepend_rows(self, records):
+        # Show records that sort before every loaded row (e.g. loans issued
+        # just now) at the top. If the top of the list is not loaded they
+        # appear once the user scrolls back up to it.
+        if not records or not self.at_start:
+            return
+        records = [record for record in records if not self.tree.exists(self.row_id(record))]
+        if not records:
+            return
+
+        def insert():
+            first, last, items = self.pages[0] if self.pages else (None, self.row_key(records[-1]), [])
+            new_first, _, new_items = self._insert_page(records, 0)
+            page = (new_first, last, new_items + items)
+            if self.pages:
+                self.pages[0] = page
+            else:
+                self.pages.append(page)
+
+        self._keep_view(len(records), insert)
+
+    def remove_rows(self, ids):
+        # Take the rows with these item ids out of the table, e.g. loans just
+        # returned; rows that are not loaded are ignored. The removed rows'
+        # keys still bound their pages correctly, so no refetch is needed.
+        for item in map(str, ids):
+            if not self.tree.exists(item):
+                continue
+            for index, (first, last, items) in enumerate(self.pages):
+                if item in items:
+                    items.remove(item)
+                    break
+            self.keys.pop(item, None)
+            self.images.pop(item, None)
+            self.tree.delete(item)
+        for page in [page for page in self.pages if not page[2]]:
+            self.pages.remove(page)
+
+    def patch_rows(self, ids, records):
+        # Bring the rows for these ids up to date after they changed, e.g. on
+        # another desk. records are the current rows of those ids that belong
+        # in the table; rows for the other ids are removed. A loaded row whose
+        # key is unchanged is updated in place, otherwise it is moved, and a
+        # new row is inserted where its key falls in the loaded pages (rows
+        # outside them show up once they are scrolled to). Query results,
+        # which are not in key order, only get their rows updated.
+        current = {str(self.row_id(record)): record for record in records}
+        self.remove_rows([item for item in map(str, ids) if item not in current])
+        for item, record in current.items():
+            key = self.row_key(record)
+            if self.tree.exists(item) and (self.querying or self.keys[item] == key):
+                self.tree.item(item, values=self.row_values(record))
+                self._remember(item, record)
+            elif not self.querying:
+                self.remove_rows([item])
+                self._place(key, record)
+
+    def _before(self, key, other):
+        # Whether a row with `key` is shown above one with `other`
+        return key > other if self.descending else key < other
+
+    def _place(self, key, record):
+        # Insert a row into the loaded page its key falls in: the first page
+        # that does not end above it, if that page is not cut off there
+        if not self.pages:
+            if self.at_start and self.at_end:
+                self.pages.append(self._insert_page([record], "end"))
+            return
+        number = next((number for number, (_, last, _) in enumerate(self.pages)
+                       if not self._before(last, key)), len(self.pages) - 1)
+        first, last, items = self.pages[number]
+        if (number == 0 and not self.at_start and self._before(key, first)) or \
+                (not self.at_end and self._before(last, key)):
+            return
+
+        following = [item for item in items if self._before(key, self.keys[item])]
+        index = self.tree.index(following[0]) if following else self.tree.index(items[-1]) + 1
+        view_top = float(self.tree.yview()[0]) * len(self.tree.get_children())
+
+        def insert():
+            items.insert(len(items) - len(following), self._insert_row(index, record))
+
+        self._keep_view(1 if index < view_top else 0, insert)
+        self.pages[number] = (key if self._before(key, first) else first,
+                              key if self._before(last, key) else last, items)
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Fetching from inside the scroll callback would re-enter it, so the
+        # edge check runs once the widget is idle
+        if not self.check_pending and self.pages:
+            self.check_pending = True
+            self.tree.after_idle(self._check_edges)
+        self._request_thumbnails()
+
+    def _submit(self, fn, on_done):
+        self.executor.submit(fn, on_done, self._failed, key=self)
+
+    def _failed(self, err):
+        self.loading = False
+        if self.on_error:
+            self.on_error(err)
+
+    def _check_edges(self):
+        self.check_pending = False
+        if not self.pages or self.loading or not self.tree.winfo_exists():
+            return
+        first, last = (float(x) for x in self.tree.yview())
+
+        if last >= 1.0 - self.PREFETCH_MARGIN and not self.at_end:
+            self.loading = True
+            after = self.pages[-1][1]
+            self._submit(lambda repo: self.fetch_page(repo, after=after, limit=self.page_size),
+                         self._append_page)
+        elif first <= self.PREFETCH_MARGIN and not self.at_start:
+            self.loading = True
+            before = self.pages[0][0]
+            self._submit(lambda repo: self.fetch_page(repo, before=before, limit=self.page_size),
+                         self._prepend_page)
+
+    def _show_first_page(self, records):
+        self.clear()
+        self.querying = False
+        self.at_start = True
+        self.at_end = len(records) < self.page_size
+        if records:
+            self.pages.append(self._insert_page(records, "end"))
+        self.tree.yview_moveto(0)
+
+    def _insert_row(self, index, record):
+        if self.row_id is None:
+            item = self.tree.insert("", index, values=self.row_values(record))
+        else:
+            item = self.tree.insert("", index, iid=self.row_id(record), values=self.row_values(record))
+        self._remember(item, record)
+        return item
+
+    def _remember(self, item, record):
+        self.keys[item] = self.row_key(record)
+        if self.row_image is not None:
+            image = self.row_image(record)
+            if self.images.get(item, image) != image:
+                # Patched with another image: drop the old thumbnail
+                self.tree.item(item, image="")
+                self._request_thumbnails()
+            self.images[item] = image
+
+    def _request_thumbnails(self):
+        if self.thumbnails is not None and not self.thumbnails_pending:
+            self.thumbnails_pending = True
+            self.tree.after(self.THUMBNAIL_DELAY, self._show_thumbnails)
+
+    def _show_thumbnails(self):
+        # Give the rows in view their thumbnails, asking for the missing
+        # ones, and stop waiting for rows that have left the view
+        self.thumbnails_pending = False
+        if not self.tree.winfo_exists():
+            return
+        children = self.tree.get_children()
+        first, last = (float(x) for x in self.tree.yview())
+        in_view = children[int(first * len(children)):int(last * len(children)) + 1]
+        wanted = set()
+        for item in in_view:
+            image = self.images.get(item)
+            if not image:
+                continue
+            wanted.add(image)
+            photo = self.thumbnails.get(image, self._thumbnail_ready)
+            if photo is not None:
+                self.tree.item(item, image=photo)
+        self.thumbnails.forget_except(wanted)
+
+    def _thumbnail_ready(self, image, photo):
+        if not self.tree.winfo_exists():
+            return
+        for item, item_image in self.images.items():
+            if item_image == image:
+                self.tree.item(item, image=photo)
+
+    def _insert_page(self, records, index):
+        insert_at = index
+        items = []
+        for record in records:
+            item = self._insert_row(insert_at, record)
+            items.append(item)
+            if index != "end":
+                insert_at += 1
+        return (self.row_key(records[0]), self.row_key(records[-1]), items)
+
+    def _append_page(self, records):
+        self.loading = False
+        if len(records) < self.page_size:
+            self.at_end = True
+        if not records:
+            return
+        self.pages.append(self._insert_page(records, "end"))
+
+        if len(self.pages) > self.max_pages:
+            self._drop_page(self.pages.popleft(), from_top=True)
+            self.at_start = False
+
+    def _prepend_page(self, records):
+        self.loading = False
+        if len(records) < self.page_size:
+            self.at_start = True
+        if not records:
+            return
+        self._keep_view(len(records), lambda: self.pages.appendleft(self._insert_page(records, 0)))
+
+        if len(self.pages) > self.max_pages:
+            self._drop_page(self.pages.pop(), from_top=False)
+            self.at_end = False
+
+    def _drop_page(self, page, from_top):
+        for item in page[2]:
+            del self.keys[item]
+            self.images.pop(item, None)
+        if from_top:
+            self._keep_view(-len(page[2]), lambda: self.tree.delete(*page[2]))
+        else:
+            self.tree.delete(*page[2])
+
+    def _keep_view(self, shift, change):
+        # Rows added or removed above the view would make it jump; scroll by
+        # the same number of rows so the visible rows stay where they are
+        total = len(self.tree.get_children())
+        first = float(self.tree.yview()[0])
+        change()
+        new_total = len(self.tree.get_children())
+        if new_total:
+            self.tree.yview_moveto((first * total + shift) / new_total)
+
+
+class BusyIndicator:
+    # Small indeterminate progress bar in the bottom-right corner of the
+    # window, shown while background queries are in flight. Screens are
+    # rebuilt by destroying the root's children, so the bar is recreated
+    # whenever it is needed again.
+
+    def __init__(self, root):
+        self.root = root
+        self.bar = None
+
+    def update(self, busy):
+        if busy:
+            if self.bar is None or not self.bar.winfo_exists():
+                self.bar = ttk.Progressbar(self.root, mode="indeterminate", length=120)
+                self.bar.place(relx=1.0, rely=1.0, anchor="se", x=-10, y=-10)
+                self.bar.start(15)
+                self.root.configure(cursor="watch")
+            self.bar.lift()
+        elif self.bar is not None:
+            if self.bar.winfo_exists():
+                self.bar.stop()
+                self.bar.destroy()
+            self.bar = None
+            self.root.configure(cursor="")
+
+
+class Debouncer:
+    # Calls callback once input has been quiet for `delay` ms; every
+    # trigger() restarts the wait.
+
+    def __init__(self, widget, delay, callback):
+        self.widget = widget
+        self.delay = delay
+        self.callback = callback
+        self.pending = None
+
+    def trigger(self, *args):
+        self.cancel()
+        self.pending = self.widget.after(self.delay, self._fire)
+
+    def cancel(self):
+        if self.pending is not None:
+            self.widget.after_cancel(self.pending)
+            self.pending = None
+
+    def _fire(self):
+        self.pending = None
+        if self.widget.winfo_exists():
+            self.callback()
+
+
+class ProgressDialog:
+    # Modal "working..." window for long background jobs. It shows
+    # progress.rows as it changes and calls on_cancel when the user cancels.
+
+    REFRESH_INTERVAL = 200
+
+    def __init__(self, root, title, message, progress, on_cancel):
+        self.progress = progress
+        self.message = message
+        self.on_cancel = on_cancel
+
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.geometry("320x140")
+        self.window.grab_set()
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self.label = ttk.Label(self.window, text=message)
+        self.label.pack(pady=(15, 5))
+        bar = ttk.Progressbar(self.window, mode="indeterminate", length=250)
+        bar.pack(pady=5)
+        bar.start(15)
+        ttk.Button(self.window, text="Cancel", command=self.cancel).pack(pady=5)
+
+        self._refresh()
+
+    def _refresh(self):
+        if not self.window.winfo_exists():
+            return
+        self.label.configure(text=f"{self.message} {self.progress.rows:,} rows")
+        self.window.after(self.REFRESH_INTERVAL, self._refresh)
+
+    def cancel(self):
+        self.close()
+        self.on_cancel()
+
+    def close(self):
+        if self.window.winfo_exists():
+            self.window.destroy()
+
+
+class KeyedComboModel:
+    # Backs a ttk.Combobox with (key, label) choices, so the selection is
+    # known by its key (e.g. a book_id) rather than by parsing the label
+    # and looking it up again. Labels that repeat (two copies of the same
+    # title, two members with the same name) get the key appended, since
+    # the combobox can only tell choices apart by their text.
+
+    def __init__(self, combo):
+        self.combo = combo
+        self.keys = []
+
+    def set_choices(self, choices):
+        labels = []
+        seen = set()
+        self.keys = []
+        for key, label in choices:
+            if label in seen:
+                label = f"{label} (#{key})"
+            seen.add(label)
+            labels.append(label)
+            self.keys.append(key)
+        self.combo['values'] = labels
+
+    def selected_key(self):
+        # Key of the choice shown in the combobox, or None when the text
+        # does not match any choice
+        index = self.combo.current()
+        return self.keys[index] if index >= 0 else None
+
+
+class AutocompleteModel(KeyedComboModel):
+    # Type-ahead for a ttk.Combobox. Nothing is loaded up front; once typing
+    # pauses, fetch(repo, text, limit) runs on the QueryExecutor (e.g. the
+    # unbound LibraryRepository.suggest_available_books) and its records,
+    # turned into (key, label) pairs by choice(record), become the
+    # drop-down list. The dialog therefore opens instantly however large
+    # the table behind it is.
+
+    # Keys that move through or close the drop-down rather than edit text
+    NAVIGATION_KEYS = {"Up", "Down", "Left", "Right", "Return", "KP_Enter", "Escape", "Tab",
+                       "Shift_L", "Shift_R", "Control_L", "Control_R", "Alt_L", "Alt_R"}
+
+    def __init__(self, combo, executor, fetch, choice, limit=20, delay=200, on_error=None):
+        super().__init__(combo)
+        self.executor = executor
+        self.fetch = fetch
+        self.choice = choice
+        self.limit = limit
+        self.on_error = on_error
+        self.debouncer = Debouncer(combo, delay, self._refresh)
+        combo.bind("<KeyRelease>", self._key_released)
+
+    def _key_released(self, event):
+        if event.keysym not in self.NAVIGATION_KEYS:
+            self.debouncer.trigger()
+
+    def _refresh(self):
+        text = self.combo.get().strip()
+        if not text:
+            self.executor.cancel_key(self)
+            self.set_choices([])
+            return
+        if self.selected_key() is not None:
+            # The text is a choice the user just picked
+            return
+        self.executor.submit(lambda repo: self.fetch(repo, text, limit=self.limit),
+                             self._show, self.on_error, key=self)
+
+    def _show(self, records):
+        if self.combo.winfo_exists():
+            self.set_choices(self.choice(record) for record in records)
+
+
+class ThumbnailLoader:
+    # Thumbnails of one size as Tk PhotoImages, for a table or a preview.
+    # The most recently used `maxsize` images are kept in memory; the rest
+    # are made by a ThumbnailRenderer (library/thumbnails.py) in its worker
+    # processes, or read back from its disk cache, which only costs loading
+    # a small PNG. Keep maxsize well above the rows in view: an image
+    # dropped from memory shows blank wherever it was still displayed until
+    # it is asked for again.
+
+    def __init__(self, renderer, size, maxsize=200):
+        self.renderer = renderer
+        self.size = size
+        self.maxsize = maxsize
+        self.images = OrderedDict()  # image file -> PhotoImage
+        self.paths = {}  # image file -> its thumbnail in the disk cache
+        self.failed = set()  # missing or unreadable image files
+        self.waiting = {}  # image file -> [on_ready]
+
+    def get(self, image, on_ready):
+        # PhotoImage thumbnail of the image file, or None while it is being
+        # made, in which case on_ready(image, photo) is called once it is
+        # ready. Images that could not be read stay None.
+        photo = self.images.get(image)
+        if photo is not None:
+            self.images.move_to_end(image)
+            return photo
+        if image in self.paths:
+            photo = self._load(image)
+            if photo is not None:
+                return photo
+        if image in self.failed:
+            return None
+
+        callbacks = self.waiting.get(image)
+        if callbacks is None:
+            callbacks = self.waiting[image] = []
+            self.renderer.request(image, self.size, lambda path: self._made(image, path),
+                                  lambda err: self._failed(image))
+        if on_ready not in callbacks:
+            callbacks.append(on_ready)
+        return None
+
+    def forget_except(self, images):
+        # Stop waiting for every image not in `images`, e.g. those of rows
+        # that have scrolled out of view
+        for image in [image for image in self.waiting if image not in images]:
+            del self.waiting[image]
+            self.renderer.cancel(image, self.size)
+
+    def _load(self, image):
+        try:
+            photo = tk.PhotoImage(file=self.paths[image])
+        except tk.TclError:
+            # Removed from the disk cache; have it made again
+            del self.paths[image]
+            return None
+        self.images[image] = photo
+        while len(self.images) > self.maxsize:
+            self.images.popitem(last=False)
+        return photo
+
+    def _made(self, image, path):
+        self.paths[image] = path
+        callbacks = self.waiting.pop(image, [])
+        if not callbacks:
+            return
+        photo = self._load(image)
+        if photo is None:
+            self.failed.add(image)
+            return
+        for on_ready in callbacks:
+            on_ready(image, photo)
+
+    def _failed(self, image):
+        self.failed.add(image)
+        self.waiting.pop(image, None)